@@ -48,6 +48,8 @@ class JPG_DataModel(DataModel):
 
     file_extension = 'jpg'
     name = 'jpg'
+    mmap_import_threshold = 1024*1024
+    import_cache = True
 
     def create_node_from_raw_data(self, data, idx, filename):
         nm = 'jpg_{:0>2d}'.format(idx)
@@ -30,6 +30,7 @@ class PNG_DataModel(DataModel):
 
     file_extension = 'png'
     name = 'png'
+    mmap_import_threshold = 1024*1024
 
     def create_node_from_raw_data(self, data, idx, filename):
         nm = 'PNG_{:0>2d}'.format(idx)
@@ -32,6 +32,8 @@ class ZIP_DataModel(DataModel):
 
     file_extension = 'zip'
     name = 'zip'
+    mmap_import_threshold = 1024*1024
+    import_cache = True
 
     def create_node_from_raw_data(self, data, idx, filename):
         
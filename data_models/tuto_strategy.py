@@ -2,6 +2,7 @@ from framework.plumbing import *
 from framework.tactics_helpers import *
 from framework.global_resources import *
 from framework.scenario import *
+from framework.evolutionary_helpers import DefaultPopulation
 from framework.data import Data
 from framework.value_types import *
 
@@ -246,6 +247,12 @@ sc_test_basic = Scenario('BASIC', anchor=init, reinit_anchor=reinit)
 tactics.register_scenarios(sc1, sc2, sc3, sc4, sc5, sc_test, sc_test2, sc_test3, sc_test4,
                            sc_test_basic)
 
+evolutionary_scenarios = [
+    ('EVOL', DefaultPopulation, {'model': 'SEPARATOR', 'size': 10, 'max_generation_nb': 2}),
+    ('EVOL_BURST', DefaultPopulation,
+     {'model': 'SEPARATOR', 'size': 10, 'max_generation_nb': 2, 'workers': 2}, 4)
+]
+
 @generator(tactics, gtype="CBK")
 class g_test_callback_01(Generator):
 
@@ -27,6 +27,7 @@ import string
 import array
 
 from framework.global_resources import convert_to_internal_repr
+from libs.external_modules import *
 
 def rand_string(size=None, min=1, max=10, str_set=string.printable):
 
@@ -45,33 +46,133 @@ def rand_string(size=None, min=1, max=10, str_set=string.printable):
     return out
 
 
-def corrupt_bytes(s, p=0.01, n=None, ctrl_char=False):
-    """Corrupt a given percentage or number of bytes from a string"""
-    s = bytearray(s)
+# Payloads at least this large (in bytes) are corrupted with NumPy when it is
+# available. Below, the setup cost of the arrays outweighs the gain.
+BULK_CORRUPTION_MIN_SZ = 4096
+
+CTRL_CHARS = list(range(0, 32)) + [0x7f]
+
+def _get_bulk_rng(seed):
+    if seed is None:
+        # the global random generator drives the NumPy one, so that seeding the
+        # former is enough to reproduce the corruptions
+        seed = random.getrandbits(32)
+    return numpy.random.RandomState(seed)
+
+def _sample_positions(rng, l, n):
+    """Return `n` distinct sorted integers from range(l), as a NumPy array"""
+    if n > l // 2:
+        # drawing the positions to keep is cheaper
+        keep = numpy.ones(l, dtype=bool)
+        keep[_sample_positions(rng, l, l - n)] = False
+        return numpy.flatnonzero(keep)
+
+    pos = numpy.sort(rng.randint(0, l, size=n))
+    pos = pos[_first_occurrences(pos)]
+    while len(pos) < n:
+        # a stable sort merges the two sorted runs in linear time
+        extra = numpy.sort(rng.randint(0, l, size=n - len(pos)))
+        pos = numpy.sort(numpy.concatenate((pos, extra)), kind='mergesort')
+        pos = pos[_first_occurrences(pos)]
+    return pos
+
+def _first_occurrences(a):
+    """Return the indexes of the first occurrence of each value of the sorted array `a`"""
+    return numpy.flatnonzero(numpy.concatenate(([True], a[1:] != a[:-1]))[:len(a)])
+
+def _use_bulk_engine(s, bulk):
+    if bulk is None:
+        return numpy_module and len(s) >= BULK_CORRUPTION_MIN_SZ
+    elif bulk and not numpy_module:
+        raise ImportError('NumPy is required for the bulk corruption engine')
+    return bulk
+
+def corrupt_bytes(s, p=0.01, n=None, ctrl_char=False, seed=None, bulk=None):
+    """
+    Corrupt a given percentage or number of bytes from a string
+
+    Args:
+        seed (int): if not None, the corruption only depends on this seed (and on the
+          engine in use), and not on the state of the global random generator.
+        bulk (bool): if True, the positions and the new values are generated in one shot
+          with NumPy. If False, the pure-Python engine is used. If None, the bulk engine
+          is used for payloads bigger than BULK_CORRUPTION_MIN_SZ if NumPy is available.
+    """
     l = len(s)
     if n is None:
         n = max(1,int(l*p))
-    for i in random.sample(range(l), n):
+
+    if _use_bulk_engine(s, bulk):
+        rng = _get_bulk_rng(seed)
+        data = numpy.frombuffer(bytes(s), dtype=numpy.uint8).copy()
+        pos = _sample_positions(rng, l, n)
         if ctrl_char:
-            s[i] = random.choice([x for x in range(0,32)] + [0x7f])
+            data[pos] = numpy.array(CTRL_CHARS, dtype=numpy.uint8)[rng.randint(0, len(CTRL_CHARS),
+                                                                               size=n)]
         else:
-            s[i] = (s[i]+random.randint(1,255))%256
+            # the addition wraps around modulo 256
+            data[pos] += rng.randint(1, 256, size=n).astype(numpy.uint8)
+        return data.tobytes()
+
+    rand = random if seed is None else random.Random(seed)
+    s = bytearray(s)
+    for i in rand.sample(range(l), n):
+        if ctrl_char:
+            s[i] = rand.choice(CTRL_CHARS)
+        else:
+            s[i] = (s[i]+rand.randint(1,255))%256
 
     return bytes(s)
 
-def corrupt_bits(s, p=0.01, n=None, ascii=False):
-    """Flip a given percentage or number of bits from a string"""
-    s = bytearray(s)
+def corrupt_bits(s, p=0.01, n=None, ascii=False, seed=None, bulk=None):
+    """
+    Flip a given percentage or number of bits from a string
+
+    Args:
+        seed (int): refer to :func:`corrupt_bytes`.
+        bulk (bool): refer to :func:`corrupt_bytes`.
+    """
     l = len(s)*8
     if n is None:
         n = max(1,int(l*p))
-    for i in random.sample(range(l), n):
+
+    if _use_bulk_engine(s, bulk):
+        rng = _get_bulk_rng(seed)
+        data = numpy.frombuffer(bytes(s), dtype=numpy.uint8).copy()
+        pos = _sample_positions(rng, l, n)
+        # the positions are sorted, thus the bits to flip within a same byte
+        # are contiguous and can be merged into one mask
+        byte_idx = pos >> 3
+        starts = _first_occurrences(byte_idx)
+        idx = byte_idx[starts]
+        masks = numpy.left_shift(1, pos & 7).astype(numpy.uint8)
+        data[idx] ^= numpy.bitwise_or.reduceat(masks, starts)
+        if ascii:
+            data[idx] &= 0x7f
+        return data.tobytes()
+
+    rand = random if seed is None else random.Random(seed)
+    s = bytearray(s)
+    for i in rand.sample(range(l), n):
         s[i//8] ^= 1 << (i%8)
         if ascii:
             s[i//8] &= 0x7f
 
     return bytes(s)
 
+def missing_values_extrems(values):
+    """Return the smallest and the biggest integers lying between the minimum and
+    the maximum of `values` without being part of it, or None if there is no such integer"""
+    uniq = sorted(set(values))
+    first = last = None
+    for a, b in zip(uniq, uniq[1:]):
+        if b - a > 1:
+            if first is None:
+                first = a + 1
+            last = b - 1
+
+    return None if first is None else (first, last)
+
 def calc_parity_bit(x):
     """return 0 if the number of bits is even, otherwise returns 1"""
     bit = 0
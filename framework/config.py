@@ -78,6 +78,28 @@ fuzz.burst = 1
 ;;  fuzz.delay: Default value (> 0) for fuzz_delay
 ;;  fuzz.burst: Default value (>= 1)for fuzz_burst
 
+[db]
+group_commit = True
+max_batch_latency = 0.1
+wal = False
+synchronous = DEFAULT
+payload_compression = NONE
+payload_compression_threshold = 65536
+
+;;  [db.doc]
+;;  self: Configuration of the fuddly database (fmkDB.db)
+;;  group_commit: Commit the SQL statements in batch (within one transaction)
+                  instead of one by one.
+;;  max_batch_latency: [group_commit] Maximum time (in seconds) a statement
+                  could wait before being committed.
+;;  wal: Switch the database to write-ahead logging mode.
+;;  synchronous: Value of the sqlite 'synchronous' pragma (OFF, NORMAL, FULL,
+                  EXTRA), or DEFAULT to keep the sqlite default.
+;;  payload_compression: Compression of the stored data contents (NONE,
+                  ZLIB or ZSTD).
+;;  payload_compression_threshold: [payload_compression] Minimum size (in
+                  bytes) of the data contents to compress.
+
 ''')
 
 default.add('FmkShell', u'''
@@ -105,6 +127,8 @@ aligned: True
 aligned_options.batch_mode: False
 aligned_options.hide_cursor: True
 aligned_options.prompt_height: 3
+pregen.workers: 0
+pregen.queue_size: 16
 
 ;;  [send_loop.doc]
 ;;  self: Configuration applicable to the 'send_loop' command.
@@ -114,6 +138,16 @@ aligned_options.prompt_height: 3
                      (when using 'send_loop -1 <generator>').
 ;;  aligned_options.hide_cursor: Attempt to reduce blinking by hiding cursor.
 ;;  aligned_options.prompt_height: Estimation of prompt's height.
+;;  pregen.workers: Number of worker processes that generate the data
+                     ahead of time while the previous ones are sent
+                     (0 to generate them within the sending loop).
+                     Not used with scenarios, data makers relying on
+                     the feedback, or data carrying callbacks. With
+                     stateful data makers other than a model walk,
+                     the sent data are generated again at the end of
+                     the loop to update the data makers.
+;;  pregen.queue_size: Maximum number of pregenerated data waiting
+                     per worker.
 
 ''')
 
@@ -0,0 +1,342 @@
+################################################################################
+#
+#  Copyright 2014-2016 Eric Lacombe <eric.lacombe@security-labs.org>
+#
+################################################################################
+#
+#  This file is part of fuddly.
+#
+#  fuddly is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  fuddly is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with fuddly. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+import io
+import os
+import sys
+import types
+import pickle
+import hashlib
+import inspect
+import importlib
+import zlib
+
+import six
+
+import framework.global_resources as gr
+from framework.error_handling import AtomPackingError
+from framework.pregeneration import is_pregeneration_supported, create_worker_pool
+from libs.utils import ensure_dir
+
+def is_parallel_import_supported():
+    # the import workers have to inherit the data model under construction and the absorber
+    return is_pregeneration_supported()
+
+
+def _qualname(obj):
+    return getattr(obj, '__qualname__', obj.__name__)
+
+
+def _is_importable(obj):
+    module = sys.modules.get(getattr(obj, '__module__', None))
+    if module is None:
+        return False
+    target = module
+    for name in _qualname(obj).split('.'):
+        target = getattr(target, name, None)
+        if target is None:
+            return False
+    return target is obj
+
+
+def _make_cell(value):
+    return (lambda: value).__closure__[0]
+
+
+def _find_local_code(module, qualname, lineno):
+    """
+    Look for the code object of the local function @qualname (e.g., a lambda defined
+    within a method of a data model) among the constants of the code of its enclosing
+    function, which is reachable from the module by name.
+    """
+    path = qualname.split('.<locals>.')
+    if len(path) < 2:
+        return None
+    target = module
+    for name in path[0].split('.'):
+        target = getattr(target, name, None)
+        if target is None:
+            return None
+    codes = [getattr(getattr(target, '__func__', target), '__code__', None)]
+    # the code of a local class body or of a local function is a constant
+    # of the code of its enclosing block
+    for name in '.'.join(path[1:]).split('.'):
+        codes = [c for code in codes if code is not None for c in code.co_consts
+                 if isinstance(c, types.CodeType) and c.co_name == name]
+    codes = [c for c in codes if c.co_firstlineno == lineno]
+    # two lambdas defined on the same line cannot be told apart
+    return codes[0] if len(codes) == 1 else None
+
+
+class _AtomPickler(pickle.Pickler):
+
+    def __init__(self, f, packer):
+        pickle.Pickler.__init__(self, f, packer.protocol)
+        self._packer = packer
+
+    def persistent_id(self, obj):
+        return self._packer._persistent_id(obj)
+
+
+class _AtomUnpickler(pickle.Unpickler):
+
+    def __init__(self, f, packer):
+        pickle.Unpickler.__init__(self, f)
+        self._packer = packer
+
+    def persistent_load(self, pid):
+        return self._packer._persistent_load(pid)
+
+
+class AtomPacker(object):
+    """
+    Serialize atoms, so that they can be shipped from the import workers or stored
+    in the import cache.
+
+    Atoms are pickled as is, the framework classes which cannot be pickled directly
+    (e.g., the generators provided by the templates of :mod:`framework.dmhelpers.generic`)
+    implementing ``__reduce__()``. Besides:
+
+    - Data models are referenced by their module and their name.
+    - Local functions (e.g., the lambdas of a data model description) are referenced by
+      their module, their qualified name and their first line, and are rebuilt from the
+      code of their enclosing function with their defaults and their closure.
+
+    Anything else that cannot be pickled (e.g., local classes) makes the packing fail with
+    :class:`AtomPackingError`, and so does a reference that cannot be resolved
+    when unpacking.
+    """
+
+    protocol = 2
+
+    def __init__(self, dm=None):
+        self._dm = dm
+        self._dm_class = None
+        self._functions = {}
+
+    def pack(self, atom):
+        f = io.BytesIO()
+        try:
+            _AtomPickler(f, self).dump(atom)
+        except (pickle.PicklingError, TypeError, AttributeError, ValueError, RuntimeError) as e:
+            # RuntimeError: includes the graphs too deep to be pickled
+            raise AtomPackingError('cannot pack the atom: {!s}'.format(e))
+
+        return zlib.compress(f.getvalue(), 1)
+
+    def unpack(self, blob):
+        try:
+            return _AtomUnpickler(io.BytesIO(zlib.decompress(blob)), self).load()
+        except AtomPackingError:
+            raise
+        except (pickle.UnpicklingError, zlib.error, EOFError, TypeError, ValueError,
+                AttributeError, ImportError, IndexError, RuntimeError) as e:
+            raise AtomPackingError('cannot unpack the atom: {!s}'.format(e))
+
+    def _persistent_id(self, obj):
+        if type(obj) is types.FunctionType:
+            if _is_importable(obj):
+                return None
+            closure = []
+            for cell in obj.__closure__ or ():
+                try:
+                    closure.append(cell.cell_contents)
+                except ValueError:
+                    raise AtomPackingError('the closure of {!s} is not complete'
+                                           .format(_qualname(obj)))
+            return ('f', obj.__module__, _qualname(obj), obj.__code__.co_firstlineno,
+                    obj.__defaults__, tuple(closure))
+        elif isinstance(obj, self._get_dm_class()):
+            return ('dm', type(obj).__module__, obj.name)
+        return None
+
+    def _persistent_load(self, pid):
+        if pid[0] == 'dm':
+            return self._find_data_model(pid[1], pid[2])
+        elif pid[0] == 'f':
+            _, module_name, qualname, lineno, defaults, closure = pid
+            code = self._functions.get((module_name, qualname, lineno))
+            if code is None:
+                __import__(module_name)
+                module = sys.modules[module_name]
+                code = _find_local_code(module, qualname, lineno)
+                if code is None:
+                    raise AtomPackingError('cannot find the function {:s}.{:s} (line {:d})'
+                                           .format(module_name, qualname, lineno))
+                self._functions[(module_name, qualname, lineno)] = code
+            func = types.FunctionType(code, sys.modules[module_name].__dict__, code.co_name,
+                                      defaults, tuple(_make_cell(v) for v in closure))
+            if six.PY3:
+                func.__qualname__ = qualname
+            return func
+        raise AtomPackingError('unknown reference {!r}'.format(pid))
+
+    def _find_data_model(self, module_name, name):
+        if self._dm is not None:
+            if self._dm.name == name:
+                return self._dm
+            dm_db = self._dm._dm_db
+            if dm_db is not None and name in dm_db:
+                return dm_db[name]
+        try:
+            __import__(module_name)
+        except ImportError:
+            pass
+        else:
+            for obj in vars(sys.modules[module_name]).values():
+                if isinstance(obj, self._get_dm_class()) and obj.name == name:
+                    return obj
+        raise AtomPackingError("the data model '{!s}' ({!s}) is unknown".format(name, module_name))
+
+    def _get_dm_class(self):
+        if self._dm_class is None:
+            from framework.data_model import DataModel
+            self._dm_class = DataModel
+        return self._dm_class
+
+
+class ImportCache(object):
+    """
+    On-disk cache of the atoms created by :meth:`DataModel.import_file_contents`.
+
+    An entry is keyed by the SHA-1 of the imported file, the parameters provided to
+    the absorber and the version of the data model, which is derived from
+    :attr:`format_version`, the source code of the whole data model module and the one
+    of the framework modules the atoms are built with.
+    """
+
+    format_version = 1
+    _fmk_modules = ('framework.node', 'framework.value_types', 'framework.node_builder',
+                    'framework.data_model', 'framework.encoders', 'framework.basic_primitives',
+                    'framework.dmhelpers.generic', 'framework.dmhelpers.json',
+                    'framework.dmhelpers.xml', 'framework.corpus_import')
+    _fmk_version = None
+
+    def __init__(self, dm, absorber):
+        self._folder = os.path.join(gr.import_cache_folder, dm.name if dm.name else 'default')
+        self._version = self._get_version(dm, absorber)
+        self.hits = 0
+
+    def get_key(self, filepath, idx):
+        h = hashlib.sha1()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024*1024), b''):
+                h.update(chunk)
+        key = '{:s}{:s}{:d}{:s}'.format(self._version, h.hexdigest(), idx,
+                                        os.path.basename(filepath))
+        return hashlib.sha1(key.encode('utf8')).hexdigest()
+
+    def load(self, key, packer):
+        try:
+            with open(os.path.join(self._folder, key), 'rb') as f:
+                blob = f.read()
+        except (IOError, OSError):
+            return None
+
+        try:
+            atom = packer.unpack(blob)
+        except AtomPackingError:
+            return None
+
+        self.hits += 1
+        return atom
+
+    def store(self, key, blob):
+        path = os.path.join(self._folder, key)
+        ensure_dir(path)
+        tmp_path = '{:s}.{:d}'.format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            print("\n*** WARNING: cannot store '{:s}' in the import cache".format(path))
+
+    @classmethod
+    def _get_version(cls, dm, absorber):
+        if cls._fmk_version is None:
+            h = hashlib.sha1('{:s}-{:d}'.format(gr.fuddly_version, cls.format_version)
+                             .encode('utf8'))
+            for name in cls._fmk_modules:
+                cls._update_with_source(h, importlib.import_module(name))
+            cls._fmk_version = h.hexdigest()
+
+        h = hashlib.sha1(cls._fmk_version.encode('utf8'))
+        h.update(getattr(absorber, '__name__', repr(absorber)).encode('utf8'))
+        dm_module = sys.modules.get(type(dm).__module__)
+        cls._update_with_source(h, type(dm) if dm_module is None else dm_module)
+        return h.hexdigest()
+
+    @staticmethod
+    def _update_with_source(h, obj):
+        try:
+            with open(inspect.getsourcefile(obj), 'rb') as f:
+                h.update(f.read())
+        except (TypeError, IOError, OSError):
+            h.update(repr(obj).encode('utf8'))
+
+
+_import_job = None
+
+def _absorb_in_worker(task):
+    dm, absorber, path, use_mmap = _import_job
+    idx, name = task
+    try:
+        atom, stats = dm._absorb_file(absorber, path, name, idx, use_mmap)
+    except Exception:
+        # the file is absorbed again by the importing process,
+        # which will report the error
+        return idx, name, None, False, None
+
+    if atom is None:
+        return idx, name, None, True, stats
+
+    try:
+        return idx, name, AtomPacker(dm).pack(atom), True, stats
+    except AtomPackingError:
+        return idx, name, None, False, stats
+
+
+def absorb_files_in_workers(dm, absorber, path, tasks, use_mmap, nb_workers):
+    """
+    Absorb files in a pool of worker processes forked from the current one.
+
+    Args:
+        tasks (list): list of ``(idx, filename)``
+
+    Yields:
+        tuple: ``(idx, filename, packed_atom, shipped, stats)``. If the atom could not be
+        shipped back (``shipped`` is False), the file has to be absorbed by the
+        caller. Otherwise ``packed_atom`` is None if the absorber did not return anything.
+        ``stats`` is the ``(size, duration)`` of the absorption, or None if it failed.
+    """
+    global _import_job
+    _import_job = (dm, absorber, path, use_mmap)
+    pool = create_worker_pool(min(nb_workers, len(tasks)))
+    try:
+        for res in pool.imap_unordered(_absorb_in_worker, tasks):
+            yield res
+    finally:
+        pool.terminate()
+        pool.join()
+        _import_job = None
@@ -419,6 +419,10 @@ class Data(object):
             self._callbacks[hook] = collections.OrderedDict()
         self._callbacks[hook][id(callback)] = callback
 
+    def has_callbacks(self, hook=HOOK.after_fbk):
+        assert isinstance(hook, HOOK)
+        return bool(self._callbacks.get(hook))
+
     def cleanup_callbacks(self, hook=HOOK.after_fbk):
         assert isinstance(hook, HOOK)
         if hook in self._callbacks:
@@ -21,8 +21,14 @@
 #
 ################################################################################
 
+import mmap
+import time
+
 import framework.global_resources as gr
+from framework.corpus_import import AtomPacker, ImportCache, absorb_files_in_workers, \
+    is_parallel_import_supported
 from framework.data import *
+from framework.error_handling import AtomPackingError
 from framework.dmhelpers.generic import *
 from framework.node_builder import NodeBuilder
 from libs.external_modules import *
@@ -40,6 +46,29 @@ class DataModel(object):
 
     knowledge_source = None
 
+    # If set to True, the atoms provided by get_atom() are cloned in copy-on-write mode
+    # from the registered ones (refer to the `cow` parameter of :class:`Node`)
+    cow_clone = False
+
+    # If set to True, the atoms provided by get_atom() keep the serialized form of their
+    # unmodified subtrees (refer to :meth:`Node.enable_serialization_cache`)
+    serialization_cache = False
+
+    # If set, files at least this large (in bytes) are memory-mapped by import_file_contents()
+    # instead of being read. To be set only if create_node_from_raw_data() accepts `mmap` objects.
+    mmap_import_threshold = None
+
+    # Number of worker processes used by import_file_contents() to absorb the files
+    # concurrently. The workers are forked from fuddly, thus create_node_from_raw_data() should
+    # not rely on side effects on the data model. If None, the files are absorbed one after
+    # another.
+    import_workers = None
+
+    # If set to True, the atoms created by import_file_contents() are stored on disk and
+    # reused the next time the data model is loaded, as long as neither the imported files nor
+    # the data model have changed.
+    import_cache = False
+
     def pre_build(self):
         """
         This method is called when a data model is loaded.
@@ -79,6 +108,9 @@ class DataModel(object):
         self._dm_db = None
         self._built = False
         self._dm_hashtable = {}
+        # absorb throughput (in MB/s) of the files absorbed by the last call to
+        # import_file_contents(), indexed by file name
+        self.import_throughput = {}
 
     def _backend(self, atom):
         if isinstance(atom, (Node, dict)):
@@ -98,7 +130,8 @@ class DataModel(object):
     def get_atom(self, hash_key, name=None):
         if hash_key in self._dm_hashtable:
             atom = self._dm_hashtable[hash_key]
-            return self._backend(atom).atom_copy(atom, new_name=name)
+            return self._backend(atom).atom_copy(atom, new_name=name, cow=self.cow_clone,
+                                                 serialization_cache=self.serialization_cache)
         else:
             raise ValueError('Requested data does not exist!')
 
@@ -144,7 +177,21 @@ class DataModel(object):
             idx += 1
 
     def import_file_contents(self, extension=None, absorber=None,
-                             subdir=None, path=None, filename=None):
+                             subdir=None, path=None, filename=None, use_mmap=None,
+                             workers=None, use_cache=None):
+        """
+        Args:
+            use_mmap (bool): if True, the files are memory-mapped and the absorber is provided
+              with the `mmap` object, which can be given to :meth:`Node.absorb` as is. If False,
+              the files are read. If None, only the files bigger than `mmap_import_threshold`
+              are memory-mapped.
+            workers (int): number of worker processes absorbing the files. If None,
+              `import_workers` is used.
+            use_cache (bool): if True, the atoms are retrieved from the import cache when
+              possible, and stored in it otherwise. If None, `import_cache` is used.
+
+        The absorb throughput of each absorbed file is stored in `import_throughput`.
+        """
 
         if absorber is None:
             absorber = self.create_node_from_raw_data
@@ -153,6 +200,10 @@ class DataModel(object):
             extension = self.file_extension
         if path is None:
             path = self.get_import_directory_path(subdir=subdir)
+        if workers is None:
+            workers = self.import_workers
+        if use_cache is None:
+            use_cache = self.import_cache
 
         r_file = re.compile(".*\." + extension + "$")
         def is_good_file_by_ext(fname):
@@ -170,19 +221,105 @@ class DataModel(object):
             files = list(filter(is_good_file_by_ext, files))
         else:
             files = list(filter(is_good_file_by_fname, files))
-        msgs = {}
-        idx = 0
 
+        packer = AtomPacker(self)
+        cache = ImportCache(self, absorber) if use_cache else None
+        cache_keys = {}
+        atoms = {}
+        tasks = []
+        absorb_stats = {}
+        for idx, name in enumerate(files):
+            if cache is not None:
+                cache_keys[name] = cache.get_key(os.path.join(path, name), idx)
+                atoms[name] = cache.load(cache_keys[name], packer)
+                if atoms[name] is not None:
+                    continue
+            tasks.append((idx, name))
+
+        def import_locally(idx, name):
+            atom, absorb_stats[name] = self._absorb_file(absorber, path, name, idx, use_mmap)
+            if cache is not None and atom is not None:
+                try:
+                    cache.store(cache_keys[name], packer.pack(atom))
+                except AtomPackingError:
+                    pass
+            return atom
+
+        if workers is not None and workers > 1 and len(tasks) > 1 \
+                and is_parallel_import_supported():
+            for idx, name, blob, shipped, stats in absorb_files_in_workers(self, absorber, path, tasks,
+                                                                           use_mmap, workers):
+                if stats is not None:
+                    absorb_stats[name] = stats
+                if shipped and blob is not None:
+                    try:
+                        atoms[name] = packer.unpack(blob)
+                    except AtomPackingError:
+                        shipped = False
+                    else:
+                        if cache is not None:
+                            cache.store(cache_keys[name], blob)
+                if not shipped:
+                    atoms[name] = import_locally(idx, name)
+        else:
+            for idx, name in tasks:
+                atoms[name] = import_locally(idx, name)
+
+        if cache is not None and cache.hits:
+            print("--> {:d} files retrieved from the import cache".format(cache.hits))
+
+        self.import_throughput = {}
+        for name, (size, duration) in absorb_stats.items():
+            self.import_throughput[name] = size / (1024.0*1024*max(duration, 1e-6))
+        if absorb_stats:
+            total_size = sum(size for size, _ in absorb_stats.values())
+            total_duration = sum(duration for _, duration in absorb_stats.values())
+            print("--> {:d} files ({:d} bytes) absorbed at {:.2f} MB/s"
+                  .format(len(absorb_stats), total_size,
+                          total_size / (1024.0*1024*max(total_duration, 1e-6))))
+
+        msgs = {}
         for name in files:
-            with open(os.path.join(path, name), 'rb') as f:
-                buff = f.read()
-                d_abs = absorber(buff, idx, name)
-                if d_abs is not None:
-                    msgs[name] = d_abs
-            idx +=1
+            if atoms.get(name) is not None:
+                msgs[name] = atoms[name]
 
         return msgs
 
+    def _absorb_file(self, absorber, path, name, idx, use_mmap):
+        """
+        Returns:
+            tuple: ``(atom, (size, duration))``, where ``duration`` is the time spent
+            by the absorber on the ``size`` bytes of the file
+        """
+        with open(os.path.join(path, name), 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if use_mmap is None:
+                mapped = self.mmap_import_threshold is not None and \
+                         size >= max(1, self.mmap_import_threshold)
+            else:
+                mapped = use_mmap and size > 0
+
+            if mapped:
+                buff = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buff = f.read()
+
+            t0 = time.time()
+            d_abs = absorber(buff, idx, name)
+            duration = time.time() - t0
+
+            if mapped:
+                if d_abs is buff:
+                    d_abs = buff[:]
+                try:
+                    buff.close()
+                except BufferError:
+                    # a view on the mapping is still referenced, it will be
+                    # unmapped when garbage collected
+                    pass
+
+        return d_abs, (size, duration)
+
     def get_import_directory_path(self, subdir=None):
         if subdir is None:
             subdir = self.name
@@ -248,9 +385,11 @@ class NodeBackend(object):
 
         return atom.name, atom
 
-    def atom_copy(self, orig_atom, new_name=None):
+    def atom_copy(self, orig_atom, new_name=None, cow=False, serialization_cache=False):
         name = orig_atom.name if new_name is None else new_name
-        node = Node(name, base_node=orig_atom, ignore_frozen_state=False, new_env=True)
+        node = Node(name, base_node=orig_atom, ignore_frozen_state=False, new_env=True, cow=cow)
+        if serialization_cache and node.env is not None:
+            node.enable_serialization_cache()
         # self.update_knowledge_source(node)
         return node
 
@@ -25,7 +25,11 @@ import sys
 import os
 import re
 import math
+import time
 import threading
+import hashlib
+import zlib
+import collections
 from datetime import datetime
 
 import framework.global_resources as gr
@@ -50,18 +54,64 @@ def regexp_bin(expr, item):
     robj = reg.search(item)
     return robj is not None
 
+def payload_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+def compress_payload(content, compression):
+    if compression == 'zlib':
+        return zlib.compress(content)
+    elif compression == 'zstd':
+        return zstd.ZstdCompressor().compress(content)
+    else:
+        raise ValueError('unsupported compression: {!s}'.format(compression))
+
+def decompress_payload(content, compression):
+    if content is None or compression is None:
+        return content
+    elif compression == 'zlib':
+        return zlib.decompress(content)
+    elif compression == 'zstd':
+        if not zstd_module:
+            raise ValueError('the python zstandard module is required to decompress the payload')
+        return zstd.ZstdDecompressor().decompress(content)
+    else:
+        raise ValueError('unsupported compression: {!s}'.format(compression))
+
+
+def iter_feedback_entries(last_feedback, source=None):
+    if source is None:
+        for src, fbks in last_feedback.items():
+            for item in fbks:
+                status = item['status']
+                ts = item['timestamp']
+                content = item['content']
+                yield src, status, ts, content
+    else:
+        for item in last_feedback[source]:
+            status = item['status']
+            ts = item['timestamp']
+            content = item['content']
+            yield status, ts, content
+
 
 class FeedbackGate(object):
 
-    def __init__(self, database):
+    def __init__(self, database, last_feedback=None):
         """
         Args:
             database (Database): database to be associated with
+            last_feedback (dict): if not None, feedback entries to provide in place of the
+              last ones retrieved by the database (refer to :meth:`get_data_feedback`)
         """
         self.db = database
+        self._last_feedback = last_feedback
+
+    @property
+    def _feedback(self):
+        return self.db.last_feedback if self._last_feedback is None else self._last_feedback
 
     def __iter__(self):
-        for item in self.db.iter_last_feedback_entries():
+        for item in iter_feedback_entries(self._feedback):
             yield item
 
     def get_feedback_from(self, source):
@@ -69,12 +119,31 @@ class FeedbackGate(object):
             source = FeedbackSource(source)
 
         try:
-            fbk = self.db.last_feedback[source]
+            fbk = self._feedback[source]
         except KeyError:
             raise
         else:
             return fbk
 
+    def get_data_feedback(self, data_id):
+        """
+        Return a FeedbackGate restricted to the feedback entries related to the data
+        identified by `data_id` in the FmkDB (e.g., when several data have been sent together).
+        Contrary to this gate, it is not updated by the feedback retrieved afterwards.
+
+        Args:
+            data_id (int): FmkDB ID of the data
+
+        Returns:
+            FeedbackGate: the feedback of the data
+        """
+        last_feedback = {}
+        for src, fbks in self._feedback.items():
+            entries = [item for item in fbks if item['data_id'] == data_id]
+            if entries:
+                last_feedback[src] = entries
+        return FeedbackGate(self.db, last_feedback=last_feedback)
+
     def iter_entries(self, source=None):
         """
         Iterate over feedback entries that are related to the last data which has been sent by
@@ -91,7 +160,7 @@ class FeedbackGate(object):
                 - the 4-uplet: (source, status, timestamp, content) if `source` is `None`
 
         """
-        for item in self.db.iter_last_feedback_entries(source=source):
+        for item in iter_feedback_entries(self._feedback, source=source):
             yield item
 
     def sources_names(self):
@@ -103,15 +172,15 @@ class FeedbackGate(object):
             list: names of the feedback sources
 
         """
-        return [str(fs) for fs in self.db.last_feedback.keys()]
+        return [str(fs) for fs in self._feedback.keys()]
 
     # for python2 compatibility
     def __nonzero__(self):
-        return bool(self.db.last_feedback)
+        return bool(self._feedback)
 
     # for python3 compatibility
     def __bool__(self):
-        return bool(self.db.last_feedback)
+        return bool(self._feedback)
 
 
 class Database(object):
@@ -125,12 +194,76 @@ class Database(object):
     OUTCOME_ROWID = 1
     OUTCOME_DATA = 2
 
-    def __init__(self, fmkdb_path=None):
+    SYNCHRONOUS_MODES = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+    COMPRESSIONS = ['zlib', 'zstd']
+
+    # Number of payload hashes remembered in order to skip the insertion (and the compression)
+    # of the payloads already stored by this instance
+    KNOWN_PAYLOADS_MAX = 1024
+
+    # SQL statements upgrading a database created before the payloads were moved to their
+    # own table (the legacy contents are kept inline within the DATA table)
+    PAYLOADS_MIGRATION = [
+        '''
+        CREATE TABLE IF NOT EXISTS PAYLOADS (
+            HASH        TEXT PRIMARY KEY
+                             NOT NULL
+                             UNIQUE ON CONFLICT IGNORE,
+            COMPRESSION TEXT,
+            SIZE        INTEGER,
+            CONTENT     BLOB
+        );
+        ''',
+        'ALTER TABLE DATA ADD COLUMN PAYLOAD TEXT REFERENCES PAYLOADS (HASH);',
+        'CREATE INDEX IF NOT EXISTS DATA_PAYLOAD ON DATA (PAYLOAD);'
+    ]
+
+    def __init__(self, fmkdb_path=None, group_commit=False, max_batch_latency=0.1,
+                 wal=False, synchronous=None, compression=None, compression_threshold=65536):
+        '''
+        Args:
+            fmkdb_path (str): path to the database. If None, the default fmkDB.db
+              from the fuddly data folder is used.
+            group_commit (bool): if True, the SQL statements are not committed one by one, but
+              in batch (within one transaction), that is every SQL statements that have been
+              submitted while the previous batch was handled, and the ones that are submitted
+              during `max_batch_latency` seconds.
+            max_batch_latency (float): [used if group_commit is True] maximum amount of time
+              (in seconds) a submitted SQL statement could wait before being committed.
+            wal (bool): if True, the database is switched to write-ahead logging mode
+              (persistent setting of the database file).
+            synchronous (str): if not None, value of the sqlite3 pragma `synchronous`
+              (one of `Database.SYNCHRONOUS_MODES`). The 'NORMAL' mode is safe
+              and less costly than the default one when WAL is enabled.
+            compression (str): if not None, compression applied to the data contents
+              (one of `Database.COMPRESSIONS`). The contents are stored only once whatever the
+              number of data they are related to, and independently of this parameter.
+            compression_threshold (int): [used if compression is not None] minimum size
+              (in bytes) of the contents to compress.
+        '''
         self.name = 'fmkDB.db'
         if fmkdb_path is None:
             self.fmk_db_path = os.path.join(gr.fuddly_data_folder, self.name)
         else:
             self.fmk_db_path = fmkdb_path
+
+        if synchronous is not None and synchronous.upper() not in self.SYNCHRONOUS_MODES:
+            raise ValueError('synchronous mode should be one of {!s}'.format(self.SYNCHRONOUS_MODES))
+
+        self.group_commit = group_commit
+        self.max_batch_latency = max_batch_latency
+        self.wal = wal
+        self.synchronous = None if synchronous is None else synchronous.upper()
+
+        if compression is not None:
+            compression = compression.lower()
+            if compression not in self.COMPRESSIONS:
+                raise ValueError('compression should be one of {!s}'.format(self.COMPRESSIONS))
+            if compression == 'zstd' and not zstd_module:
+                raise ValueError('the zstd compression requires the python zstandard module')
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self._known_payloads = collections.OrderedDict()
         # self._con = None
         # self._cur = None
         self.enabled = False
@@ -171,7 +304,11 @@ class Database(object):
                 for t in tables:
                     cur.execute('select * from {!s}'.format(t))
                     ref_names = list(map(lambda x: x[0], cur.description))
-                    cursor.execute('select * from {!s}'.format(t))
+                    try:
+                        cursor.execute('select * from {!s}'.format(t))
+                    except sqlite3.Error:
+                        valid = False
+                        break
                     names = list(map(lambda x: x[0], cursor.description))
                     if ref_names != names:
                         valid = False
@@ -181,11 +318,27 @@ class Database(object):
 
         return valid
 
+    def _migrate(self, connection, cursor):
+        cursor.execute("PRAGMA table_info(DATA)")
+        columns = [x[1] for x in cursor.fetchall()]
+        if not columns or 'PAYLOAD' in columns:
+            return False
+        try:
+            with connection:
+                for stmt in self.PAYLOADS_MIGRATION:
+                    cursor.execute(stmt)
+        except sqlite3.Error as e:
+            print("\n*** ERROR[SQL:{:s}] while migrating the database!".format(e.args[0]))
+            return False
+        return True
+
     def _sql_handler(self):
         if os.path.isfile(self.fmk_db_path):
             connection = sqlite3.connect(self.fmk_db_path, detect_types=sqlite3.PARSE_DECLTYPES)
             cursor = connection.cursor()
             self._ok = self._is_valid(connection, cursor)
+            if not self._ok and self._migrate(connection, cursor):
+                self._ok = self._is_valid(connection, cursor)
         else:
             connection = sqlite3.connect(self.fmk_db_path, detect_types=sqlite3.PARSE_DECLTYPES)
             fmk_db_sql = open(gr.fmk_folder + self.DDL_fname).read()
@@ -195,6 +348,14 @@ class Database(object):
                 cursor.executescript(fmk_db_sql)
                 self._ok = True
 
+        if self._ok:
+            # data IDs are allocated locally, so that recording data never waits for sqlite
+            cursor.execute("SELECT MAX(ID) FROM DATA")
+            max_id = cursor.fetchone()[0]
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name == 'DATA'")
+            seq = cursor.fetchone()
+            self._data_id = max(max_id or 0, seq[0] if seq else 0)
+
         self._thread_initialized.set()
 
         if not self._ok:
@@ -202,17 +363,38 @@ class Database(object):
 
         connection.create_function("REGEXP", 2, regexp)
         connection.create_function("BINREGEXP", 2, regexp_bin)
+        connection.create_function("PAYLOAD_HASH", 1, payload_hash)
+
+        if self.wal:
+            connection.execute('PRAGMA journal_mode=WAL')
+        if self.synchronous is not None:
+            connection.execute('PRAGMA synchronous={:s}'.format(self.synchronous))
+
+        # If not None, time before which the current transaction shall be committed
+        commit_deadline = None
 
         while True:
 
             with self._sql_stmt_submitted_cond:
-                if self._sql_handler_stop_event.is_set() and not self._sql_stmt_list:
-                    break
-                self._sql_stmt_submitted_cond.wait(0.001)
+                while not self._sql_stmt_list and not self._sql_handler_stop_event.is_set():
+                    if commit_deadline is None:
+                        self._sql_stmt_submitted_cond.wait()
+                    else:
+                        timeout = commit_deadline - time.time()
+                        if timeout <= 0:
+                            break
+                        self._sql_stmt_submitted_cond.wait(timeout)
+
+                sql_stmts = self._sql_stmt_list
+                self._sql_stmt_list = []
 
-                if self._sql_stmt_list:
-                    sql_stmts = self._sql_stmt_list
-                    self._sql_stmt_list = []
+            if not sql_stmts:
+                # Either the batch latency has expired or the handler has to stop
+                if commit_deadline is not None:
+                    connection.commit()
+                    commit_deadline = None
+                if self._sql_handler_stop_event.is_set():
+                    break
                 else:
                     continue
 
@@ -224,14 +406,25 @@ class Database(object):
                         cursor.execute(sql_stmt)
                     else:
                         cursor.execute(sql_stmt, sql_params)
-                    connection.commit()
+                    if not self.group_commit:
+                        connection.commit()
                 except sqlite3.Error as e:
-                    connection.rollback()
+                    # In group commit mode, only the failing statement is aborted by sqlite,
+                    # the previous ones are kept within the current transaction.
+                    if not self.group_commit:
+                        connection.rollback()
                     print("\n*** ERROR[SQL:{:s}] ".format(e.args[0])+sql_error)
                     last_stmt_error = True
                 else:
                     last_stmt_error = False
 
+            if self.group_commit:
+                if self._sql_handler_stop_event.is_set() or self.max_batch_latency <= 0:
+                    connection.commit()
+                    commit_deadline = None
+                elif commit_deadline is None:
+                    commit_deadline = time.time() + self.max_batch_latency
+
             if outcome_type is not None:
                 with self._sql_stmt_outcome_lock:
                     if self._sql_stmt_outcome is not None:
@@ -250,14 +443,15 @@ class Database(object):
 
                 self._sql_stmt_handled.set()
 
-            self._sql_handler_stop_event.wait(0.001)
-
         if connection:
+            connection.commit()
             connection.close()
 
     def _stop_sql_handler(self):
         with self._sync_lock:
-            self._sql_handler_stop_event.set()
+            with self._sql_stmt_submitted_cond:
+                self._sql_handler_stop_event.set()
+                self._sql_stmt_submitted_cond.notify()
             self._sql_handler_thread.join()
 
 
@@ -276,6 +470,11 @@ class Database(object):
         Returns:
             `None` or the expected outcomes
         """
+        if self._sql_handler_thread is None or not self._sql_handler_thread.is_alive():
+            # Either the database is not started or we are within a forked process
+            # (e.g., a data pregeneration worker) where the SQL handler does not exist.
+            return None
+
         with self._sync_lock:
 
             with self._sql_stmt_submitted_cond:
@@ -359,24 +558,73 @@ class Database(object):
         if not self.enabled:
             return None
 
-        blob = sqlite3.Binary(raw_data)
+        h = self.insert_payload(raw_data)
+
+        self._data_id += 1
 
-        stmt = "INSERT INTO DATA(GROUP_ID,TYPE,DM_NAME,CONTENT,SIZE,SENT_DATE,ACK_DATE,"\
+        stmt = "INSERT INTO DATA(ID,GROUP_ID,TYPE,DM_NAME,PAYLOAD,SIZE,SENT_DATE,ACK_DATE,"\
                "TARGET,PRJ_NAME)"\
-               " VALUES(?,?,?,?,?,?,?,?,?)"
-        params = (group_id, dtype, dm_name, blob, sz, sent_date, ack_date, str(target_ref), prj_name)
+               " VALUES(?,?,?,?,?,?,?,?,?,?)"
+        params = (self._data_id, group_id, dtype, dm_name, h, sz, sent_date, ack_date,
+                  str(target_ref), prj_name)
         err_msg = 'while inserting a value into table DATA!'
-
-        if self._data_id is None:
-            d_id = self.submit_sql_stmt(stmt, params=params, outcome_type=Database.OUTCOME_ROWID,
-                                       error_msg=err_msg)
-            self._data_id = d_id
-        else:
-            self.submit_sql_stmt(stmt, params=params, error_msg=err_msg)
-            self._data_id += 1
+        self.submit_sql_stmt(stmt, params=params, error_msg=err_msg)
 
         return self._data_id
 
+    def insert_payload(self, raw_data):
+        """
+        Store a data content in the PAYLOADS table, if not already there.
+
+        Returns:
+            str: the hash identifying the content
+        """
+        h = payload_hash(raw_data)
+        if h in self._known_payloads:
+            return h
+
+        compression = None
+        if self.compression is not None and len(raw_data) >= self.compression_threshold:
+            compressed = compress_payload(raw_data, self.compression)
+            if len(compressed) < len(raw_data):
+                raw_data = compressed
+                compression = self.compression
+
+        stmt = "INSERT INTO PAYLOADS(HASH,COMPRESSION,SIZE,CONTENT) VALUES(?,?,?,?)"
+        params = (h, compression, len(raw_data), sqlite3.Binary(raw_data))
+        err_msg = 'while inserting a value into table PAYLOADS!'
+        self.submit_sql_stmt(stmt, params=params, error_msg=err_msg)
+
+        self._known_payloads[h] = True
+        if len(self._known_payloads) > self.KNOWN_PAYLOADS_MAX:
+            self._known_payloads.popitem(last=False)
+
+        return h
+
+    def fetch_payload(self, h):
+        ret = self.execute_sql_statement(
+            "SELECT CONTENT, COMPRESSION FROM PAYLOADS WHERE HASH == ?;",
+            params=(h,)
+        )
+        return decompress_payload(*ret[0]) if ret else None
+
+    def move_inline_contents(self):
+        """
+        Move the data contents stored within the DATA table (by previous fuddly versions) into
+        the PAYLOADS table, and then rebuild the database file in order to reclaim the freed
+        space. Not to be used in group commit mode.
+        """
+        self.execute_sql_statement(
+            "INSERT INTO PAYLOADS(HASH,COMPRESSION,SIZE,CONTENT) "
+            "SELECT PAYLOAD_HASH(CONTENT), NULL, LENGTH(CONTENT), CONTENT FROM DATA "
+            "WHERE CONTENT IS NOT NULL;"
+        )
+        self.execute_sql_statement(
+            "UPDATE DATA SET PAYLOAD = PAYLOAD_HASH(CONTENT), CONTENT = NULL "
+            "WHERE CONTENT IS NOT NULL;"
+        )
+        self.execute_sql_statement("VACUUM;")
+
 
     def insert_steps(self, data_id, step_id, dmaker_type, dmaker_name, data_id_src,
                      user_input, info):
@@ -405,7 +653,8 @@ class Database(object):
             {
                 'timestamp': timestamp,
                 'content': content,
-                'status': status_code
+                'status': status_code,
+                'data_id': data_id
             }
         )
 
@@ -425,20 +674,8 @@ class Database(object):
         self.submit_sql_stmt(stmt, params=params, error_msg=err_msg)
 
     def iter_last_feedback_entries(self, source=None):
-        last_fbk = self.last_feedback.items()
-        if source is None:
-            for src, fbks in last_fbk:
-                for item in fbks:
-                    status = item['status']
-                    ts = item['timestamp']
-                    content = item['content']
-                    yield src, status, ts, content
-        else:
-            for item in self.last_feedback[source]:
-                status = item['status']
-                ts = item['timestamp']
-                content = item['content']
-                yield status, ts, content
+        for item in iter_feedback_entries(self.last_feedback, source=source):
+            yield item
 
     def insert_comment(self, data_id, content, date):
         if not self.enabled:
@@ -476,20 +713,27 @@ class Database(object):
 
         stmt = \
             '''
-            SELECT DATA.ID, DATA.CONTENT, DATA.TYPE, DMAKERS.NAME, DATA.DM_NAME
+            SELECT DATA.ID, COALESCE(PAYLOADS.CONTENT, DATA.CONTENT), PAYLOADS.COMPRESSION,
+                   DATA.TYPE, DMAKERS.NAME, DATA.DM_NAME
             FROM DATA INNER JOIN DMAKERS
               ON DATA.TYPE = DMAKERS.TYPE AND DMAKERS.CLONE_TYPE IS NULL
+            LEFT JOIN PAYLOADS ON DATA.PAYLOAD = PAYLOADS.HASH
             WHERE DATA.ID >= {sid:d} {ign_eid:s} AND DATA.ID <= {eid:d}
             UNION ALL
-            SELECT DATA.ID, DATA.CONTENT, DMAKERS.CLONE_TYPE AS TYPE, DMAKERS.CLONE_NAME AS NAME,
-                   DATA.DM_NAME
+            SELECT DATA.ID, COALESCE(PAYLOADS.CONTENT, DATA.CONTENT), PAYLOADS.COMPRESSION,
+                   DMAKERS.CLONE_TYPE AS TYPE, DMAKERS.CLONE_NAME AS NAME, DATA.DM_NAME
             FROM DATA INNER JOIN DMAKERS
               ON DATA.TYPE = DMAKERS.TYPE AND DMAKERS.CLONE_TYPE IS NOT NULL
+            LEFT JOIN PAYLOADS ON DATA.PAYLOAD = PAYLOADS.HASH
             WHERE DATA.ID >= {sid:d} {ign_eid:s} AND DATA.ID <= {eid:d}
             '''.format(sid = start_id, eid = end_id, ign_eid = ign_end_id)
 
         ret = self.submit_sql_stmt(stmt, outcome_type=Database.OUTCOME_DATA)
-        return ret
+        if ret is None:
+            return None
+
+        return [(data_id, decompress_payload(content, compression), dtype, dmk_name, dm_name)
+                for data_id, content, compression, dtype, dmk_name, dm_name in ret]
 
 
     def _get_color_function(self, colorized):
@@ -526,7 +770,8 @@ class Database(object):
 
         prt = sys.stdout.write
 
-        data_id, gr_id, data_type, dm_name, data_content, size, sent_date, ack_date, tg, prj = data[0]
+        data_id, gr_id, data_type, dm_name, data_content, size, sent_date, ack_date, tg, prj, \
+            payload = data[0]
 
         steps = self.execute_sql_statement(
             "SELECT * FROM STEPS "
@@ -729,6 +974,8 @@ class Database(object):
         msg = ''
         if with_data:
             msg += colorize("\n Sent Data:\n", rgb=Color.FMKINFOGROUP)
+            if payload is not None:
+                data_content = self.fetch_payload(payload)
             data_content = gr.unconvert_from_internal_repr(data_content)
             data_content = self._handle_binary_content(data_content, sz_limit=limit_data_sz, raw=raw,
                                                        colorized=colorized)
@@ -888,13 +1135,15 @@ class Database(object):
 
         if last is not None:
             records = self.execute_sql_statement(
-                "SELECT ID, TYPE, DM_NAME, SENT_DATE, CONTENT FROM DATA "
+                "SELECT ID, TYPE, DM_NAME, SENT_DATE, COALESCE(PAYLOADS.CONTENT, DATA.CONTENT), "
+                "COMPRESSION FROM DATA LEFT JOIN PAYLOADS ON DATA.PAYLOAD = PAYLOADS.HASH "
                 "WHERE {start:d} <= ID and ID <= {end:d};".format(start=first,
                                                                   end=last)
             )
         else:
             records = self.execute_sql_statement(
-                "SELECT ID, TYPE, DM_NAME, SENT_DATE, CONTENT FROM DATA "
+                "SELECT ID, TYPE, DM_NAME, SENT_DATE, COALESCE(PAYLOADS.CONTENT, DATA.CONTENT), "
+                "COMPRESSION FROM DATA LEFT JOIN PAYLOADS ON DATA.PAYLOAD = PAYLOADS.HASH "
                 "WHERE ID == {data_id:d};".format(data_id=first)
             )
 
@@ -904,7 +1153,8 @@ class Database(object):
             export_cpt = 0
 
             for rec in records:
-                data_id, data_type, dm_name, sent_date, content = rec
+                data_id, data_type, dm_name, sent_date, content, compression = rec
+                content = decompress_payload(content, compression)
 
                 file_extension = dm_name
 
@@ -940,8 +1190,10 @@ class Database(object):
     def remove_data(self, data_id, colorized=True):
         colorize = self._get_color_function(colorized)
 
-        if not self.check_data_existence(data_id, colorized=colorized):
+        data = self.check_data_existence(data_id, colorized=colorized)
+        if not data:
             return
+        payload = data[0][-1]
 
         comments = self.execute_sql_statement(
             "DELETE FROM COMMENTS "
@@ -968,6 +1220,15 @@ class Database(object):
             "WHERE ID == {data_id:d};".format(data_id=data_id)
         )
 
+        if payload is not None:
+            # the payload is removed only if no other data refer to it
+            self.execute_sql_statement(
+                "DELETE FROM PAYLOADS "
+                "WHERE HASH == ? AND NOT EXISTS (SELECT 1 FROM DATA WHERE PAYLOAD == ?);",
+                params=(payload, payload)
+            )
+            self._known_payloads.pop(payload, None)
+
         print(colorize("*** Data {:d} and all related records have been removed ***".format(data_id),
                        rgb=Color.FMKINFO))
 
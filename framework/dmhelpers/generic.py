@@ -141,6 +141,9 @@ class MH(object):
 ### Generator Node Templates ###
 ################################
 
+# The generators returned by these templates are instances of local classes, which are
+# pickled (e.g., to be stored in the import cache) as a call to their template.
+
 
 def LEN(vt=fvt.INT_str, base_len=0,
         set_attrs=None, clear_attrs=None, after_encoding=True, freezable=False):
@@ -165,6 +168,10 @@ def LEN(vt=fvt.INT_str, base_len=0,
             self.set_attrs = set_attrs
             self.clear_attrs = clear_attrs
 
+        def __reduce__(self):
+            return LEN, (self.vt, base_len, self.set_attrs, self.clear_attrs,
+                         after_encoding, freezable), self.__dict__
+
         def __call__(self, node):
             blob = node.to_bytes() if after_encoding else node.get_raw_value()
             n = Node('cts', value_type=self.vt(values=[len(blob)+base_len], force_mode=True))
@@ -200,6 +207,10 @@ def QTY(node_name, vt=fvt.INT_str,
             self.set_attrs = set_attrs
             self.clear_attrs = clear_attrs
 
+        def __reduce__(self):
+            return QTY, (self.node_name, self.vt, self.set_attrs, self.clear_attrs,
+                         freezable), self.__dict__
+
         def __call__(self, node):
             nb = node.cc.get_drawn_node_qty(self.node_name)
             n = Node('cts', value_type=self.vt(values=[nb], force_mode=True))
@@ -275,6 +286,11 @@ def CRC(vt=fvt.INT_str, poly=0x104c11db7, init_crc=0, xor_out=0xFFFFFFFF, rev=Tr
             self.letter_case = letter_case
             self.reverse_str = reverse_str
 
+        def __reduce__(self):
+            return CRC, (self.vt, self.poly, self.init_crc, self.xor_out, self.rev,
+                         self.set_attrs, self.clear_attrs, after_encoding, freezable,
+                         self.base, self.letter_case, self.reverse_str), self.__dict__
+
         def __call__(self, nodes):
             crc_func = crcmod.mkCrcFun(self.poly, initCrc=self.init_crc,
                                        xorOut=self.xor_out, rev=self.rev)
@@ -337,6 +353,10 @@ def WRAP(func, vt=fvt.String,
             self.set_attrs = set_attrs
             self.clear_attrs = clear_attrs
 
+        def __reduce__(self):
+            return WRAP, (self.func, self.vt, self.set_attrs, self.clear_attrs,
+                          after_encoding, freezable), self.__dict__
+
         def __call__(self, nodes):
             if isinstance(nodes, Node):
                 s = nodes.to_bytes() if after_encoding else nodes.get_raw_value()
@@ -397,6 +417,9 @@ def CYCLE(vals, depth=1, vt=fvt.String,
             self.set_attrs = set_attrs
             self.clear_attrs = clear_attrs
 
+        def __reduce__(self):
+            return CYCLE, (self.vals, self.depth, self.vt, set_attrs, clear_attrs), self.__dict__
+
         def __call__(self, helper):
             info = helper.graph_info
             # print('INFO: ', info)
@@ -464,6 +487,10 @@ def OFFSET(use_current_position=True, depth=1, vt=fvt.INT_str,
             self.set_attrs = set_attrs
             self.clear_attrs = clear_attrs
 
+        def __reduce__(self):
+            return OFFSET, (self.use_current_position, self.depth, self.vt, set_attrs,
+                            clear_attrs, after_encoding, freezable), self.__dict__
+
         def __call__(self, nodes, helper):
             if self.use_current_position:
                 info = helper.graph_info
@@ -541,6 +568,10 @@ def COPY_VALUE(path, depth=None, vt=None,
             self.set_attrs = set_attrs
             self.clear_attrs = clear_attrs
 
+        def __reduce__(self):
+            return COPY_VALUE, (self.path, self.depth, self.vt, set_attrs, clear_attrs,
+                                after_encoding), self.__dict__
+
         def __call__(self, node, helper):
             if self.depth is not None:
                 info = helper.graph_info
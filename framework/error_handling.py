@@ -33,6 +33,7 @@ class ExtinctPopulationError(PopulationError): pass
 
 class DataModelDefinitionError(Exception): pass
 class ProjectDefinitionError(Exception): pass
+class AtomPackingError(Exception): pass
 
 class RegexParserError(DataModelDefinitionError): pass
 
@@ -22,12 +22,15 @@
 #
 ################################################################################
 
+import time
+import random
 from operator import attrgetter
 
 from framework.tactics_helpers import *
 from framework.scenario import *
-from framework.error_handling import ExtinctPopulationError, PopulationError
-
+from framework.corpus_import import AtomPacker
+from framework.pregeneration import is_pregeneration_supported, create_worker_pool
+from framework.error_handling import ExtinctPopulationError, PopulationError, AtomPackingError
 
 class Population(object):
     """ Population to be used within an evolutionary scenario """
@@ -52,6 +55,13 @@ class Population(object):
         self._individuals = []
         self.index = 0
 
+    def teardown(self):
+        """
+            Release the resources of the population
+            Called at the end of each evolutionary process
+        """
+        pass
+
     def evolve(self):
         """ Describe the evolutionary process """
         raise NotImplementedError
@@ -60,6 +70,12 @@ class Population(object):
         """ Check if the population can still evolve or not """
         raise NotImplementedError
 
+    def next_batch(self, size):
+        """ Provide the next individuals of the current generation (at most @size of them) """
+        batch = self._individuals[self.index:self.index+size]
+        self.index += len(batch)
+        return batch
+
     def __len__(self):
         return len(self._individuals)
 
@@ -110,10 +126,25 @@ class DefaultIndividual(Individual):
         self.node = data.content
 
 
+_population_job = None
+
+def _build_node_in_worker(task):
+    idx, seed, method, blob = task
+    population = _population_job
+    random.seed(seed)
+    try:
+        packer = AtomPacker(population._dm)
+        node = None if blob is None else packer.unpack(blob)
+        return idx, packer.pack(getattr(population, method)(idx, node)), True
+    except Exception:
+        # the node is built again by the evolving process, which will report the error
+        return idx, None, False
+
+
 class DefaultPopulation(Population):
     """ Provide a default implementation of the Population base class """
 
-    def _initialize(self, model, size=100, max_generation_nb=50):
+    def _initialize(self, model, size=100, max_generation_nb=50, workers=None):
         """
             Configure the population
 
@@ -121,30 +152,134 @@ class DefaultPopulation(Population):
                 model (string): individuals that compose this population will be built using this model
                 size (integer): size of the population to manipulate
                 max_generation_nb (integer): criteria used to stop the evolution process
+                workers (integer): if greater than 1, the individuals of a generation are
+                  created and mutated by this number of worker processes forked from fuddly
+                  when the population is reset (they live until :meth:`teardown` is called)
         """
         Population._initialize(self)
 
         self.MODEL = model
         self.SIZE = size
         self.MAX_GENERATION_NB = max_generation_nb
+        self.WORKERS = workers
 
         self.generation = None
+        # one dict per generation, providing its size and the durations (in seconds)
+        # of the steps that created it and of its evaluation
+        self.generation_stats = []
+        self._generation_start = None
+        self._pool = None
+        self._dm = None
 
     def reset(self):
         """ Generate the first generation of individuals in a random way """
         Population.reset(self)
+        self.teardown()
 
         self.generation = 1
-
-        # individuals initialization
-        for _ in range(0, self.SIZE):
-            data = self._fmk.get_data([self.MODEL])
-            if data is None:
-                raise PopulationError
-            node = data.content
-            node.make_random(recursive=True)
-            node.freeze()
-            self._individuals.append(DefaultIndividual(self._fmk, node))
+        self.generation_stats = []
+
+        t0 = time.time()
+        nodes = self._build_nodes('_create_node', [None] * self.SIZE)
+        self._individuals = [DefaultIndividual(self._fmk, node) for node in nodes]
+        self._record_generation_stats(creation=time.time() - t0)
+
+    def teardown(self):
+        """ Stop the worker processes """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self._dm = None
+
+    def _create_node(self, idx, node):
+        data = self._fmk.get_data([self.MODEL])
+        if data is None:
+            raise PopulationError
+        node = data.content
+        node.make_random(recursive=True)
+        node.freeze()
+        return node
+
+    def _mutate_node(self, idx, node):
+        individual = DefaultIndividual(self._fmk, node)
+        individual.mutate(3)
+        return individual.node
+
+    def _get_pool(self):
+        global _population_job
+        if self._pool is None:
+            # the workers inherit the population, its data model and the framework
+            _population_job = self
+            try:
+                self._pool = create_worker_pool(self.WORKERS)
+            finally:
+                _population_job = None
+        return self._pool
+
+    def _build_nodes(self, method, nodes):
+        """
+        Return the list of the nodes built by the method @method from each node of @nodes,
+        that is ``[method(0, nodes[0]), ...]``. Each node is built with its own seed drawn
+        from the random generator, so that the outcome does not depend on the number of
+        workers. If ``workers`` is set, the nodes are shipped to the worker processes, which
+        build them concurrently.
+        """
+        build = getattr(self, method)
+        nb = len(nodes)
+        seeds = [random.getrandbits(32) for _ in range(nb)]
+
+        def build_locally(idx):
+            state = random.getstate()
+            random.seed(seeds[idx])
+            try:
+                return build(idx, nodes[idx])
+            finally:
+                random.setstate(state)
+
+        if not self.WORKERS or self.WORKERS < 2 or nb < 2 or not is_pregeneration_supported():
+            return [build_locally(idx) for idx in range(nb)]
+
+        results = [None] * nb
+        start = 0
+        if self._dm is None:
+            # the data model needed to ship the nodes is taken from the first one
+            results[0] = build_locally(0)
+            start = 1
+            if results[0].env is not None:
+                self._dm = results[0].env.get_data_model()
+            if self._dm is None:
+                return [results[0]] + [build_locally(idx) for idx in range(1, nb)]
+
+        packer = AtomPacker(self._dm)
+        tasks = []
+        for idx in range(start, nb):
+            try:
+                blob = None if nodes[idx] is None else packer.pack(nodes[idx])
+            except AtomPackingError:
+                results[idx] = build_locally(idx)
+            else:
+                tasks.append((idx, seeds[idx], method, blob))
+
+        pool = self._get_pool()
+        chunksize = max(1, len(tasks) // (self.WORKERS * 4))
+        for idx, blob, shipped in pool.imap_unordered(_build_node_in_worker, tasks,
+                                                      chunksize=chunksize):
+            if shipped:
+                try:
+                    results[idx] = packer.unpack(blob)
+                except AtomPackingError:
+                    shipped = False
+            if not shipped:
+                results[idx] = build_locally(idx)
+
+        return results
+
+    def _record_generation_stats(self, **durations):
+        stats = {'generation': self.generation, 'size': len(self._individuals)}
+        stats.update(durations)
+        self.generation_stats.append(stats)
+        self._generation_start = time.time()
 
     def _compute_scores(self):
         """ Compute the scores of each individuals """
@@ -171,9 +306,9 @@ class DefaultPopulation(Population):
 
     def _mutate(self):
         """ Operates three bit flips on each individual """
-        for individual in self._individuals:
-            individual.mutate(3)
-            print(str(individual) + "mutated !!")
+        nodes = self._build_nodes('_mutate_node', [ind.node for ind in self._individuals])
+        for individual, node in zip(self._individuals, nodes):
+            individual.node = node
 
     def _crossover(self):
         """ Compensates the kills through the usage of the tCOMB disruptor """
@@ -202,14 +337,22 @@ class DefaultPopulation(Population):
         if len(self) < 2:
             raise ExtinctPopulationError()
 
-        self._compute_scores()
-        self._compute_probability_of_survival()
-        self._kill()
-        self._mutate()
-        self._crossover()
+        if self.generation_stats:
+            self.generation_stats[-1]['evaluation'] = time.time() - self._generation_start
+
+        durations = {}
+        for name, step in (('scores', self._compute_scores),
+                           ('survival', self._compute_probability_of_survival),
+                           ('kill', self._kill),
+                           ('mutation', self._mutate),
+                           ('crossover', self._crossover)):
+            t0 = time.time()
+            step()
+            durations[name] = time.time() - t0
 
         self.generation += 1
         self.index = 0
+        self._record_generation_stats(**durations)
 
     def is_final(self):
         return self.generation == self.MAX_GENERATION_NB
@@ -218,7 +361,7 @@ class DefaultPopulation(Population):
 class EvolutionaryScenariosFactory(object):
 
     @staticmethod
-    def build(fmk, name, population_cls, args):
+    def build(fmk, name, population_cls, args, burst=None):
         """
         Create a scenario that takes advantage of an evolutionary approach
         Args:
@@ -226,6 +369,11 @@ class EvolutionaryScenariosFactory(object):
             name (string): name of the scenario to create
             population_cls (classobj): population class to instantiate
             args (dict of str: object): arguments that will be used to instantiate a population
+            burst (integer): if set, the individuals are sent by batches of (at most) this
+              number of data, which are provided together to the targets (refer to
+              :meth:`Target.send_multiple_data`). A batch does not span several generations,
+              and each individual gets the feedback related to its own data (refer to
+              :meth:`FeedbackGate.get_data_feedback`).
 
         Returns:
             Scenario : evolutionary scenario
@@ -233,15 +381,53 @@ class EvolutionaryScenariosFactory(object):
 
         population = population_cls(fmk, **args)
 
-        def cbk_after(env, current_step, next_step, fbk):
-            print("Callback after")
+        if burst is None or burst < 2:
+            def cbk_after(env, current_step, next_step, fbk):
+                # set the feedback of the last played individual
+                population[population.index - 1].feedback = fbk
+                return True
+
+            step = Step(data_desc=DataProcess(process=[('POPULATION', UI(population=population))]))
+            step.connect_to(step, cbk_after_fbk=cbk_after)
+
+            return Scenario(name, anchor=step)
+
+        state = {'running': False, 'batch': []}
 
-            # set the feedback of the last played individual
-            population[population.index - 1].feedback = fbk
+        def cbk_before_data_processing(env, step):
+            if not state['running']:
+                population.reset()
+                state['running'] = True
 
+            batch = population.next_batch(burst)
+            if not batch and not population.is_final():
+                try:
+                    population.evolve()
+                except ExtinctPopulationError:
+                    pass
+                else:
+                    batch = population.next_batch(burst)
+
+            state['batch'] = batch
+            if batch:
+                step.data_desc = [Data(individual.node) for individual in batch]
+            else:
+                state['running'] = False
+                population.teardown()
+                step.final = True
+
+        def cbk_after(env, current_step, next_step, fbk):
+            # set to each individual of the last played batch the feedback of its own data
+            for individual, data in zip(state['batch'], current_step.data_desc):
+                individual.feedback = fbk.get_data_feedback(data.get_data_id())
             return True
 
-        step = Step(data_desc=DataProcess(process=[('POPULATION', UI(population=population))]))
+        def cleanup(env):
+            # the scenario may be interrupted before its end
+            state['running'] = False
+            population.teardown()
+
+        step = Step(data_desc=Data(), do_before_data_processing=cbk_before_data_processing)
         step.connect_to(step, cbk_after_fbk=cbk_after)
 
-        return Scenario(name, anchor=step)
+        return Scenario(name, anchor=step, do_cleanup=cleanup)
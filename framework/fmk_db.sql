@@ -42,6 +42,15 @@ CREATE TABLE DMAKERS (
     NAME)
 );
 
+CREATE TABLE PAYLOADS (
+    HASH        TEXT PRIMARY KEY
+                     NOT NULL
+                     UNIQUE ON CONFLICT IGNORE,
+    COMPRESSION TEXT,
+    SIZE        INTEGER,
+    CONTENT     BLOB
+);
+
 CREATE TABLE DATA (
     ID        INTEGER  PRIMARY KEY ASC AUTOINCREMENT,
     GROUP_ID  INTEGER,
@@ -52,9 +61,12 @@ CREATE TABLE DATA (
     SENT_DATE TIMESTAMP,
     ACK_DATE  TIMESTAMP,
     TARGET TEXT,
-    PRJ_NAME TEXT REFERENCES PROJECT (NAME)
+    PRJ_NAME TEXT REFERENCES PROJECT (NAME),
+    PAYLOAD   TEXT REFERENCES PAYLOADS (HASH)
 );
 
+CREATE INDEX DATA_PAYLOAD ON DATA (PAYLOAD);
+
 CREATE TABLE STEPS (
     DATA_ID     INTEGER REFERENCES DATA (ID),
     STEP_ID     INTEGER,
@@ -53,10 +53,19 @@ class ModelWalker(object):
     Note: the change of a non-terminal node does not reset the
     indirect parents (just the direct parent), otherwise it could lead
     to a combinatorial explosion, with limited interest...
+
+    The walk can be split in @nb_shards disjoint shards: the walker
+    then only yields the steps whose index modulo @nb_shards is equal to
+    @shard_id (step indexes start at 1). Besides, the current position
+    of the walk can be retrieved through :meth:`get_checkpoint` and
+    provided to a new walker (on the same model and with the same
+    consumer parameters) through @checkpoint, in order to resume the walk.
+    Note that the consumer state is rebuilt by walking again through the
+    previous steps, but they are not yielded.
     '''
 
     def __init__(self, root_node, node_consumer, make_determinist=False, make_random=False,
-                 max_steps=-1, initial_step=1):
+                 max_steps=-1, initial_step=1, shard_id=0, nb_shards=1, checkpoint=None):
         self._root_node = root_node
         self._root_node.make_finite(all_conf=True, recursive=True)
         
@@ -69,10 +78,22 @@ class ModelWalker(object):
 
         self._root_node.freeze()
 
+        if checkpoint is not None:
+            max_steps = checkpoint['max_steps']
+            initial_step = checkpoint['initial_step']
+            shard_id = checkpoint['shard_id']
+            nb_shards = checkpoint['nb_shards']
+
         self._max_steps = int(max_steps)
         self._initial_step = int(initial_step)
-        
+        self._shard_id = int(shard_id)
+        self._nb_shards = int(nb_shards)
+        self._resumed = checkpoint is not None
+        self._next_step = self._initial_step
+        self._completed = False
+
         assert(self._max_steps > 0 or self._max_steps == -1)
+        assert(self._nb_shards > 0 and 0 <= self._shard_id < self._nb_shards)
 
         self.ic = dm.NodeInternalsCriteria(mandatory_attrs=[dm.NodeInternals.Mutable, dm.NodeInternals.Finite])
         self.triglast_ic = dm.NodeInternalsCriteria(mandatory_custo=[dm.GenFuncCusto.TriggerLast])
@@ -86,27 +107,63 @@ class ModelWalker(object):
         self._consumer._root_node = self._root_node
 
 
+    def get_checkpoint(self):
+        '''
+        Return the parameters (as a dictionary) to provide to a new ModelWalker through
+        its @checkpoint parameter, in order to resume the walk just after the last yielded
+        step. If the walk is completed, None is returned.
+        '''
+        if self._completed:
+            return None
+
+        if self._max_steps == -1:
+            max_steps = -1
+        else:
+            max_steps = self._max_steps + self._initial_step - self._next_step
+            if max_steps <= 0:
+                return None
+
+        return {'initial_step': self._next_step, 'max_steps': max_steps,
+                'shard_id': self._shard_id, 'nb_shards': self._nb_shards}
+
+    @property
+    def last_step(self):
+        '''
+        Index of the last yielded step (or of the step preceding the initial one, if
+        no step has been yielded yet).
+        '''
+        return self._next_step - 1
+
+    def _in_shard(self, step):
+        return (step - 1) % self._nb_shards == self._shard_id
+
     def __iter__(self):
 
         self._cpt = 1
+        self._next_step = self._initial_step
+        self._completed = False
         gen = self.walk_graph_rec([self._root_node], structure_has_changed=False,
                                   consumed_nodes=set(), parent_node=self._root_node)
         for consumed_node, orig_node_val in gen:
             self._root_node.freeze()
 
-            if self._cpt >= self._initial_step:
-                self.consumed_node_path = consumed_node.get_path_from(self._root_node)
-                if self.consumed_node_path == None:
-                    # 'consumed_node_path' can be None if
-                    # consumed_node is not part of the frozen rnode
-                    # (it may however exist when rnode is not
-                    # frozen). This situation can trigger in some
-                    # specific situations related to the use of
-                    # existence conditions within a data model. Thus,
-                    # in this case we skip the just generated case as
-                    # nothing is visible.
-                    continue
-
+            consumed_node_path = consumed_node.get_path_from(self._root_node)
+            if consumed_node_path == None:
+                # 'consumed_node_path' can be None if
+                # consumed_node is not part of the frozen rnode
+                # (it may however exist when rnode is not
+                # frozen). This situation can trigger in some
+                # specific situations related to the use of
+                # existence conditions within a data model. Thus,
+                # in this case we skip the just generated case as
+                # nothing is visible. It is skipped whether the step is
+                # yielded or not, so that the steps are numbered the same
+                # way whatever the initial step and the shard.
+                continue
+
+            if self._cpt >= self._initial_step and self._in_shard(self._cpt):
+                self.consumed_node_path = consumed_node_path
+                self._next_step = self._cpt + 1
                 yield self._root_node, consumed_node, orig_node_val, self._cpt
 
             if self._max_steps != -1 and self._cpt >= (self._max_steps+self._initial_step-1):
@@ -115,7 +172,12 @@ class ModelWalker(object):
             else:
                 self._cpt += 1
 
-        if self._cpt <= self._initial_step and self._cpt > 1:
+        self._completed = True
+
+        # When resuming or sharding, yielding again the last step would break the
+        # partitioning of the walk
+        if self._cpt <= self._initial_step and self._cpt > 1 \
+                and not self._resumed and self._nb_shards == 1:
             print("\n*** DEBUG: initial_step idx ({:d}) is after" \
                       " the last idx ({:d})!\n".format(self._initial_step, self._cpt-1))
             self._initial_step = 1
@@ -812,10 +874,9 @@ class TypedNodeDisruption(NodeConsumerStub):
                 max_oset = max(orig_set)
                 min_oset = min(orig_set)
                 if min_oset != max_oset:
-                    diff_sorted = sorted(set(range(min_oset, max_oset+1)) - orig_set)
-                    if diff_sorted:
-                        item1 = diff_sorted[0]
-                        item2 = diff_sorted[-1]
+                    holes = missing_values_extrems(orig_set)
+                    if holes is not None:
+                        item1, item2 = holes
                         if item1 not in supp_list:
                             supp_list.append(item1)
                         if item2 not in supp_list:
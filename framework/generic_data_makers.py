@@ -82,6 +82,10 @@ class g_population(Generator):
 
         return data
 
+    def cleanup(self, fmkops):
+        if self.population is not None:
+            self.population.teardown()
+
 
 #######################
 # STATEFUL DISRUPTORS #
@@ -124,7 +128,8 @@ class sd_iter_over_data(StatefulDisruptor):
         else:
             consumer = BasicVisitor(respect_order=self.order)
         consumer.set_node_interest(path_regexp=self.path)
-        self.modelwalker = ModelWalker(prev_content, consumer, max_steps=self.max_steps, initial_step=self.init)
+        self.modelwalker = ModelWalker(prev_content, consumer, max_steps=self.max_steps, initial_step=self.init,
+                                       shard_id=self.shard, nb_shards=self.nb_shards)
         self.walker = iter(self.modelwalker)
 
 
@@ -199,7 +204,8 @@ class sd_fuzz_typed_nodes(StatefulDisruptor):
                                             enforce_determinism=self.determinism)
         self.consumer.need_reset_when_structure_change = self.deep
         self.consumer.set_node_interest(path_regexp=self.path)
-        self.modelwalker = ModelWalker(prev_content, self.consumer, max_steps=self.max_steps, initial_step=self.init)
+        self.modelwalker = ModelWalker(prev_content, self.consumer, max_steps=self.max_steps, initial_step=self.init,
+                                       shard_id=self.shard, nb_shards=self.nb_shards)
         self.walker = iter(self.modelwalker)
 
         self.max_runs = None
@@ -303,7 +309,8 @@ class sd_switch_to_alternate_conf(StatefulDisruptor):
                                         min_runs_per_node=self.min_runs_per_node,
                                         respect_order=False)
         self.consumer.set_node_interest(owned_confs=self.confs_list)
-        self.modelwalker = ModelWalker(prev_content, self.consumer, max_steps=self.max_steps, initial_step=self.init)
+        self.modelwalker = ModelWalker(prev_content, self.consumer, max_steps=self.max_steps, initial_step=self.init,
+                                       shard_id=self.shard, nb_shards=self.nb_shards)
         self.walker = iter(self.modelwalker)
 
         self.max_runs = None
@@ -382,7 +389,8 @@ class sd_fuzz_separator_nodes(StatefulDisruptor):
                                             separators=sep_list)
         self.consumer.need_reset_when_structure_change = self.deep
         self.consumer.set_node_interest(path_regexp=self.path)
-        self.modelwalker = ModelWalker(prev_content, self.consumer, max_steps=self.max_steps, initial_step=self.init)
+        self.modelwalker = ModelWalker(prev_content, self.consumer, max_steps=self.max_steps, initial_step=self.init,
+                                       shard_id=self.shard, nb_shards=self.nb_shards)
         self.walker = iter(self.modelwalker)
 
         self.max_runs = None
@@ -473,27 +481,21 @@ class sd_struct_constraints(StatefulDisruptor):
         # print('\n*** FILTERED nodes')
         # for n in self.exist_cst_nodelist:
         #     print(' |_ ' + n.name)
-        nodelist = copy.copy(self.exist_cst_nodelist)
-        for n in nodelist:
-            if n.get_path_from(self.seed) is None:
-                self.exist_cst_nodelist.remove(n)
+        self.exist_cst_nodelist = [n for n in self.exist_cst_nodelist
+                                   if n.get_path_from(self.seed) is not None]
 
         self.qty_cst_nodelist_1 = self.seed.get_reachable_nodes(internals_criteria=ic_qty_cst, path_regexp=self.path,
                                                                 ignore_fstate=True)
         # self.qty_cst_nodelist_1 = self.seed.filter_out_entangled_nodes(self.qty_cst_nodelist_1)
-        nodelist = copy.copy(self.qty_cst_nodelist_1)
-        for n in nodelist:
-            if n.get_path_from(self.seed) is None:
-                self.qty_cst_nodelist_1.remove(n)
+        self.qty_cst_nodelist_1 = [n for n in self.qty_cst_nodelist_1
+                                   if n.get_path_from(self.seed) is not None]
 
         self.qty_cst_nodelist_2 = copy.copy(self.qty_cst_nodelist_1)
 
         self.size_cst_nodelist_1 = self.seed.get_reachable_nodes(internals_criteria=ic_size_cst, path_regexp=self.path,
                                                                ignore_fstate=True)
-        nodelist = copy.copy(self.size_cst_nodelist_1)
-        for n in nodelist:
-            if n.get_path_from(self.seed) is None:
-                self.size_cst_nodelist_1.remove(n)
+        self.size_cst_nodelist_1 = [n for n in self.size_cst_nodelist_1
+                                    if n.get_path_from(self.seed) is not None]
         self.size_cst_nodelist_2 = copy.copy(self.size_cst_nodelist_1)
 
         if self.deep:
@@ -662,58 +664,57 @@ class sd_crossover(SwapperDisruptor):
             self.node = node
 
             self.leafs = []
+            self._nodes = {}
+            self._children = {}
 
             for path, node in self.node.iter_paths():
-                if node.is_term() and path not in self.leafs:
+                if path in self._nodes:
+                    # same node used more than once within the same non-terminal
+                    continue
+                self._nodes[path] = node
+                parent_path, _, _ = path.rpartition('/')
+                if parent_path in self._children:
+                    self._children[parent_path].append(path)
+                else:
+                    self._children[parent_path] = [path]
+                if node.is_term():
                     self.leafs.append(path)
 
             self.shared = None
 
+        def get_node_by_path(self, path):
+            return self._nodes.get(path)
+
         def compute_sub_graphs(self, percentage):
             random.shuffle(self.leafs)
-            self.shared = self.leafs[:int(round(len(self.leafs) * percentage))]
-            self.shared.sort()
-
-            change = True
-            while change:
-
-                change = False
-                index = 0
-                length = len(self.shared)
-
-                while index < length:
-
-                    current_path = self.shared[index]
-
-                    slash_index = current_path[::-1].find('/')
-
-                    # check if we are dealing with the root node
-                    if slash_index == -1:
-                        index += 1
-                        continue
-
-                    parent_path = current_path[:-current_path[::-1].find('/') - 1]
-                    children_nb = self._count_brothers(index, parent_path)
-                    if children_nb == self.node.get_node_by_path(parent_path).cc.get_subnode_qty():
-                        self._merge_brothers(index, parent_path, children_nb)
-                        change = True
-                        index += 1
-                        length = len(self.shared)
-                    else:
-                        index += children_nb
-
-        def _count_brothers(self, index, pattern):
-            count = 1
-            p = re.compile(u'^' + pattern + '($|/*)')
-            for i in range(index + 1, len(self.shared)):
-                if re.match(p, self.shared[i]) is not None:
-                    count += 1
-            return count
-
-        def _merge_brothers(self, index, pattern, length):
-            for _ in range(0, length, 1):
-                del self.shared[index]
-            self.shared.insert(index, pattern)
+            shared = set(self.leafs[:int(round(len(self.leafs) * percentage))])
+
+            # When all the children of a node are shared, the node is shared in
+            # place of them. The graph is processed from the deepest paths.
+            by_depth = {}
+            for path in shared:
+                depth = path.count('/')
+                if depth in by_depth:
+                    by_depth[depth].append(path)
+                else:
+                    by_depth[depth] = [path]
+
+            for depth in range(max(by_depth) if by_depth else 0, 0, -1):
+                counts = {}
+                for path in by_depth.get(depth, ()):
+                    parent_path = path.rpartition('/')[0]
+                    counts[parent_path] = counts.get(parent_path, 0) + 1
+                for parent_path, nb in counts.items():
+                    children = self._children[parent_path]
+                    if nb == len(children):
+                        shared.difference_update(children)
+                        shared.add(parent_path)
+                        if depth - 1 in by_depth:
+                            by_depth[depth - 1].append(parent_path)
+                        else:
+                            by_depth[depth - 1] = [parent_path]
+
+            self.shared = sorted(shared)
 
     def setup(self, dm, user_input):
         if self.percentage_to_share is None:
@@ -743,8 +744,8 @@ class sd_crossover(SwapperDisruptor):
         swap_nb = len(source.shared) if len(source.shared) < len(param.shared) else len(param.shared)
 
         for i in range(swap_nb):
-            node_1 = source.node.get_node_by_path(path=source.shared[i])
-            node_2 = param.node.get_node_by_path(path=param.shared[i])
+            node_1 = source.get_node_by_path(source.shared[i])
+            node_2 = param.get_node_by_path(param.shared[i])
             self._swap_nodes(node_1, node_2)
 
 
@@ -51,6 +51,8 @@ exported_data_folder = fuddly_data_folder + 'exported_data' + os.sep
 ensure_dir(exported_data_folder)
 imported_data_folder = fuddly_data_folder + 'imported_data' + os.sep
 ensure_dir(imported_data_folder)
+import_cache_folder = fuddly_data_folder + 'import_cache' + os.sep
+ensure_dir(import_cache_folder)
 logs_folder = fuddly_data_folder + 'logs' + os.sep
 ensure_dir(logs_folder)
 workspace_folder = fuddly_data_folder + 'workspace' + os.sep
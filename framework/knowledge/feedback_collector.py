@@ -28,11 +28,12 @@ import collections
 
 class FeedbackSource(object):
 
-    def __init__(self, src, subref=None, reliability=None, related_tg=None):
+    def __init__(self, src, subref=None, reliability=None, related_tg=None, data_id=None):
         self._name = str(src) if subref is None else str(src) + ' - ' + str(subref)
         self._obj = src
         self._reliability = reliability
         self._related_tg = related_tg
+        self._data_id = data_id
 
     def __str__(self):
         return self._name
@@ -51,6 +52,10 @@ class FeedbackSource(object):
     def related_tg(self):
         return self._related_tg
 
+    @property
+    def data_id(self):
+        return self._data_id
+
 
 class FeedbackCollector(object):
     fbk_lock = threading.Lock()
@@ -61,17 +66,19 @@ class FeedbackCollector(object):
         self._feedback_collector_tstamped = collections.OrderedDict()
         self._tstamped_bstring = None
 
-    def add_fbk_from(self, ref, fbk, status=0):
+    def add_fbk_from(self, ref, fbk, status=0, data_id=None):
         now = datetime.datetime.now()
         with self.fbk_lock:
-            if ref not in self._feedback_collector:
-                self._feedback_collector[ref] = {}
-                self._feedback_collector[ref]['data'] = []
-                self._feedback_collector[ref]['status'] = 0
-                self._feedback_collector_tstamped[ref] = []
-            self._feedback_collector[ref]['data'].append(fbk)
-            self._feedback_collector[ref]['status'] = status
-            self._feedback_collector_tstamped[ref].append(now)
+            # the feedback of different data is kept apart even if it comes from the same source
+            key = (ref, data_id)
+            if key not in self._feedback_collector:
+                self._feedback_collector[key] = {}
+                self._feedback_collector[key]['data'] = []
+                self._feedback_collector[key]['status'] = 0
+                self._feedback_collector_tstamped[key] = []
+            self._feedback_collector[key]['data'].append(fbk)
+            self._feedback_collector[key]['status'] = status
+            self._feedback_collector_tstamped[key].append(now)
 
     def has_fbk_collector(self):
         return len(self._feedback_collector) > 0
@@ -80,17 +87,33 @@ class FeedbackCollector(object):
         with self.fbk_lock:
             fbk_collector = copy.copy(self._feedback_collector)
             fbk_collector_ts = copy.copy(self._feedback_collector_tstamped)
-        for ref, fbk in fbk_collector.items():
-            yield ref, fbk['data'], fbk['status'], fbk_collector_ts[ref]
-
-    def iter_and_cleanup_collector(self):
+        for key, fbk in fbk_collector.items():
+            yield key[0], fbk['data'], fbk['status'], fbk_collector_ts[key]
+
+    def iter_and_cleanup_collector(self, with_data_id=False):
+        '''
+        Iterate over the collected feedback and remove it from the collector.
+
+        Args:
+            with_data_id (bool): if `True`, the FmkDB ID of the data each feedback is
+              related to (or `None` if the target has not provided it) is appended to
+              the yielded tuples
+
+        Returns:
+            generator: 4-uplets (ref, contents, status, timestamps), or 5-uplets if
+            `with_data_id` is `True`
+        '''
         with self.fbk_lock:
             fbk_collector = self._feedback_collector
             fbk_collector_ts = self._feedback_collector_tstamped
             self._feedback_collector = collections.OrderedDict()
             self._feedback_collector_tstamped = collections.OrderedDict()
-        for ref, fbk in fbk_collector.items():
-            yield ref, fbk['data'], fbk['status'], fbk_collector_ts[ref]
+        for key, fbk in fbk_collector.items():
+            ref, data_id = key
+            if with_data_id:
+                yield ref, fbk['data'], fbk['status'], fbk_collector_ts[key], data_id
+            else:
+                yield ref, fbk['data'], fbk['status'], fbk_collector_ts[key]
 
     def set_error_code(self, err_code):
         self._err_code = err_code
@@ -26,6 +26,9 @@ import sys
 import datetime
 import threading
 import itertools
+import traceback
+
+from six.moves import queue
 
 from libs.external_modules import *
 from libs.utils import get_caller_object
@@ -47,7 +50,7 @@ class Logger(object):
 
     def __init__(self, name=None, prefix='', export_data=False, explicit_data_recording=False,
                  export_orig=True, export_raw_data=True, console_display_limit=800,
-                 enable_file_logging=False):
+                 enable_file_logging=False, async_output=False, output_queue_size=10000):
         '''
         Args:
           name (str): Name to be used in the log filenames. If not specified, the name of the project
@@ -66,6 +69,13 @@ class Logger(object):
             If this threshold is overrun, the message to print on the console will be truncated.
           prefix (str): prefix to use for printing on the console.
           enable_file_logging (bool): If True, file logging will be enabled.
+          async_output (bool): If True, the console and file outputs are formatted and written
+            in batch by a background thread, so that they do not delay the sending of the next data.
+            :meth:`Logger.flush` waits for the pending outputs.
+          output_queue_size (int): [used if async_output is True] maximum number of pending
+            outputs. When it is reached, the outputs that are only displayed on the console
+            are dropped (and counted in `dropped_outputs`), while the other ones wait for the
+            background thread.
         '''
         self.name = name
         self.p = prefix
@@ -82,6 +92,13 @@ class Logger(object):
         self._enable_file_logging = enable_file_logging
         self._fd = None
 
+        self._async_output = async_output
+        self._output_queue_size = output_queue_size
+        self._output_queue = None
+        self._output_thread = None
+        self._defer_flush = False
+        self.dropped_outputs = 0
+
         self._tg_fbk = []
         self._tg_fbk_lck = threading.Lock()
 
@@ -157,7 +174,8 @@ class Logger(object):
                     self._fd.write('\n')
                     if verbose and issubclass(x.__class__, Data):
                         x.show(log_func=self._fd.write)
-                    self._fd.flush()
+                    if not self._defer_flush:
+                        self._fd.flush()
                 except ValueError:
                     self.print_console('\n*** ERROR: The log file has been closed.' \
                                        ' (Maybe because the Logger has been stopped and has not been restarted yet.)',
@@ -171,10 +189,16 @@ class Logger(object):
             # No file logging
             pass
 
+        if self._async_output and self.name is not None:
+            self._start_output_thread()
+
         self.print_console('*** Logger is started ***\n', nl_before=False, rgb=Color.COMPONENT_START)
 
     def stop(self):
 
+        if self._output_thread is not None:
+            self._stop_output_thread()
+
         if self._fd:
             self._fd.close()
 
@@ -186,6 +210,94 @@ class Logger(object):
         self.print_console('*** Logger is stopped ***\n', nl_before=False, rgb=Color.COMPONENT_STOP)
 
 
+    def _start_output_thread(self):
+        self.dropped_outputs = 0
+        self._output_queue = queue.Queue(maxsize=self._output_queue_size)
+        sync_log_fn = self.log_fn
+
+        def async_log_fn(x, nl_before=True, nl_after=False, rgb=None, style=None, verbose=False,
+                         do_record=True):
+            if verbose and issubclass(x.__class__, Data):
+                # the data is walked through, which cannot be done concurrently
+                self.flush()
+                return sync_log_fn(x, nl_before=nl_before, nl_after=nl_after, rgb=rgb,
+                                   style=style, verbose=verbose, do_record=do_record)
+            if issubclass(x.__class__, Data):
+                x = x.to_bytes()
+                rgb = None
+                style = None
+            droppable = self._fd is None or not do_record
+            self._submit_output(sync_log_fn, (x,),
+                                {'nl_before': nl_before, 'nl_after': nl_after, 'rgb': rgb,
+                                 'style': style, 'do_record': do_record},
+                                droppable=droppable)
+            return x
+
+        self._sync_log_fn = sync_log_fn
+        self.log_fn = async_log_fn
+        self._output_thread = threading.Thread(None, self._handle_outputs, 'logger_output')
+        self._output_thread.daemon = True
+        self._output_thread.start()
+
+    def _stop_output_thread(self):
+        self._output_queue.put(None)
+        self._output_thread.join()
+        self._output_thread = None
+        self.log_fn = self._sync_log_fn
+        if self.dropped_outputs:
+            self._print_console('*** {:d} console outputs have been dropped ***\n'
+                                .format(self.dropped_outputs),
+                                nl_before=False, rgb=Color.WARNING)
+
+    def _submit_output(self, func, args, kwargs, droppable=False):
+        if droppable:
+            try:
+                self._output_queue.put_nowait((func, args, kwargs))
+            except queue.Full:
+                self.dropped_outputs += 1
+        else:
+            self._output_queue.put((func, args, kwargs))
+
+    def _handle_outputs(self):
+        stop = False
+        while not stop:
+            batch = [self._output_queue.get()]
+            try:
+                while True:
+                    batch.append(self._output_queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            self._defer_flush = True
+            for item in batch:
+                if item is None:
+                    stop = True
+                    continue
+                func, args, kwargs = item
+                try:
+                    func(*args, **kwargs)
+                except Exception:
+                    traceback.print_exc(file=sys.stdout)
+            self._defer_flush = False
+
+            sys.stdout.flush()
+            try:
+                if self._fd:
+                    self._fd.flush()
+            except ValueError:
+                pass
+
+            for _ in batch:
+                self._output_queue.task_done()
+
+    def flush(self):
+        """
+        Wait until the pending outputs have been written (if `async_output` is enabled).
+        """
+        if self._output_thread is not None and \
+                threading.current_thread() is not self._output_thread:
+            self._output_queue.join()
+
     def reset_current_state(self):
         self._current_data = None
         self._current_group_id = None
@@ -204,10 +316,11 @@ class Logger(object):
             dm = self._current_data.get_data_model()
             dm_name = Database.DEFAULT_DM_NAME if dm is None else dm.name
             self._current_group_id = group_id
+            raw_data = self._current_data.to_bytes()
 
             for tg_ref, ack_date in self._current_ack_dates.items():
                 last_data_id = self.fmkDB.insert_data(init_dmaker, dm_name,
-                                                           self._current_data.to_bytes(),
+                                                           raw_data,
                                                            self._current_size,
                                                            self._current_sent_date,
                                                            ack_date,
@@ -316,7 +429,9 @@ class Logger(object):
 
         if record:
             assert isinstance(source, FeedbackSource)
-            if source.related_tg is not None:
+            if source.data_id is not None:
+                data_id = source.data_id
+            elif source.related_tg is not None:
                 try:
                     data_id = self._last_data_IDs[source.related_tg]
                 except KeyError:
@@ -626,6 +741,22 @@ class Logger(object):
     def print_console(self, msg, nl_before=True, nl_after=False, rgb=None, style=None,
                       raw_limit=None, limit_output=True):
 
+        if self._output_thread is not None and \
+                threading.current_thread() is not self._output_thread:
+            if isinstance(msg, Data):
+                msg = repr(msg)
+            self._submit_output(self._print_console, (msg,),
+                                {'nl_before': nl_before, 'nl_after': nl_after, 'rgb': rgb,
+                                 'style': style, 'raw_limit': raw_limit,
+                                 'limit_output': limit_output},
+                                droppable=True)
+        else:
+            self._print_console(msg, nl_before=nl_before, nl_after=nl_after, rgb=rgb,
+                                style=style, raw_limit=raw_limit, limit_output=limit_output)
+
+    def _print_console(self, msg, nl_before=True, nl_after=False, rgb=None, style=None,
+                       raw_limit=None, limit_output=True):
+
         if raw_limit is None:
             raw_limit = self._console_display_limit
 
@@ -653,4 +784,5 @@ class Logger(object):
         sys.stdout.write(style + prefix)
         sys.stdout.write(msg)
         sys.stdout.write(suffix + FontStyle.END)
-        sys.stdout.flush()
+        if not self._defer_flush:
+            sys.stdout.flush()
@@ -22,6 +22,12 @@
 ################################################################################
 
 
+import collections
+import heapq
+import itertools
+import os
+import random
+import socket
 import threading
 import datetime
 import time
@@ -35,35 +41,201 @@ from framework.global_resources import *
 import framework.error_handling as eh
 
 
+class ProbeScheduler(object):
+    """
+    Run the probes on a shared pool of worker threads. The periodic executions of
+    the probes are planned by a single timer thread, and the worker threads are
+    only created when all the existing ones are busy.
+    """
+
+    def __init__(self, max_workers=None):
+        """
+        Args:
+            max_workers (int): maximum number of worker threads. If None, the pool may grow up
+              to the number of probes that use the scheduler (plus one for the timer
+              callbacks). As the jobs of a probe are run one after another, a probe then never
+              waits for a worker because other probes block (e.g., blocking probes waiting
+              for the target, or probes reading a slow backend). Otherwise, a probe is delayed
+              as long as `max_workers` jobs of other probes are running.
+        """
+        self.max_workers = max_workers
+        self._nb_probes = 0
+        self._lock = threading.Lock()
+        self._jobs_cond = threading.Condition(self._lock)
+        self._timer_cond = threading.Condition(self._lock)
+        self._jobs = collections.deque()
+        self._timers = []
+        self._timer_seq = itertools.count()
+        self._timer_thread = None
+        self._nb_workers = 0
+        self._idle_workers = 0
+
+    @property
+    def nb_workers(self):
+        return self._nb_workers
+
+    def register_probe(self):
+        """ To be called once by each probe that uses the scheduler """
+        with self._lock:
+            self._nb_probes += 1
+
+    def _get_workers_limit(self):
+        if self.max_workers is None:
+            return self._nb_probes + 1
+        return self.max_workers
+
+    def submit(self, func):
+        with self._lock:
+            self._submit(func)
+
+    def call_later(self, delay, func):
+        with self._lock:
+            heapq.heappush(self._timers, (time.time() + delay, next(self._timer_seq), func))
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._timer_loop, name='ProbeTimer')
+                self._timer_thread.daemon = True
+                self._timer_thread.start()
+            self._timer_cond.notify()
+
+    def _submit(self, func):
+        # to be called with self._lock held
+        self._jobs.append(func)
+        if self._idle_workers > 0:
+            self._jobs_cond.notify()
+        elif self._nb_workers < self._get_workers_limit():
+            self._nb_workers += 1
+            worker = threading.Thread(target=self._worker_loop,
+                                      name='ProbeWorker-{:d}'.format(self._nb_workers))
+            worker.daemon = True
+            worker.start()
+
+    def _worker_loop(self):
+        while True:
+            with self._lock:
+                while not self._jobs:
+                    self._idle_workers += 1
+                    self._jobs_cond.wait()
+                    self._idle_workers -= 1
+                func = self._jobs.popleft()
+            try:
+                func()
+            except:
+                print('\nException in the probe scheduler:')
+                print('-'*60)
+                traceback.print_exc(file=sys.stdout)
+                print('-'*60)
+
+    def _timer_loop(self):
+        with self._lock:
+            while True:
+                if not self._timers:
+                    self._timer_cond.wait()
+                    continue
+                remaining = self._timers[0][0] - time.time()
+                if remaining > 0:
+                    self._timer_cond.wait(remaining)
+                    continue
+                _, _, func = heapq.heappop(self._timers)
+                self._submit(func)
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def get_default_probe_scheduler():
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = ProbeScheduler()
+        return _default_scheduler
+
+
+class ProbeLatencyStats(object):
+    """
+    Execution statistics of a probe. The lag is the time elapsed between the moment an
+    execution of the probe is due (end of its delay, or framework notification for
+    blocking probes) and the moment it actually starts.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def record(self, lag, duration):
+        self.executions += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+    @property
+    def avg_duration(self):
+        return self.total_duration / self.executions if self.executions else 0.0
+
+    @property
+    def avg_lag(self):
+        return self.total_lag / self.executions if self.executions else 0.0
+
+    def __str__(self):
+        return 'executions: {:d}, duration: {:.4f}s avg / {:.4f}s max, ' \
+               'lag: {:.4f}s avg / {:.4f}s max'.format(self.executions, self.avg_duration,
+                                                       self.max_duration, self.avg_lag,
+                                                       self.max_lag)
+
+
 class ProbeUser(object):
     timeout = 5.0
     probe_init_timeout = 10.0
 
-    def __init__(self, probe):
+    def __init__(self, probe, scheduler=None):
         self._probe = probe
-        self._thread = None
+        self._scheduler = get_default_probe_scheduler() if scheduler is None else scheduler
+        self._scheduler.register_probe()
+        self._cond = threading.Condition()
         self._started_event = threading.Event()
         self._stop_event = threading.Event()
+        self._alive = False
+        self._generation = 0
+        self._args = None
+        self._kwargs = None
+        self._jobs = collections.deque()
+        self._job_running = False
+        self._latency_stats = ProbeLatencyStats()
 
     @property
     def probe(self):
         return self._probe
 
+    @property
+    def latency_stats(self):
+        return self._latency_stats
+
     def start(self, *args, **kwargs):
         if self.is_alive():
             raise RuntimeError
         self._clear()
-        self._thread = threading.Thread(target=self._run, name=self._probe.__class__.__name__,
-                                        args=args, kwargs=kwargs)
-        self._thread.daemon = True
-        self._thread.start()
+        self._args = args
+        self._kwargs = kwargs
+        self._latency_stats = ProbeLatencyStats()
+        with self._cond:
+            self._alive = True
+            self._generation += 1
+        self._submit(self._do_start)
 
     def stop(self):
-        self._stop_event.set()
+        self._set(self._stop_event)
+        self._submit(self._do_stop, self._generation)
 
     def join(self, timeout=None):
         if self.is_alive():
-            self._thread.join(ProbeUser.timeout if timeout is None else timeout)
+            timeout = ProbeUser.timeout if timeout is None else timeout
+            with self._cond:
+                deadline = time.time() + timeout
+                while self._alive and time.time() < deadline:
+                    self._cond.wait(deadline - time.time())
 
             if self.is_alive():
                 raise ProbeTimeoutError(self._probe.__class__.__name__, timeout, ["start()", "arm()", "main()", "stop()"])
@@ -82,7 +254,7 @@ class ProbeUser(object):
         # restarted (currently in launch_operator, after having started the operator).
 
     def is_alive(self):
-        return self._thread is not None and self._thread.is_alive()
+        return self._alive
 
     def is_stuck(self):
         """
@@ -105,58 +277,105 @@ class ProbeUser(object):
         return self._probe.status
 
     def _notify_probe_started(self):
-        self._started_event.set()
+        self._set(self._started_event)
 
     def _go_on(self):
         return not self._stop_event.is_set()
 
-    def _wait(self, delay):
-        self._stop_event.wait(delay)
+    def _set(self, event):
+        with self._cond:
+            event.set()
+            self._cond.notify_all()
 
     def _wait_for_probe(self, event, timeout=None):
         """
         Wait for the probe to trigger a specific event
         """
         timeout = ProbeUser.timeout if timeout is None else timeout
-        start = datetime.datetime.now()
+        deadline = time.time() + timeout
 
-        while not event.is_set():
-            if (datetime.datetime.now() - start).total_seconds() >= timeout:
-                self.stop()
-                raise ProbeTimeoutError(self._probe.__class__.__name__, timeout)
-            if not self.is_alive() or not self._go_on():
-                break
-            event.wait(1)
+        with self._cond:
+            while not event.is_set():
+                if time.time() >= deadline:
+                    break
+                if not self.is_alive() or not self._go_on():
+                    return
+                self._cond.wait(deadline - time.time())
+
+        if not event.is_set():
+            self.stop()
+            raise ProbeTimeoutError(self._probe.__class__.__name__, timeout)
 
     def _clear(self):
         """ Clear all events """
         self._started_event.clear()
         self._stop_event.clear()
 
-    def _run(self, *args, **kwargs):
+    def _submit(self, job, *args):
+        # The jobs of a probe are run one after another, in the order they are submitted.
+        with self._cond:
+            self._jobs.append((job, args))
+            if self._job_running:
+                return
+            self._job_running = True
+        self._scheduler.submit(self._run_jobs)
+
+    def _run_jobs(self):
+        while True:
+            with self._cond:
+                if not self._jobs:
+                    self._job_running = False
+                    return
+                job, args = self._jobs.popleft()
+            job(*args)
+
+    def _call_probe(self, method, context, due_time=None):
+        """
+        Returns:
+            bool: False if the probe raised an exception, which terminates it
+        """
+        t0 = time.time()
         try:
-            status = self._probe._start(*args, **kwargs)
+            ret = method(*self._args, **self._kwargs)
         except:
-            self._handle_exception('during start()')
-            return
-
-        if status is not None:
-            self._probe.status = status
-
-        self._notify_probe_started()
+            self._handle_exception(context)
+            self._terminate()
+            return False
+        if due_time is not None:
+            self._latency_stats.record(max(0.0, t0 - due_time), time.time() - t0)
+        if ret is not None:
+            self._probe.status = ret
+        return True
 
-        while self._go_on():
-            try:
-                self._probe.status = self._probe.main(*args, **kwargs)
-            except:
-                self._handle_exception('during main()')
-                return
-            self._wait(self._probe.delay)
+    def _terminate(self):
+        with self._cond:
+            self._alive = False
+            self._cond.notify_all()
+
+    def _do_start(self):
+        if self._call_probe(self._probe._start, 'during start()'):
+            self._notify_probe_started()
+            self._schedule_main(self._generation, 0)
+
+    def _do_stop(self, generation):
+        if generation == self._generation and self.is_alive():
+            self._call_probe(self._probe._stop, 'during stop()')
+            self._terminate()
+
+    def _schedule_main(self, generation, delay):
+        due_time = time.time() + delay
+        if delay > 0:
+            self._scheduler.call_later(delay, lambda: self._submit(self._do_main, generation,
+                                                                   due_time))
+        else:
+            self._submit(self._do_main, generation, due_time)
 
-        try:
-            self._probe._stop(*args, **kwargs)
-        except:
-            self._handle_exception('during stop()')
+    def _do_main(self, generation, due_time):
+        if generation != self._generation or not self.is_alive() or not self._go_on():
+            return
+        if self._call_probe(self._probe.main, 'during main()', due_time=due_time):
+            if self._go_on():
+                self._schedule_main(generation, self._probe.delay)
 
     def _handle_exception(self, context):
         probe_name = self._probe.__class__.__name__
@@ -168,17 +387,26 @@ class ProbeUser(object):
 
 
 class BlockingProbeUser(ProbeUser):
+    """
+    The arm() and main() methods of a blocking probe are run on the probe scheduler
+    as soon as the framework notifies the related events.
+    """
 
-    def __init__(self, probe, after_target_feedback_retrieval):
-        ProbeUser.__init__(self, probe)
+    IDLE = 0
+    ARMING = 1
+    ARMED = 2
+    RUNNING = 3
+
+    def __init__(self, probe, after_target_feedback_retrieval, scheduler=None):
+        ProbeUser.__init__(self, probe, scheduler=scheduler)
 
         self._after_target_feedback_retrieval = after_target_feedback_retrieval
 
-        self._continue_event = threading.Event()
+        self._state = self.IDLE
+        self._blocking_requested = None
+        self._error_notified = False
 
-        self._arm_event = threading.Event()
         self._armed_event = threading.Event()
-        self._blocking_event = threading.Event()
         self._probe_status_event = threading.Event()
 
     @property
@@ -186,12 +414,19 @@ class BlockingProbeUser(ProbeUser):
         return self._after_target_feedback_retrieval
 
     def stop(self):
+        with self._cond:
+            if self._state == self.ARMED:
+                self._state = self.IDLE
+                self._notify_status_retrieved()
         ProbeUser.stop(self)
-        self._continue_event.set()
 
     def notify_data_ready(self):
-        self._arm_event.set()
-
+        with self._cond:
+            if not self.is_alive() or not self._go_on() or self._state != self.IDLE:
+                return
+            self._state = self.ARMING
+            self._error_notified = False
+        self._submit(self._do_arm, self._generation)
 
     def wait_until_armed(self, timeout=None):
         try:
@@ -214,102 +449,72 @@ class BlockingProbeUser(ProbeUser):
             self._probe_status_event.clear()
 
     def notify_blocking(self):
-        self._blocking_event.set()
+        with self._cond:
+            if self._blocking_requested is None:
+                self._blocking_requested = time.time()
+            if self._state != self.ARMED:
+                # main() will be run once the probe is armed
+                return
+            self._state = self.RUNNING
+        self._submit(self._do_main, self._generation, None)
 
     def notify_error(self):
         """ Informs the probe of an error """
-        self._continue_event.set()
+        with self._cond:
+            if self._state == self.ARMING:
+                self._error_notified = True
+            elif self._state == self.ARMED:
+                self._state = self.IDLE
+                self._blocking_requested = None
+                self._notify_status_retrieved()
 
     def _clear(self):
         ProbeUser._clear(self)
-        self._arm_event.clear()
+        self._state = self.IDLE
+        self._blocking_requested = None
+        self._error_notified = False
         self._armed_event.clear()
-        self._blocking_event.clear()
-        self._continue_event.clear()
         self._probe_status_event.clear()
 
-    def _wait_for_data_ready(self):
-        """
-        Wait on a request to arm
-
-        Returns:
-            bool: True if the arm event happened, False if a stop was asked
-              or an error was signaled
-        """
-        while not self._arm_event.is_set():
-            if not self._go_on():
-                return False
-            self._arm_event.wait(1)
-
-        self._arm_event.clear()
-        self._continue_event.clear()
-        return True
-
     def _notify_armed(self):
-        self._armed_event.set()
-
-    def _wait_for_fmk_sync(self):
-        """
-        Wait on a blocking event: data sent or timeout
-
-        Returns:
-            bool: True if the blocking event happened, False if a stop was
-              asked or an error was signaled
-        """
-        timeout_appended = True
-        while not self._blocking_event.is_set():
-            if self._continue_event.is_set() or not self._go_on():
-                self._notify_status_retrieved()
-                timeout_appended = False
-                break
-            self._blocking_event.wait(1)
-        self._blocking_event.clear()
-        return timeout_appended
+        self._set(self._armed_event)
 
     def _notify_status_retrieved(self):
-        self._probe_status_event.set()
-
-    def _run(self, *args, **kwargs):
-        try:
-            status = self._probe._start(*args, **kwargs)
-        except:
-            self._handle_exception('during start()')
-            return
-
-        if status is not None:
-            self._probe.status = status
+        self._set(self._probe_status_event)
 
-        self._notify_probe_started()
-
-        while self._go_on():
-
-            if not self._wait_for_data_ready():
-                continue
-
-            try:
-                self._probe.arm(*args, **kwargs)
-            except:
-                self._handle_exception('during arm()')
-                return
+    def _do_start(self):
+        if self._call_probe(self._probe._start, 'during start()'):
+            self._notify_probe_started()
 
+    def _do_arm(self, generation):
+        if generation != self._generation or not self.is_alive() or not self._go_on():
+            return
+        if not self._call_probe(self._probe.arm, 'during arm()'):
+            return
+        with self._cond:
             self._notify_armed()
-
-            if not self._wait_for_fmk_sync():
-                continue
-
-            try:
-                self._probe.status = self._probe.main(*args, **kwargs)
-            except:
-                self._handle_exception('during main()')
+            if self._error_notified or not self._go_on():
+                self._state = self.IDLE
+                self._blocking_requested = None
+                self._notify_status_retrieved()
                 return
+            elif self._blocking_requested is None:
+                self._state = self.ARMED
+                return
+            self._state = self.RUNNING
+        self._do_main(generation, None)
 
+    def _do_main(self, generation, due_time):
+        if generation != self._generation or not self.is_alive():
+            return
+        if not self._call_probe(self._probe.main, 'during main()',
+                                due_time=self._blocking_requested):
+            return
+        with self._cond:
+            self._state = self.IDLE
+            self._blocking_requested = None
             self._notify_status_retrieved()
 
-        try:
-            self._probe._stop(*args, **kwargs)
-        except:
-            self._handle_exception('during stop()')
-
 
 class Monitor(object):
     def __init__(self):
@@ -320,6 +525,7 @@ class Monitor(object):
         self._dm = None
         self.probe_users = {}
         self._tg_from_probe = {}
+        self.scheduler = ProbeScheduler()
 
         self.__enable = True
 
@@ -340,9 +546,10 @@ class Monitor(object):
             raise AddExistingProbeToMonitorError(probe.__class__.__name__)
 
         if blocking:
-            self.probe_users[probe.__class__.__name__] = BlockingProbeUser(probe, after_target_feedback_retrieval)
+            self.probe_users[probe.__class__.__name__] = BlockingProbeUser(probe, after_target_feedback_retrieval,
+                                                                           scheduler=self.scheduler)
         else:
-            self.probe_users[probe.__class__.__name__] = ProbeUser(probe)
+            self.probe_users[probe.__class__.__name__] = ProbeUser(probe, scheduler=self.scheduler)
 
     def start(self):
         self._logger.print_console('*** Monitor is started ***\n', nl_before=False, rgb=Color.COMPONENT_START)
@@ -423,6 +630,9 @@ class Monitor(object):
     def set_probe_delay(self, probe, delay):
         return self.probe_users[self._get_probe_ref(probe)].set_probe_delay(delay)
 
+    def get_probe_latency_stats(self, probe):
+        return self.probe_users[self._get_probe_ref(probe)].latency_stats
+
     def is_probe_launched(self, probe):
         return self.probe_users[self._get_probe_ref(probe)].is_alive()
 
@@ -671,7 +881,90 @@ class ProbeStatus(object):
         return self._now
 
 
+class _CommandRequest(object):
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.result = None
+        self.done = False
+
+
+class _ShellSession(object):
+    """
+    Run batches of commands through a persistent shell. The commands of a batch are sent
+    in one go, and the output and error streams of each command are delimited by markers,
+    so that only one round-trip is needed for the whole batch.
+    """
+
+    cmd_template = "printf '%s\\n' '{m:s}:S:{i:d}'\n" \
+                   "{{ __fuddly_err=$( {{ {cmd:s}\n}} </dev/null 2>&1 >&3 3>&-); }} 3>&1\n" \
+                   "printf '\\n%s\\n%s\\n%s\\n' '{m:s}:E:{i:d}' \"$__fuddly_err\" '{m:s}:D:{i:d}'\n"
+
+    def __init__(self, write, read, codec, cmd_notfound=None):
+        """
+        Args:
+            write (func): function that writes bytes to the shell input.
+            read (func): function that takes a timeout and returns the bytes available on the
+              shell output (empty if it is closed, None if the timeout expired).
+            codec (str): codec used by the shell.
+            cmd_notfound (bytes): if not None, pattern used to detect, within the error stream
+              of a command, that the command does not exist on the system.
+        """
+        self._write = write
+        self._read = read
+        self._codec = codec
+        self._cmd_notfound = cmd_notfound
+        self._marker = 'FUDDLY_{:016x}'.format(random.getrandbits(64))
+
+    def run(self, cmds, timeout=None):
+        """
+        Returns:
+            list: for each command, its output (bytes) or a :class:`BackendError` if the
+            command wrote on its error stream.
+        """
+        script = ''.join([self.cmd_template.format(m=self._marker, i=i, cmd=cmd)
+                          for i, cmd in enumerate(cmds)])
+        self._write(script.encode(self._codec))
+
+        last_marker = '\n{:s}:D:{:d}\n'.format(self._marker, len(cmds) - 1).encode(self._codec)
+        deadline = None if timeout is None else time.time() + timeout
+        buff = b''
+        while last_marker not in buff:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            chunk = self._read(remaining)
+            if chunk is None:
+                raise BackendError('Timeout while waiting for the result of the commands')
+            elif not chunk:
+                raise BackendError('The shell has been closed')
+            buff += chunk
+
+        results = []
+        for i in range(len(cmds)):
+            m = '{:s}:{{:s}}:{:d}'.format(self._marker, i)
+            start = buff.index((m.format('S') + '\n').encode(self._codec))
+            start += len(m.format('S')) + 1
+            end = buff.index(('\n' + m.format('E') + '\n').encode(self._codec), start)
+            err_start = end + len(m.format('E')) + 2
+            err_end = buff.index(('\n' + m.format('D') + '\n').encode(self._codec), err_start)
+            err = buff[err_start:err_end]
+            if self._cmd_notfound is not None and err.find(self._cmd_notfound) != -1:
+                results.append(BackendError('The command does not exist on the host'))
+            elif err.strip():
+                results.append(BackendError('ERROR: {!s}'.format(err)))
+            else:
+                results.append(buff[start:end])
+        return results
+
+
 class Backend(object):
+    """
+    Backend used by the probes to execute commands on the monitored system.
+
+    If `batching` is True, the commands submitted concurrently (e.g., by several probes) while
+    the backend is busy are executed together through :meth:`_exec_commands`.
+    """
+
+    batching = False
 
     def __init__(self, codec='latin_1'):
         """
@@ -681,6 +974,10 @@ class Backend(object):
         self._started = False
         self.codec = codec
         self._sync_lock = threading.Lock()
+        self._batch_cond = threading.Condition()
+        self._batch_queue = []
+        self._batch_in_progress = False
+        self.round_trips = 0
 
     def start(self):
         with self._sync_lock:
@@ -695,12 +992,58 @@ class Backend(object):
                 self._stop()
 
     def exec_command(self, cmd):
-        with self._sync_lock:
-            return self._exec_command(cmd)
+        if not self.batching:
+            with self._sync_lock:
+                self.round_trips += 1
+                return self._exec_command(cmd)
+
+        req = _CommandRequest(cmd)
+        with self._batch_cond:
+            self._batch_queue.append(req)
+            while self._batch_in_progress and not req.done:
+                self._batch_cond.wait()
+            if req.done:
+                batch = None
+            else:
+                self._batch_in_progress = True
+                batch, self._batch_queue = self._batch_queue, []
+
+        if batch is not None:
+            try:
+                with self._sync_lock:
+                    self.round_trips += 1
+                    results = self._exec_commands([r.cmd for r in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            with self._batch_cond:
+                for r, res in zip(batch, results):
+                    r.result = res
+                    r.done = True
+                self._batch_in_progress = False
+                self._batch_cond.notify_all()
+
+        if isinstance(req.result, Exception):
+            raise req.result
+        return req.result
 
     def _exec_command(self, cmd):
         raise NotImplementedError
 
+    def _exec_commands(self, cmds):
+        """
+        Execute several commands in a row.
+
+        Returns:
+            list: for each command, its result or the :class:`BackendError` it raised.
+        """
+        results = []
+        for cmd in cmds:
+            try:
+                results.append(self._exec_command(cmd))
+            except BackendError as e:
+                results.append(e)
+        return results
+
     def _start(self):
         pass
 
@@ -712,7 +1055,8 @@ class SSH_Backend(Backend):
     """
     Backend to execute command through a serial line.
     """
-    def __init__(self, username, password, sshd_ip, sshd_port=22, codec='latin_1'):
+    def __init__(self, username, password, sshd_ip, sshd_port=22, codec='latin_1',
+                 persistent=False, timeout=None, cmd_notfound=b'not found'):
         """
         Args:
             sshd_ip (str): IP of the SSH server.
@@ -720,6 +1064,14 @@ class SSH_Backend(Backend):
             username (str): username to connect with.
             password (str): password related to the username.
             codec (str): codec used by the monitored system to answer.
+            persistent (bool): if True, the commands are executed by a shell that runs for the
+              whole monitoring session, and the commands submitted concurrently by the probes
+              are sent together, instead of opening an SSH channel for each command.
+            timeout (float): only relevant in `persistent` mode. Timeout in seconds for reading
+              the results of the commands.
+            cmd_notfound (bytes): only relevant in `persistent` mode. Pattern used to detect,
+              within the error stream of a command, that the command does not exist on the host.
+              Other errors are reported with the error stream of the command.
         """
         Backend.__init__(self, codec=codec)
         if not ssh_module:
@@ -729,6 +1081,11 @@ class SSH_Backend(Backend):
         self.username = username
         self.password = password
         self.client = None
+        self.batching = persistent
+        self._timeout = timeout
+        self.cmd_notfound = cmd_notfound
+        self._channel = None
+        self._session = None
 
     def _start(self):
         self.client = ssh.SSHClient()
@@ -738,9 +1095,47 @@ class SSH_Backend(Backend):
                             password=self.password)
 
     def _stop(self):
+        self._close_session()
         self.client.close()
 
+    def _open_session(self):
+        self._channel = self.client.get_transport().open_session()
+        self._channel.exec_command('/bin/sh')
+        self._session = _ShellSession(self._channel.sendall, self._recv, self.codec,
+                                      cmd_notfound=self.cmd_notfound)
+
+    def _close_session(self):
+        if self._channel is not None:
+            self._channel.close()
+        self._channel = None
+        self._session = None
+
+    def _recv(self, timeout):
+        self._channel.settimeout(timeout)
+        try:
+            return self._channel.recv(65536)
+        except socket.timeout:
+            return None
+
+    def _exec_commands(self, cmds):
+        if not self.batching:
+            return Backend._exec_commands(self, cmds)
+        if self._session is None:
+            self._open_session()
+        try:
+            return self._session.run(cmds, timeout=self._timeout)
+        except (BackendError, socket.error, ssh.SSHException):
+            # the shell is not in a known state anymore
+            self._close_session()
+            raise BackendError('Unable to execute the commands through the SSH shell')
+
     def _exec_command(self, cmd):
+        if self.batching:
+            res = self._exec_commands([cmd])[0]
+            if isinstance(res, BackendError):
+                raise res
+            return res
+
         ssh_in, ssh_out, ssh_err = \
             self.client.exec_command(cmd)
 
@@ -751,14 +1146,148 @@ class SSH_Backend(Backend):
             return ssh_out.read()
 
 
-class Serial_Backend(Backend):
+class PromptReader(object):
+    """
+    Read a stream until the received data end with an expected pattern (e.g., a shell
+    prompt), so that an answer is returned as soon as it is complete.
+    """
+
+    def __init__(self, read):
+        """
+        Args:
+            read (func): function that returns the available bytes, or an empty bytes
+              object if nothing has been received within a short period.
+        """
+        self._read = read
+
+    def read_until(self, pattern, timeout, start_after=None):
+        """
+        Args:
+            pattern: compiled regexp (bytes) to search for at the end of the received data.
+            timeout (float): maximum time to wait for the pattern.
+            start_after (bytes): if not None, the pattern is only searched after the first
+              occurrence of these bytes (e.g., the echo of a command).
+
+        Returns:
+            tuple: the received data, and the match object (None if the timeout expired)
+        """
+        deadline = time.time() + timeout
+        buff = b''
+        while True:
+            if start_after is None:
+                offset = 0
+            else:
+                offset = buff.find(start_after)
+                offset = None if offset == -1 else offset + len(start_after)
+            if offset is not None:
+                match = pattern.search(buff, offset)
+                if match is not None:
+                    return buff, match
+            if time.time() >= deadline:
+                return buff, None
+            buff += self._read()
+
+
+class Console_Backend(Backend):
+    """
+    Base class of the backends interacting with a shell through a console (serial line,
+    pseudo-terminal, ...), where commands are echoed back.
+
+    If a `prompt` is provided, the answer of a command is read until the prompt shows up
+    again, instead of during a fixed duration depending on the `slowness_factor`, which
+    then only sets the maximum time to wait for.
+    """
+
+    password_prompt = re.compile(b'(?i)password: *\\Z')
+
+    def __init__(self, username=None, password=None, slowness_factor=5,
+                 cmd_notfound=b'command not found', codec='latin_1', prompt=None,
+                 eol=b'\r\n'):
+        """
+        Args:
+            username (str): username to connect with. If None, no authentication step will be attempted.
+            password (str): password related to the username.
+            slowness_factor (int): characterize the slowness of the monitored system. The scale goes from
+              1 (fastest) to 10 (slowest).
+            cmd_notfound (bytes): pattern used to detect if the command does not exist on the
+              monitored system.
+            codec (str): codec used to send/receive information through the console
+            prompt (bytes): regular expression matching the shell prompt (or any other
+              terminator written by the monitored system after the answer of a command),
+              e.g. ``b'\\$ '``.
+            eol (bytes): end of line sent after each command.
+        """
+        Backend.__init__(self, codec=codec)
+        self.slowness_factor = slowness_factor
+        self.cmd_notfound = cmd_notfound
+        if sys.version_info[0] > 2 and username is not None:
+            self.username = bytes(username, self.codec)
+            self.password = bytes(password, self.codec)
+        else:
+            self.username = username
+            self.password = password
+        if prompt is not None and not isinstance(prompt, bytes):
+            prompt = prompt.encode(self.codec)
+        self.prompt = None if prompt is None else re.compile(b'(?:' + prompt + b') *\\Z')
+        self.eol = eol
+        self._reader = PromptReader(self._read_available)
+
+    def _write(self, data):
+        raise NotImplementedError
+
+    def _read_available(self):
+        raise NotImplementedError
+
+    def _flush_input(self):
+        pass
+
+    def _login_with_prompt(self):
+        for attempt in range(2):
+            self._flush_input()
+            self._write(self.username + self.eol)
+            _, match = self._reader.read_until(self.password_prompt,
+                                               timeout=self.slowness_factor*0.4)
+            if match is not None:
+                break
+            # we send an EOT if ever the console was not in its initial state
+            # (already logged, or with the password prompt, ...)
+            self._write(b'\x04' + self.eol)
+            self._reader.read_until(self.prompt, timeout=self.slowness_factor*0.4)
+        else:
+            raise BackendError('Unable to establish a connection with the console.')
+
+        self._write(self.password + self.eol)
+        _, match = self._reader.read_until(self.prompt, timeout=self.slowness_factor*1.5)
+        if match is None:
+            raise BackendError('Unable to log in through the console.')
+
+    def _exec_command_with_prompt(self, cmd):
+        if sys.version_info[0] > 2:
+            cmd = bytes(cmd, self.codec)
+        self._flush_input()
+        self._write(cmd + self.eol)
+        # The prompt is searched after the end of the echo of the command, which is the first
+        # end of line, as the terminal may rewrap the echo of long commands (e.g., by inserting
+        # '\r'), so that it does not always match the command.
+        data, match = self._reader.read_until(self.prompt, timeout=self.slowness_factor*0.8,
+                                              start_after=b'\n')
+        if match is None:
+            raise BackendError('Timeout while waiting for the prompt')
+        # we remove the echo of the command and the prompt
+        ret = data[data.find(b'\n')+1:match.start()]
+        if ret.find(self.cmd_notfound) != -1:
+            raise BackendError('The command does not exist on the host')
+        return ret
+
+
+class Serial_Backend(Console_Backend):
     """
     Backend to execute command through a serial line.
     """
     def __init__(self, serial_port, baudrate=115200, bytesize=8, parity='N', stopbits=1,
                  xonxoff=False, rtscts=False, dsrdtr=False,
                  username=None, password=None, slowness_factor=5,
-                 cmd_notfound=b'command not found', codec='latin_1'):
+                 cmd_notfound=b'command not found', codec='latin_1', prompt=None):
         """
         Args:
             serial_port (str): path to the tty device file. (e.g., '/dev/ttyUSB0')
@@ -778,8 +1307,13 @@ class Serial_Backend(Backend):
             cmd_notfound (bytes): pattern used to detect if the command does not exist on the
               monitored system.
             codec (str): codec used to send/receive information through the serial line
+            prompt (bytes): regular expression matching the shell prompt. If provided, the
+              login and the commands return as soon as the prompt is received (refer to
+              :class:`Console_Backend`).
         """
-        Backend.__init__(self, codec=codec)
+        Console_Backend.__init__(self, username=username, password=password,
+                                 slowness_factor=slowness_factor, cmd_notfound=cmd_notfound,
+                                 codec=codec, prompt=prompt)
         if not serial_module:
             raise eh.UnavailablePythonModule('Python module for Serial is not available!')
 
@@ -791,14 +1325,6 @@ class Serial_Backend(Backend):
         self.xonxoff = xonxoff
         self.rtscts = rtscts
         self.dsrdtr = dsrdtr
-        self.slowness_factor = slowness_factor
-        self.cmd_notfound = cmd_notfound
-        if sys.version_info[0] > 2:
-            self.username = bytes(username, self.codec)
-            self.password = bytes(password, self.codec)
-        else:
-            self.username = username
-            self.password = password
 
         self.client = None
 
@@ -807,7 +1333,10 @@ class Serial_Backend(Backend):
                                  parity=self.parity, stopbits=self.stopbits,
                                  xonxoff=self.xonxoff, dsrdtr=self.dsrdtr, rtscts=self.rtscts,
                                  timeout=self.slowness_factor*0.1)
-        if self.username is not None:
+        if self.username is not None and self.prompt is not None:
+            assert self.password is not None
+            self._login_with_prompt()
+        elif self.username is not None:
             assert self.password is not None
             self.ser.flushInput()
             self.ser.write(self.username+b'\r\n')
@@ -845,10 +1374,25 @@ class Serial_Backend(Backend):
         self.ser.write(b'\x04\r\n') # we send an EOT (Ctrl+D)
         self.ser.close()
 
+    def _write(self, data):
+        self.ser.write(data)
+
+    def _read_available(self):
+        try:
+            return self.ser.read(max(1, self.ser.in_waiting))
+        except serial.SerialException:
+            raise BackendError('Exception while reading serial line')
+
+    def _flush_input(self):
+        self.ser.flushInput()
+
     def _exec_command(self, cmd):
         if not self.ser.is_open:
             raise BackendError('Serial port not open')
 
+        if self.prompt is not None:
+            return self._exec_command_with_prompt(cmd)
+
         if sys.version_info[0] > 2:
             cmd = bytes(cmd, self.codec)
         cmd += b'\r\n'
@@ -890,23 +1434,82 @@ class Shell_Backend(Backend):
     """
     Backend to execute shell commands locally
     """
-    def __init__(self, timeout=None, codec='latin_1'):
+    def __init__(self, timeout=None, codec='latin_1', persistent=False, cmd_notfound=None):
         """
         Args:
             timeout (float): timeout in seconds for reading the result of the command
             codec (str): codec used by the monitored system to answer.
+            persistent (bool): if True, the commands are executed by a shell that runs for the
+              whole monitoring session, and the commands submitted concurrently by the probes
+              are sent together (refer to :class:`SSH_Backend`).
+            cmd_notfound (bytes): only relevant in `persistent` mode (refer to
+              :class:`SSH_Backend`).
         """
         Backend.__init__(self, codec=codec)
         self._timeout = timeout
         self._app = None
+        self.batching = persistent
+        self.cmd_notfound = cmd_notfound
+        self._shell = None
+        self._session = None
 
     def _start(self):
         pass
 
     def _stop(self):
-        pass
+        self._close_session()
+
+    def _open_session(self):
+        with open(os.devnull, 'wb') as devnull:
+            self._shell = subprocess.Popen(['/bin/sh'], stdin=subprocess.PIPE,
+                                           stdout=subprocess.PIPE, stderr=devnull)
+        self._session = _ShellSession(self._write_shell, self._read_shell, self.codec,
+                                      cmd_notfound=self.cmd_notfound)
+
+    def _close_session(self):
+        if self._shell is not None:
+            try:
+                self._shell.kill()
+                self._shell.wait()
+            except OSError:
+                pass
+            for f in (self._shell.stdin, self._shell.stdout):
+                try:
+                    f.close()
+                except (IOError, OSError):
+                    pass
+        self._shell = None
+        self._session = None
+
+    def _write_shell(self, data):
+        self._shell.stdin.write(data)
+        self._shell.stdin.flush()
+
+    def _read_shell(self, timeout):
+        fd = self._shell.stdout.fileno()
+        if not select.select([fd], [], [], timeout)[0]:
+            return None
+        return os.read(fd, 65536)
+
+    def _exec_commands(self, cmds):
+        if not self.batching:
+            return Backend._exec_commands(self, cmds)
+        if self._session is None:
+            self._open_session()
+        try:
+            return self._session.run(cmds, timeout=self._timeout)
+        except (BackendError, IOError, OSError):
+            # the shell is not in a known state anymore
+            self._close_session()
+            raise BackendError('Unable to execute the commands through the shell')
 
     def _exec_command(self, cmd):
+        if self.batching:
+            res = self._exec_commands([cmd])[0]
+            if isinstance(res, BackendError):
+                raise res
+            return res
+
         self._app = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         ready_to_read, ready_to_write, in_error = \
             select.select([self._app.stdout, self._app.stderr], [], [], self._timeout)
@@ -36,6 +36,7 @@ import traceback
 import uuid
 import struct
 import math
+import mmap
 
 from enum import Enum
 from random import shuffle
@@ -106,6 +107,11 @@ def flatten(nested):
             yield x
 
 
+def _blob_bytes(blob):
+    # a slice of the blob being absorbed may be a memoryview (refer to Node.absorb())
+    return blob.tobytes() if isinstance(blob, memoryview) else blob
+
+
 nodes_weight_re = re.compile('(.*?)\((.*)\)')
 
 
@@ -622,6 +628,7 @@ class NodeInternals(object):
         self._env = node_internals._env
         self.private = node_internals.private
         self.__attrs = node_internals.__attrs
+        self._notify_attrs_change()
         self._sync_with = node_internals._sync_with
         self.absorb_constraints = node_internals.absorb_constraints
 
@@ -640,6 +647,7 @@ class NodeInternals(object):
     def set_attrs_from(self, all_attrs):
         self.__attrs = all_attrs[0]
         self.custo = all_attrs[1]
+        self._notify_attrs_change()
 
     def _init_specific(self, arg):
         pass
@@ -661,6 +669,14 @@ class NodeInternals(object):
     def env(self, src):
         self._env = src
 
+    def _notify_structure_change(self):
+        if self._env is not None:
+            self._env.notify_structure_change()
+
+    def _notify_attrs_change(self):
+        if self._env is not None:
+            self._env.attrs_version += 1
+
     def has_subkinds(self):
         return False
 
@@ -691,8 +707,21 @@ class NodeInternals(object):
             if isinstance(obj, SyncObj):
                 obj.synchronize_nodes(src_node)
 
+    def __copy__(self):
+        # Faster than the generic copy protocol, as NodeInternals are
+        # copied a lot during Node copies
+        new_obj = type(self).__new__(type(self))
+        new_obj.__dict__.update(self.__dict__)
+        return new_obj
+
     def make_private(self, ignore_frozen_state, accept_external_entanglement, delayed_node_internals,
-                     forget_original_sync_objs=False):
+                     forget_original_sync_objs=False, cow=False):
+        """
+        Args:
+          cow (bool): If True, the heavy parts of the NodeInternals (e.g., the value type
+            objects) are shared with the original one and will only be duplicated the first
+            time they are accessed (copy-on-write).
+        """
         if self.private is not None:
             self.private = copy.copy(self.private)
         self.absorb_constraints = copy.copy(self.absorb_constraints)
@@ -705,7 +734,7 @@ class NodeInternals(object):
                 delayed_node_internals.add(self)
             self._sync_with = copy.copy(self._sync_with)
 
-        self._make_private_specific(ignore_frozen_state, accept_external_entanglement)
+        self._make_private_specific(ignore_frozen_state, accept_external_entanglement, cow)
         self.custo = copy.copy(self.custo)
 
     # Called near the end of Node copy (Node.set_contents) to update
@@ -740,7 +769,7 @@ class NodeInternals(object):
                     #       " \_ updated_node: '%s', scope: '%r'\n" % (node, node.name, debug, scope))
 
 
-    def _make_private_specific(self, ignore_frozen_state, accept_external_entanglement):
+    def _make_private_specific(self, ignore_frozen_state, accept_external_entanglement, cow):
         pass
 
 
@@ -762,24 +791,28 @@ class NodeInternals(object):
             raise ValueError
         if self._make_specific(name):
             self.__attrs[name] = True
+            self._notify_attrs_change()
 
     def clear_attr(self, name):
         if name not in self.__attrs:
             raise ValueError
         if self._unmake_specific(name):
             self.__attrs[name] = False
+            self._notify_attrs_change()
 
     # To be used on very specific case only
     def _set_attr_direct(self, name):
         if name not in self.__attrs:
             raise ValueError
         self.__attrs[name] = True
+        self._notify_attrs_change()
 
     # To be used on very specific case only
     def _clear_attr_direct(self, name):
         if name not in self.__attrs:
             raise ValueError
         self.__attrs[name] = False
+        self._notify_attrs_change()
 
     def is_attr_set(self, name):
         if name not in self.__attrs:
@@ -1245,7 +1278,7 @@ class NodeInternals_GenFunc(NodeInternals):
                 self.generated_node.clear_attr(name, recursive=True)
         return True
 
-    def _make_private_specific(self, ignore_frozen_state, accept_external_entanglement):
+    def _make_private_specific(self, ignore_frozen_state, accept_external_entanglement, cow):
         # Note that the 'node_arg' attribute is directly dealt with in
         # Node.__init__() during copy (which calls self.make_args_private()),
         # because the new Node to point to is unknown at this local
@@ -1256,7 +1289,8 @@ class NodeInternals_GenFunc(NodeInternals):
         else:
             self._generated_node = Node(self._generated_node.name, base_node=self._generated_node,
                                        ignore_frozen_state=ignore_frozen_state,
-                                       accept_external_entanglement=accept_external_entanglement)
+                                       accept_external_entanglement=accept_external_entanglement,
+                                       cow=cow)
             self._generated_node._reset_depth(parent_depth=self.pdepth)
             self._generated_node.set_env(self.env)
         self.generator_arg = copy.copy(self.generator_arg)
@@ -1346,7 +1380,9 @@ class NodeInternals_GenFunc(NodeInternals):
 
 
     def reset_generator(self):
-        self._generated_node = None
+        if self._generated_node is not None:
+            self._generated_node = None
+            self._notify_structure_change()
 
     def _get_generated_node(self):
         if self._generated_node is None:
@@ -1380,6 +1416,7 @@ class NodeInternals_GenFunc(NodeInternals):
             self._generated_node = ret
             self._generated_node._reset_depth(parent_depth=self.pdepth)
             self._generated_node.set_env(self.env)
+            self._notify_structure_change()
 
             if self.is_attr_set(NodeInternals.Determinist):
                 self._generated_node.make_determinist(all_conf=True, recursive=True)
@@ -1549,6 +1586,9 @@ class NodeInternals_GenFunc(NodeInternals):
         if self._generated_node is not None:
             self._generated_node._reset_depth(parent_depth=self.pdepth)
 
+    def get_child_nodes(self, ignore_fstate=False):
+        return (self.generated_node,)
+
     def get_child_nodes_by_attr(self, internals_criteria, semantics_criteria, owned_conf, conf, path_regexp, 
                                exclude_self, respect_order, relative_depth, top_node, ignore_fstate):
         return self.generated_node.get_reachable_nodes(internals_criteria, semantics_criteria, owned_conf, conf,
@@ -1603,15 +1643,15 @@ class NodeInternals_Term(NodeInternals):
     def _convert_to_internal_repr(val):
         return convert_to_internal_repr(val)
 
-    def _make_private_specific(self, ignore_frozen_state, accept_external_entanglement):
+    def _make_private_specific(self, ignore_frozen_state, accept_external_entanglement, cow):
         if ignore_frozen_state:
             self.frozen_node = None
         else:
             self.frozen_node = self.frozen_node
 
-        self._make_private_term_specific(ignore_frozen_state, accept_external_entanglement)
+        self._make_private_term_specific(ignore_frozen_state, accept_external_entanglement, cow)
 
-    def _make_private_term_specific(self, ignore_frozen_state, accept_external_entanglement):
+    def _make_private_term_specific(self, ignore_frozen_state, accept_external_entanglement, cow):
         pass
         
     def _set_frozen_value(self, val):
@@ -1642,6 +1682,14 @@ class NodeInternals_Term(NodeInternals):
         if self.absorb_constraints is not None:
             constraints = self.absorb_constraints
 
+        if isinstance(blob, memoryview):
+            # Only the bytes the node may consume are copied out of the buffer. If a node
+            # is postponed, what is searched for can be anywhere in the remaining blob.
+            window = None
+            if self.absorb_helper is None and pending_postpone_desc is None:
+                window = self.get_absorb_window(constraints)
+            blob = blob[:window].tobytes()
+
         if self.absorb_helper is not None:
             try:
                 status, off, size = self.absorb_helper(blob, constraints, self)
@@ -1674,6 +1722,9 @@ class NodeInternals_Term(NodeInternals):
     def confirm_absorb(self):
         self.do_cleanup_absorb()
 
+    def get_absorb_window(self, constraints):
+        return None
+
     def absorb_auto_helper(self, blob, constraints):
         raise NotImplementedError
 
@@ -1734,6 +1785,9 @@ class NodeInternals_Term(NodeInternals):
     def reset_depth_specific(self, depth):
         pass
 
+    def get_child_nodes(self, ignore_fstate=False):
+        return ()
+
     def get_child_nodes_by_attr(self, internals_criteria, semantics_criteria, owned_conf, conf, path_regexp,
                                exclude_self, respect_order, relative_depth, top_node, ignore_fstate):
         return None
@@ -1749,9 +1803,38 @@ class NodeInternals_TypedValue(NodeInternals_Term):
 
     def _init_specific(self, arg):
         NodeInternals_Term._init_specific(self, arg)
-        self.value_type = None
+        self._value_type = None
+        # Number of NodeInternals sharing self._value_type (copy-on-write
+        # mode). This list is shared by all the NodeInternals referencing the
+        # same value type object.
+        self._vt_refs = [1]
         self.__fuzzy_values = None
 
+    def _get_value_type_obj(self):
+        if self._vt_refs[0] > 1:
+            self._make_value_type_private()
+        return self._value_type
+
+    def _set_value_type_obj(self, value_type):
+        if self._vt_refs[0] > 1:
+            self._vt_refs[0] -= 1
+        self._vt_refs = [1]
+        self._value_type = value_type
+
+    # Every access to the value type through this property is considered as
+    # a potential modification of the value type object. Thus, if the latter is
+    # shared (copy-on-write mode), it is duplicated first.
+    value_type = property(fget=_get_value_type_obj, fset=_set_value_type_obj)
+
+    def _make_value_type_private(self):
+        self._vt_refs[0] -= 1
+        self._vt_refs = [1]
+        self._value_type = copy.copy(self._value_type)
+        self._value_type.make_private(forget_current_state=False)
+
+    def is_value_type_shared(self):
+        return self._vt_refs[0] > 1
+
     def _make_specific(self, name):
         if name == NodeInternals.Determinist:
             self.value_type.make_determinist()
@@ -1781,7 +1864,7 @@ class NodeInternals_TypedValue(NodeInternals_Term):
         return True
 
     def get_current_subkind(self):
-        return self.value_type.__class__
+        return self._value_type.__class__
 
     def get_value_type(self):
         return self.value_type
@@ -1795,13 +1878,18 @@ class NodeInternals_TypedValue(NodeInternals_Term):
     def get_specific_fuzzy_values(self):
         return self.__fuzzy_values
 
-    def _make_private_term_specific(self, ignore_frozen_state, accept_external_entanglement):
-        self.value_type = copy.copy(self.value_type)
-        self.value_type.make_private(forget_current_state=ignore_frozen_state)
-        if self.is_attr_set(NodeInternals.Determinist):
-            self.value_type.make_determinist()
+    def _make_private_term_specific(self, ignore_frozen_state, accept_external_entanglement, cow):
+        if cow and not ignore_frozen_state:
+            # The value type object is shared until someone access it
+            self._vt_refs[0] += 1
         else:
-            self.value_type.make_random()
+            self._value_type = copy.copy(self._value_type)
+            self._vt_refs = [1]
+            self._value_type.make_private(forget_current_state=ignore_frozen_state)
+            if self.is_attr_set(NodeInternals.Determinist):
+                self._value_type.make_determinist()
+            else:
+                self._value_type.make_random()
         self.__fuzzy_values = copy.copy(self.__fuzzy_values)
 
     def _get_value_specific(self, conf=None, recursive=True):
@@ -1813,6 +1901,9 @@ class NodeInternals_TypedValue(NodeInternals_Term):
             self._get_value()
         return self.value_type.get_current_raw_val(**kwargs)
         
+    def get_absorb_window(self, constraints):
+        return self.value_type.get_absorb_window(constraints)
+
     def absorb_auto_helper(self, blob, constraints):
         return self.value_type.absorb_auto_helper(blob, constraints)
 
@@ -1836,18 +1927,18 @@ class NodeInternals_TypedValue(NodeInternals_Term):
 
     def is_exhausted(self):
         if self.is_attr_set(NodeInternals.Finite):
-            return self.value_type.is_exhausted()
+            return self._value_type.is_exhausted()
         else:
             return False
 
     def pretty_print(self, max_size=None):
-        return self.value_type.pretty_print(max_size=max_size)
+        return self._value_type.pretty_print(max_size=max_size)
 
     def __getattr__(self, name):
-        vt = self.__getattribute__('value_type')
+        vt = self.__getattribute__('_value_type')
         if hasattr(vt, name):
             # to avoid looping in __getattr__
-            return vt.__getattribute__(name)
+            return self.value_type.__getattribute__(name)
         else:
             return object.__getattribute__(self, name)
 
@@ -1996,7 +2087,7 @@ class NodeInternals_Func(NodeInternals_Term):
                 self.node_arg = l
 
 
-    def _make_private_term_specific(self, ignore_frozen_state, accept_external_entanglement):
+    def _make_private_term_specific(self, ignore_frozen_state, accept_external_entanglement, cow):
         # Note that the 'node_arg' attribute is directly dealt with in
         # Node.__init__() during copy (which calls
         # self.make_args_private()), because the new Node to point to
@@ -2013,6 +2104,20 @@ class NodeInternals_Func(NodeInternals_Term):
         # The call to 'self._node_helpers.make_private()' is performed
         # the latest that is during self.make_args_private()
 
+    def __getstate__(self):
+        # the bound method cannot be pickled (its name is mangled), it is
+        # bound again by __setstate__()
+        state = self.__dict__.copy()
+        state.pop('_get_value_specific', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.custo.frozen_args_mode:
+            self._get_value_specific = self.__get_value_specific_mode1
+        else:
+            self._get_value_specific = self.__get_value_specific_mode2
+
     def absorb(self, blob, constraints, conf, pending_postpone_desc=None):
         # we make the generator freezable to be sure that _get_value()
         # won't reset it after absorption
@@ -2020,7 +2125,8 @@ class NodeInternals_Func(NodeInternals_Term):
 
         sz = len(convert_to_internal_repr(self._get_value()))
 
-        self._set_frozen_value(blob[:sz])
+        val = blob[:sz]
+        self._set_frozen_value(val.tobytes() if isinstance(val, memoryview) else val)
 
         return AbsorbStatus.Absorbed, 0, sz, None
 
@@ -2304,6 +2410,7 @@ class NodeInternals_NonTerm(NodeInternals):
             self.separator =  internals.separator
             self.subnodes_set = internals.subnodes_set
             self.customize(internals.custo)
+            self._notify_structure_change()
 
         elif subnodes_order is not None:
             # This case is used by self.make_private_subnodes()
@@ -2363,14 +2470,15 @@ class NodeInternals_NonTerm(NodeInternals):
 
                             modified_csts[id(node_list)].append(idx)
 
-    def _make_private_specific(self, ignore_frozen_state, accept_external_entanglement):
+    def _make_private_specific(self, ignore_frozen_state, accept_external_entanglement, cow):
         if self.encoder:
             self.encoder = copy.copy(self.encoder)
             if ignore_frozen_state:
                 self.encoder.reset()
 
     def make_private_subnodes(self, node_dico, func_nodes, env, ignore_frozen_state,
-                              accept_external_entanglement, entangled_set, delayed_node_internals):
+                              accept_external_entanglement, entangled_set, delayed_node_internals,
+                              cow=False):
 
         subnodes_order, subnodes_attrs = self.get_subnodes_csts_copy(node_dico)
 
@@ -2429,22 +2537,26 @@ class NodeInternals_NonTerm(NodeInternals):
                                                          ignore_frozen_state=ignore_frozen_state,
                                                          accept_external_entanglement=accept_external_entanglement,
                                                          entangled_set=entangled_set,
-                                                         delayed_node_internals=delayed_node_internals)
+                                                         delayed_node_internals=delayed_node_internals,
+                                                         cow=cow)
                     e.internals[c].make_private(ignore_frozen_state=ignore_frozen_state,
                                                 accept_external_entanglement=accept_external_entanglement,
-                                                delayed_node_internals=delayed_node_internals)
+                                                delayed_node_internals=delayed_node_internals,
+                                                cow=cow)
 
                 elif e.is_func(c) or e.is_genfunc(c):
                     if e.internals[c].node_arg is not None:
                         func_nodes.add(e)
                     e.internals[c].make_private(ignore_frozen_state=ignore_frozen_state,
                                                 accept_external_entanglement=accept_external_entanglement,
-                                                delayed_node_internals=delayed_node_internals)
+                                                delayed_node_internals=delayed_node_internals,
+                                                cow=cow)
 
                 else:
                     e.internals[c].make_private(ignore_frozen_state=ignore_frozen_state,
                                                 accept_external_entanglement=accept_external_entanglement,
-                                                delayed_node_internals=delayed_node_internals)
+                                                delayed_node_internals=delayed_node_internals,
+                                                cow=cow)
 
     def get_subnodes_csts_copy(self, node_dico=None):
         node_dico = {} if node_dico is None else node_dico # node_dico[old_node] --> new_node
@@ -2879,6 +2991,8 @@ class NodeInternals_NonTerm(NodeInternals):
         if self.frozen_node_list is not None:
             return (self.frozen_node_list, False)
 
+        self._notify_structure_change()
+
         if self.separator is not None:
             ignore_sep_fstate = not self.separator.node.is_frozen()
 
@@ -3065,6 +3179,7 @@ class NodeInternals_NonTerm(NodeInternals):
                 self.frozen_node_list.pop(-1)
             self._clone_separator_cleanup()
 
+        self._notify_structure_change()
         return (self.frozen_node_list, True)
 
 
@@ -3241,6 +3356,7 @@ class NodeInternals_NonTerm(NodeInternals):
             node_list.pop(idx)
             for i, n in enumerate(expand_list):
                 node_list.insert(idx+i, n)
+            node_internals._notify_structure_change()
 
         return len(expand_list)
 
@@ -3250,6 +3366,7 @@ class NodeInternals_NonTerm(NodeInternals):
         node.clear_attr(NodeInternals.DISABLED)
         if idx < len(node_list):
             node_list.pop(idx)
+            node._notify_structure_change()
 
     def set_separator_node(self, sep_node, prefix=True, suffix=True, unique=False):
         check_err = set()
@@ -3260,6 +3377,7 @@ class NodeInternals_NonTerm(NodeInternals):
                   "of this non-terminal node")
             raise ValueError
         self.separator = NodeSeparator(sep_node, prefix=prefix, suffix=suffix, unique=unique)
+        self._notify_structure_change()
 
     def get_separator_node(self):
         if self.separator is not None:
@@ -3294,6 +3412,7 @@ class NodeInternals_NonTerm(NodeInternals):
         return len(self.frozen_node_list)
 
     def replace_subnode(self, old, new):
+        self._notify_structure_change()
         self.subnodes_set.remove(old)
         self.subnodes_set.add(new)
 
@@ -3495,7 +3614,7 @@ class NodeInternals_NonTerm(NodeInternals):
 
         if self.encoder:
             original_blob = blob
-            blob = self.encoder.decode(blob)
+            blob = self.encoder.decode(blob.tobytes() if isinstance(blob, memoryview) else blob)
 
         abs_excluded_components = []
         abs_exhausted = False
@@ -3792,7 +3911,7 @@ class NodeInternals_NonTerm(NodeInternals):
                                     bits_to_be_consumed = consumed_bits + vt.bit_length
                                     last_idx = consumed_size + int(math.ceil(bits_to_be_consumed/8.0))
 
-                                    partial_blob = blob[consumed_size:last_idx]
+                                    partial_blob = _blob_bytes(blob[consumed_size:last_idx])
                                     if partial_blob != b'':
                                         nb_bytes = len(partial_blob)
                                         values = list(struct.unpack('B'*nb_bytes, partial_blob))
@@ -3825,8 +3944,8 @@ class NodeInternals_NonTerm(NodeInternals):
                                         else:
                                             partial_blob = struct.pack('{:d}s'.format(nb_bytes), str(bytearray(l)))
                                 else:
-                                    partial_blob = blob[consumed_size:last_idx]
-                                    last_byte = blob[last_idx:last_idx+1]
+                                    partial_blob = _blob_bytes(blob[consumed_size:last_idx])
+                                    last_byte = _blob_bytes(blob[last_idx:last_idx+1])
                                     if last_byte != b'':
                                         val = struct.unpack('B', last_byte)[0]
                                         if vt.padding == 0:
@@ -3838,7 +3957,7 @@ class NodeInternals_NonTerm(NodeInternals):
                                     else:
                                         byte_aligned = True
                             else:
-                                partial_blob = blob[consumed_size:consumed_size+bytelen]
+                                partial_blob = _blob_bytes(blob[consumed_size:consumed_size+bytelen])
                                 byte_aligned = True
 
                             abort, remaining_blob, consumed_size, consumed_nb, postponed_sent_back = \
@@ -4069,7 +4188,10 @@ class NodeInternals_NonTerm(NodeInternals):
                     sep = self.frozen_node_list.pop(-1)
                     data = sep._tobytes()
                     consumed_size = consumed_size - len(data)
-                    blob = blob + data
+                    if isinstance(blob, memoryview):
+                        blob = memoryview(blob.tobytes() + data)
+                    else:
+                        blob = blob + data
 
             if not abort:
                 status = AbsorbStatus.Absorbed
@@ -4092,6 +4214,7 @@ class NodeInternals_NonTerm(NodeInternals):
         if self.separator is not None:
             self.separator.node.cancel_absorb()
         self.frozen_node_list = None
+        self._notify_structure_change()
 
     def confirm_absorb(self):
         iterable = copy.copy(self.subnodes_set)
@@ -4215,6 +4338,7 @@ class NodeInternals_NonTerm(NodeInternals):
                                    reevaluate_constraints=reevaluate_constraints)
 
                 self.frozen_node_list = None
+                self._notify_structure_change()
                 for n in self.subnodes_set:
                     n.clear_clone_info_since(n)
 
@@ -4235,6 +4359,7 @@ class NodeInternals_NonTerm(NodeInternals):
         if not dont_change_state and not only_generators and not reevaluate_constraints:
             self._cleanup_entangled_nodes()
             self.frozen_node_list = None
+            self._notify_structure_change()
             self._nodes_drawn_qty = {}
             for n in self.subnodes_set:
                 self._clear_drawn_node_attrs(n)
@@ -4256,6 +4381,7 @@ class NodeInternals_NonTerm(NodeInternals):
         self._cleanup_entangled_nodes()
 
         self.frozen_node_list = None
+        self._notify_structure_change()
         self._nodes_drawn_qty = {}
         for n in self.subnodes_set:
             self._clear_drawn_node_attrs(n)
@@ -4281,6 +4407,7 @@ class NodeInternals_NonTerm(NodeInternals):
 
     def _reset_state_info(self, new_info=None, nodes_drawn_qty=None):
         self.frozen_node_list = None
+        self._notify_structure_change()
 
         if new_info is None:
             self.exhausted = False
@@ -4390,39 +4517,30 @@ class NodeInternals_NonTerm(NodeInternals):
         for e in iterable:
             e._reset_depth(depth)
 
-    def get_child_nodes_by_attr(self, internals_criteria, semantics_criteria, owned_conf, conf, path_regexp,
-                               exclude_self, respect_order, relative_depth, top_node, ignore_fstate):
-
+    def get_child_nodes(self, ignore_fstate=False):
         if self.frozen_node_list is not None and not ignore_fstate:
-            iterable = self.frozen_node_list
+            return self.frozen_node_list
         else:
-            iterable = self.subnodes_set
-            # self.get_subnodes_with_csts()
-            # iterable = self.frozen_node_list
-
-        if respect_order:
             # if the node is not frozen, the order will not be
             # preserved as self.subnodes_set will be used as a base,
             # and it is a set()
-            s = []
-        else:
-            s = set()
+            return self.subnodes_set
 
-        for e in iterable:
-            nlist = e.get_reachable_nodes(internals_criteria, semantics_criteria, owned_conf, conf,
-                                          path_regexp=path_regexp,
-                                          exclude_self=False, respect_order=respect_order,
-                                          relative_depth=relative_depth, top_node=top_node,
-                                          ignore_fstate=ignore_fstate)
-
-            if respect_order:
-                for e in nlist:
-                    if e not in s:
-                        s.append(e)
-            else:
-                s = s.union(nlist)
+    def get_child_nodes_by_attr(self, internals_criteria, semantics_criteria, owned_conf, conf, path_regexp,
+                               exclude_self, respect_order, relative_depth, top_node, ignore_fstate):
+        s = []
+        seen = set()
+        for e in self.get_child_nodes(ignore_fstate=ignore_fstate):
+            nlist = e.iter_reachable_nodes(internals_criteria, semantics_criteria, owned_conf, conf,
+                                           path_regexp=path_regexp, exclude_self=False,
+                                           relative_depth=relative_depth, top_node=top_node,
+                                           ignore_fstate=ignore_fstate)
+            for n in nlist:
+                if n not in seen:
+                    seen.add(n)
+                    s.append(n)
 
-        return s
+        return s if respect_order else set(s)
 
 
     def set_child_current_conf(self, node, conf, reverse, ignore_entanglement):
@@ -4488,10 +4606,12 @@ class NodeSemantics(object):
     semantics to an Node.
     '''
     def __init__(self, attrs=[]):
-        self.__attrs = attrs
+        self.__attrs = list(attrs)
 
     def add_attributes(self, attrs):
-        self.__attrs += attrs
+        # The list is never modified in place, thus it can be shared by
+        # the copies of this object (refer to make_private())
+        self.__attrs = self.__attrs + list(attrs)
 
     def _match_optionalbut1_criteria(self, criteria):
         if criteria is None:
@@ -4577,7 +4697,11 @@ class NodeSemantics(object):
         This method is called during Node copy process. It aims to make
         all your metadata private (if needed).
         '''
-        self.__attrs = copy.copy(self.__attrs)
+        # Nothing to do as self.__attrs is never modified in place
+        pass
+
+    def get_attrs(self):
+        return self.__attrs
 
 
 class NodeSemanticsCriteria(object):
@@ -4684,6 +4808,237 @@ def make_entangled_nodes(node_list):
 
 
 
+class NodeLookupIndex(object):
+    '''
+    Index of the nodes reachable from a root node, used by
+    Node.get_reachable_nodes() and Node.get_node_by_path() to avoid
+    walking the whole graph for every query.
+
+    The reachable nodes are recorded in depth-first order and grouped by node
+    kind and by semantics, while the groups by attribute and the paths (as well
+    as the reverse map giving the paths of each node) are computed on demand.
+    The index is valid until the structure of the graph changes (refer to
+    Env.notify_structure_change()), whereas the groups by attribute are only
+    rebuilt when an attribute of a node is modified.
+    '''
+
+    def __init__(self, root):
+        self._root = root
+        self._envs = {}
+        self._untracked_epoch = None
+
+        self._nodes = None
+        self._by_kind = None
+        self._by_semantics = None
+        self._with_semantics = None
+        self._by_attr = {}
+        self._attrs_versions = None
+
+        self._paths = None
+        self._node_paths = None
+
+    def is_valid(self):
+        if self._untracked_epoch is not None:
+            # Some nodes of the graph are not tracked (they do not belong to an
+            # environment). We retry only when a node graph has been modified.
+            return self._untracked_epoch == Env.structure_epoch
+        for env, version in self._envs.values():
+            if env.structure_version != version:
+                return False
+        return True
+
+    def _register_nodes(self, nodes, epoch):
+        '''
+        Record the environments of the indexed nodes. Return False if the graph
+        cannot be indexed.
+        '''
+        if Env.structure_epoch != epoch:
+            # the graph has been modified while it was being indexed (e.g., because
+            # of generator nodes)
+            return False
+
+        envs = {}
+        for n in nodes:
+            env = n.env
+            if env is None or n.internals[n.current_conf].env is not env:
+                # the modifications of such nodes cannot be tracked
+                self._untracked_epoch = epoch
+                return False
+            envs[id(env)] = env
+
+        for env_id, env in envs.items():
+            if env_id not in self._envs:
+                self._envs[env_id] = (env, env.structure_version)
+        return True
+
+    def _collect(self, node, nodes, seen):
+        seen.add(node)
+        nodes.append(node)
+
+        for n in node.internals[node.current_conf].get_child_nodes():
+            if n not in seen:
+                self._collect(n, nodes, seen)
+
+    def _get_nodes(self):
+        if self._nodes is not None or self._untracked_epoch is not None:
+            return self._nodes
+
+        epoch = Env.structure_epoch
+        nodes = []
+        self._collect(self._root, nodes, set())
+        if not self._register_nodes(nodes, epoch):
+            return None
+
+        self._by_kind = {}
+        self._by_semantics = {}
+        self._with_semantics = set()
+        for pos, n in enumerate(nodes):
+            kind = n.internals[n.current_conf].__class__
+            if kind in self._by_kind:
+                self._by_kind[kind].add(pos)
+            else:
+                self._by_kind[kind] = {pos}
+            if n.semantics is not None:
+                self._with_semantics.add(pos)
+                for sem in n.semantics.get_attrs():
+                    if sem in self._by_semantics:
+                        self._by_semantics[sem].add(pos)
+                    else:
+                        self._by_semantics[sem] = {pos}
+
+        self._nodes = nodes
+        return nodes
+
+    def _get_attr_positions(self, name):
+        versions = tuple(env.attrs_version for env, _ in self._envs.values())
+        if versions != self._attrs_versions:
+            self._by_attr = {}
+            self._attrs_versions = versions
+
+        if name not in self._by_attr:
+            self._by_attr[name] = {pos for pos, n in enumerate(self._nodes)
+                                   if n.internals[n.current_conf].is_attr_set(name)}
+        return self._by_attr[name]
+
+    def _get_semantics_positions(self, semantics_criteria):
+        positions = self._with_semantics
+
+        crit = semantics_criteria.get_mandatory_criteria()
+        if crit:
+            for sem in crit:
+                positions = positions & self._by_semantics.get(sem, set())
+
+        for crit in (semantics_criteria.get_optionalbut1_criteria(),
+                     semantics_criteria.get_exclusive_criteria()):
+            if crit:
+                candidates = set()
+                for sem in crit:
+                    candidates.update(self._by_semantics.get(sem, ()))
+                positions = positions & candidates
+
+        return positions
+
+    def get_paths(self):
+        '''
+        Returns:
+          dict: the result of Node.get_all_paths() for the root node, or None
+          if the index cannot be used.
+        '''
+        if self._paths is None and self._untracked_epoch is None:
+            epoch = Env.structure_epoch
+            paths = self._root.get_all_paths()
+            if not self._register_nodes(paths.values(), epoch):
+                return None
+            self._paths = paths
+        return self._paths
+
+    def get_node_paths(self, node):
+        '''
+        Returns:
+          list: the paths of `node` from the root node (empty if `node` is not
+          reachable), or None if the index cannot be used.
+        '''
+        node_paths = self._get_node_paths()
+        if node_paths is None:
+            return None
+        return node_paths.get(node, [])
+
+    def _get_node_paths(self):
+        if self._node_paths is None:
+            paths = self.get_paths()
+            if paths is None:
+                return None
+            self._node_paths = {}
+            for path, node in paths.items():
+                if isinstance(path, tuple):
+                    path = path[0]
+                if node in self._node_paths:
+                    self._node_paths[node].append(path)
+                else:
+                    self._node_paths[node] = [path]
+        return self._node_paths
+
+    def lookup(self, internals_criteria=None, semantics_criteria=None, path_regexp=None,
+               exclude_self=False):
+        '''
+        Returns:
+          list: the nodes matching the criteria in depth-first order, or None if
+          the index cannot be used.
+        '''
+        all_nodes = self._get_nodes()
+        if all_nodes is None:
+            return None
+
+        if path_regexp is not None:
+            node_paths = self._get_node_paths()
+            if node_paths is None:
+                return None
+        else:
+            node_paths = None
+
+        positions = None
+
+        if internals_criteria:
+            if internals_criteria.node_kinds:
+                positions = set()
+                for kind, kind_positions in self._by_kind.items():
+                    for c in internals_criteria.node_kinds:
+                        if issubclass(kind, c):
+                            positions.update(kind_positions)
+                            break
+            if internals_criteria.mandatory_attrs:
+                for name in internals_criteria.mandatory_attrs:
+                    attr_positions = self._get_attr_positions(name)
+                    positions = attr_positions if positions is None else positions & attr_positions
+
+        if semantics_criteria:
+            sem_positions = self._get_semantics_positions(semantics_criteria)
+            positions = sem_positions if positions is None else positions & sem_positions
+
+        if positions is None:
+            candidates = all_nodes
+        else:
+            candidates = [all_nodes[pos] for pos in sorted(positions)]
+
+        nodes = []
+        for n in candidates:
+            if exclude_self and n is self._root:
+                continue
+            if internals_criteria and not n.internals[n.current_conf].match(internals_criteria):
+                continue
+            if semantics_criteria and (n.semantics is None or not n.semantics.match(semantics_criteria)):
+                continue
+            if node_paths is not None:
+                for p in node_paths.get(n, ()):
+                    if re.search(path_regexp, p):
+                        break
+                else:
+                    continue
+            nodes.append(n)
+
+        return nodes
+
+
 
 ########### Node Class ##############
 
@@ -4747,7 +5102,7 @@ class Node(object):
 
     def __init__(self, name, base_node=None, copy_dico=None, ignore_frozen_state=False,
                  accept_external_entanglement=False, acceptance_set=None,
-                 subnodes=None, values=None, value_type=None, vt=None, new_env=False):
+                 subnodes=None, values=None, value_type=None, vt=None, new_env=False, cow=False):
         '''
         Args:
           name (str): Name of the node. Every children node of a node shall have a unique name.
@@ -4774,6 +5129,10 @@ class Node(object):
           new_env (bool): [If `base_node` provided] If True, the `base_node` attached :class:`Env()`
            will be copied. Otherwise, the same will be used. If `ignore_frozen_state` is True, a
            new :class:`Env()` will be used.
+          cow (bool): [If `base_node` provided] If True, `base_node` is copied in copy-on-write
+           mode. The value type objects of the typed terminal nodes are then shared with `base_node`
+           and only duplicated the first time they are accessed (e.g., when a disruptor
+           modifies them or when they are unfrozen). Only relevant if `ignore_frozen_state` is False.
         '''
 
         assert '/' not in name  # '/' is a reserved character
@@ -4795,6 +5154,9 @@ class Node(object):
         self.abs_postpone_sent_back = None  # used for absorption to transfer a resolved postpone
                                             # node back to where it was defined
 
+        self._reset_serialization_cache()
+        self._lookup_index = None
+
         if base_node is not None and subnodes is None and values is None and value_type is None:
 
             self._delayed_jobs_called = base_node._delayed_jobs_called
@@ -4813,7 +5175,7 @@ class Node(object):
             node_dico = self.set_contents(base_node,
                                           copy_dico=copy_dico, ignore_frozen_state=ignore_frozen_state,
                                           accept_external_entanglement=accept_external_entanglement,
-                                          acceptance_set=acceptance_set, preserve_node=False)
+                                          acceptance_set=acceptance_set, preserve_node=False, cow=cow)
 
             if new_env and self.env is not None:
                 self.env.update_node_refs(node_dico, ignore_frozen_state=ignore_frozen_state)
@@ -4846,7 +5208,7 @@ class Node(object):
             else:
                 self.make_empty()
 
-    def get_clone(self, name=None, ignore_frozen_state=False, new_env=True):
+    def get_clone(self, name=None, ignore_frozen_state=False, new_env=True, cow=False):
         '''Create a new node. To be used wihtin a graph-based data model.
         
         Args:
@@ -4855,6 +5217,8 @@ class Node(object):
             a Node with the same state as the duplicated Node. Otherwise, the only the state won't be kept.
           new_env (bool): If True, the current :class:`Env()` will be copied.
             Otherwise, the same will be used.
+          cow (bool): If True, the clone is performed in copy-on-write mode
+            (refer to :class:`Node`).
 
         Returns:
           Node: duplicated Node object
@@ -4863,7 +5227,8 @@ class Node(object):
         if name is None:
             name = self.name
 
-        return Node(name, base_node=self, ignore_frozen_state=ignore_frozen_state, new_env=new_env)
+        return Node(name, base_node=self, ignore_frozen_state=ignore_frozen_state, new_env=new_env,
+                    cow=cow)
 
 
     def __copy__(self):
@@ -4871,8 +5236,11 @@ class Node(object):
         # It does not handle self.internals nor self.entangled_nodes which are copied
         # in a different way.
 
-        new_node = type(self)(self.name)
+        # Node.__init__() is bypassed as every attribute is overwritten just after
+        new_node = type(self).__new__(type(self))
         new_node.__dict__.update(self.__dict__)
+        new_node._reset_serialization_cache()
+        new_node._lookup_index = None
         if self.semantics is not None:
             new_node.semantics = copy.copy(self.semantics)
             new_node.semantics.make_private()
@@ -4882,7 +5250,7 @@ class Node(object):
     def set_contents(self, base_node,
                      copy_dico=None, ignore_frozen_state=False,
                      accept_external_entanglement=False, acceptance_set=None,
-                     preserve_node=True):
+                     preserve_node=True, cow=False):
         '''Set the contents of the node based on the one provided within
         `base_node`. This method performs a deep copy of `base_node`,
         but some parameters can change the behavior of the copy.
@@ -4903,6 +5271,7 @@ class Node(object):
             entangled nodes that could be referenced within the new node during the cloning process.
           copy_dico (dict): It is used internally during the cloning process,
             and should not be used for any functional purpose.
+          cow (bool): If True, perform the copy in copy-on-write mode (refer to :class:`Node`).
 
         Returns:
           dict: For each subnodes of `base_node` (keys), reference the corresponding subnodes within the new node.
@@ -4924,6 +5293,10 @@ class Node(object):
         entangled_set = set()
         delayed_node_internals = set()
 
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
+        self._lookup_index = None
+
         self.fuzz_weight = base_node.fuzz_weight
 
         if base_node.semantics is not None:
@@ -4938,13 +5311,13 @@ class Node(object):
                 new_internals.make_private(ignore_frozen_state=ignore_frozen_state,
                                            accept_external_entanglement=accept_external_entanglement,
                                            delayed_node_internals=delayed_node_internals,
-                                           forget_original_sync_objs=True)
+                                           forget_original_sync_objs=True, cow=cow)
                 new_internals.set_contents_from(self.internals[conf])
             else:
                 new_internals.make_private(ignore_frozen_state=ignore_frozen_state,
                                            accept_external_entanglement=accept_external_entanglement,
                                            delayed_node_internals=delayed_node_internals,
-                                           forget_original_sync_objs=False)
+                                           forget_original_sync_objs=False, cow=cow)
 
             self.internals[conf] = new_internals
             self.internals[conf].env = self.env
@@ -4955,10 +5328,12 @@ class Node(object):
                                                            ignore_frozen_state=ignore_frozen_state,
                                                            accept_external_entanglement=accept_external_entanglement,
                                                            entangled_set=entangled_set,
-                                                           delayed_node_internals=delayed_node_internals)
+                                                           delayed_node_internals=delayed_node_internals,
+                                                           cow=cow)
                 self.internals[conf].make_private(ignore_frozen_state=ignore_frozen_state,
                                                   accept_external_entanglement=accept_external_entanglement,
-                                                  delayed_node_internals=delayed_node_internals)
+                                                  delayed_node_internals=delayed_node_internals,
+                                                  cow=cow)
                 self._finalize_nonterm_node(conf)
 
         # Once node_dico has been populated from the node tree,
@@ -5076,6 +5451,7 @@ class Node(object):
         # @conf could not be None or the empty string
         if conf and conf not in self.internals:
             self.internals[conf] = None
+            self._notify_structure_change()
             return True
         else:
             return False
@@ -5083,6 +5459,7 @@ class Node(object):
     def remove_conf(self, conf):
         if conf != 'MAIN':
             del self.internals[conf]
+            self._notify_structure_change()
 
     def is_conf_existing(self, conf):
         return conf in self.internals
@@ -5095,6 +5472,8 @@ class Node(object):
 
     def _set_subtrees_current_conf(self, node, conf, reverse, ignore_entanglement=False):
         conf2 = conf if node.is_conf_existing(conf) else node.current_conf
+        node._invalidate_serialization_cache()
+        node._notify_structure_change()
 
         if not reverse:
             node.current_conf = conf2
@@ -5124,6 +5503,8 @@ class Node(object):
                 self._set_subtrees_current_conf(e, conf, reverse, ignore_entanglement=ignore_entanglement)
             else:
                 if e.is_conf_existing(conf):
+                    e._invalidate_serialization_cache()
+                    e._notify_structure_change()
                     e.current_conf = conf
 
         if not ignore_entanglement and self.entangled_nodes is not None:
@@ -5169,6 +5550,8 @@ class Node(object):
         return self.internals[self.current_conf]
 
     def __set_current_internals(self, internal):
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
         self.internals[self.current_conf] = internal
 
     def __get_internals(self):
@@ -5189,6 +5572,9 @@ class Node(object):
                     accept_external_entanglement=True, new_env=False)
 
     def set_internals(self, backup):
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
+        self._lookup_index = None
         self.name = backup.name
         self.env = backup.env
         self.semantics = backup.semantics
@@ -5298,6 +5684,8 @@ class Node(object):
     def set_subnodes_basic(self, node_list, conf=None, ignore_entanglement=False, separator=None,
                            preserve_node=True):
         conf = self.__check_conf(conf)
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
 
         new_internals = NodeInternals_NonTerm()
         if preserve_node:
@@ -5315,6 +5703,8 @@ class Node(object):
     def set_subnodes_with_csts(self, wlnode_list, conf=None, ignore_entanglement=False, separator=None,
                                preserve_node=True):
         conf = self.__check_conf(conf)
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
 
         new_internals = NodeInternals_NonTerm()
         if preserve_node:
@@ -5330,6 +5720,8 @@ class Node(object):
 
     def set_subnodes_full_format(self, subnodes_order, subnodes_attrs, conf=None, separator=None, preserve_node=True):
         conf = self.__check_conf(conf)
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
 
         new_internals = NodeInternals_NonTerm()
         if preserve_node:
@@ -5344,6 +5736,8 @@ class Node(object):
     def set_values(self, values=None, value_type=None, conf=None, ignore_entanglement=False,
                    preserve_node=True):
         conf = self.__check_conf(conf)
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
 
         new_internals = NodeInternals_TypedValue()
         if preserve_node:
@@ -5371,6 +5765,8 @@ class Node(object):
                  conf=None, ignore_entanglement=False, provide_helpers=False,
                  preserve_node=True):
         conf = self.__check_conf(conf)
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
 
         new_internals = NodeInternals_Func()
         if preserve_node:
@@ -5391,6 +5787,8 @@ class Node(object):
                            func_arg=None, conf=None, ignore_entanglement=False,
                            provide_helpers=False, preserve_node=True):
         conf = self.__check_conf(conf)
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
 
         new_internals = NodeInternals_GenFunc()
         if preserve_node:
@@ -5407,6 +5805,8 @@ class Node(object):
 
     def make_empty(self, conf=None):
         conf = self.__check_conf(conf)
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
         self.internals[conf] = NodeInternals_Empty()
         
     def is_empty(self, conf=None):
@@ -5414,8 +5814,18 @@ class Node(object):
         return isinstance(self.internals[conf], NodeInternals_Empty)
 
     def absorb(self, blob, constraints=AbsCsts(), conf=None, pending_postpone_desc=None):
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
         conf, next_conf = self._compute_confs(conf=conf, recursive=True)
-        blob = convert_to_internal_repr(blob)
+        if isinstance(blob, (bytearray, mmap.mmap)):
+            # absorption is performed over a view of the buffer, so that sub-blobs are not copied
+            try:
+                blob = memoryview(blob)
+            except TypeError:
+                # python2 mmap objects do not support the buffer protocol
+                blob = blob[:]
+        elif not isinstance(blob, memoryview):
+            blob = convert_to_internal_repr(blob)
         status, off, sz, postpone_sent_back = self.internals[conf].absorb(blob, constraints=constraints, conf=next_conf,
                                                                           pending_postpone_desc=pending_postpone_desc)
         if postpone_sent_back is not None:
@@ -5424,8 +5834,14 @@ class Node(object):
         if len(blob) == sz and status == AbsorbStatus.Absorbed:
             status = AbsorbStatus.FullyAbsorbed
             self.internals[conf].confirm_absorb()
+        self._notify_structure_change()
         return status, off, sz, self.name
 
+    def cancel_absorb(self):
+        self._invalidate_serialization_cache()
+        self._notify_structure_change()
+        self.internals[self.current_conf].cancel_absorb()
+
     def set_absorb_helper(self, helper, conf=None):
         conf = self.__check_conf(conf)
         self.internals[conf].set_absorb_helper(helper)
@@ -5482,6 +5898,7 @@ class Node(object):
         return val
 
     def set_attr(self, name, conf=None, all_conf=False, recursive=False):
+        self._invalidate_serialization_cache()
         if all_conf:
             for c in self.internals:
                 self.internals[c].set_attr(name)
@@ -5494,6 +5911,7 @@ class Node(object):
 
 
     def clear_attr(self, name, conf=None, all_conf=False, recursive=False):
+        self._invalidate_serialization_cache()
         if all_conf:
             for c in self.internals:
                 self.internals[c].clear_attr(name)
@@ -5516,6 +5934,7 @@ class Node(object):
         return self.internals[conf].get_private()
 
     def set_semantics(self, sem):
+        self._notify_structure_change()
         if isinstance(sem, NodeSemantics):
             self.semantics = sem
         else:
@@ -5529,107 +5948,124 @@ class Node(object):
     def get_reachable_nodes(self, internals_criteria=None, semantics_criteria=None,
                             owned_conf=None, conf=None, path_regexp=None, exclude_self=False,
                             respect_order=False, relative_depth=-1, top_node=None, ignore_fstate=False):
-        
-        def __compliant(node, config, top_node):
-            if node is top_node and exclude_self:
-                return False
 
-            if internals_criteria:
-                cond1 = node.internals[config].match(internals_criteria)
-            else:
-                cond1 = True
-
-            if semantics_criteria:
-                if node.semantics is None:
-                    cond2 = False
+        nodes = list(self.iter_reachable_nodes(internals_criteria=internals_criteria,
+                                               semantics_criteria=semantics_criteria,
+                                               owned_conf=owned_conf, conf=conf,
+                                               path_regexp=path_regexp, exclude_self=exclude_self,
+                                               relative_depth=relative_depth, top_node=top_node,
+                                               ignore_fstate=ignore_fstate))
+        if respect_order:
+            return nodes
+        else:
+            l1 = []
+            l2 = []
+            for e in nodes:
+                if e.get_fuzz_weight() > 1:
+                    l1.append(e)
                 else:
-                    cond2 = node.semantics.match(semantics_criteria)
-            else:
-                cond2 = True
+                    l2.append(e)
+            l1 = sorted(l1, key=lambda x: -x.get_fuzz_weight())
+
+            return l1 + sorted(l2, key=lambda x: x.name)
+
+
+    def iter_reachable_nodes(self, internals_criteria=None, semantics_criteria=None,
+                             owned_conf=None, conf=None, path_regexp=None, exclude_self=False,
+                             relative_depth=-1, top_node=None, ignore_fstate=False, limit=None):
+        """
+        Yield the nodes that get_reachable_nodes() returns when `respect_order` is True
+        (i.e., in depth-first order), as they are found.
+
+        Args:
+            limit (int): if not None, the search stops once this number of nodes has
+              been yielded.
+        """
+        if limit is not None and limit <= 0:
+            return
+
+        nodes = None
+        if conf is None and owned_conf is None and relative_depth == -1 and not ignore_fstate \
+                and (top_node is None or top_node is self):
+            index = self._get_lookup_index()
+            if index is not None:
+                nodes = index.lookup(internals_criteria=internals_criteria,
+                                     semantics_criteria=semantics_criteria,
+                                     path_regexp=path_regexp, exclude_self=exclude_self)
+
+        if nodes is None:
+            nodes = self._iter_reachable_nodes(internals_criteria, semantics_criteria, owned_conf,
+                                               conf, path_regexp, exclude_self, relative_depth,
+                                               self if top_node is None else top_node,
+                                               ignore_fstate)
+
+        for cpt, node in enumerate(nodes, start=1):
+            yield node
+            if cpt == limit:
+                break
+
 
+    def _iter_reachable_nodes(self, internals_criteria, semantics_criteria, owned_conf, conf,
+                              path_regexp, exclude_self, relative_depth, top_node, ignore_fstate):
+
+        excluded = self if exclude_self and self is top_node else None
+
+        def compliant(node, config):
+            if node is excluded:
+                return False
+            if owned_conf is not None and not node.is_conf_existing(owned_conf):
+                return False
+            if internals_criteria and not node.internals[config].match(internals_criteria):
+                return False
+            if semantics_criteria and \
+                    (node.semantics is None or not node.semantics.match(semantics_criteria)):
+                return False
             if path_regexp is not None:
-                paths = node.get_all_paths_from(top_node)
-                for p in paths:
+                for p in node.get_all_paths_from(top_node):
                     if re.search(path_regexp, p):
-                        cond3 = True
                         break
                 else:
-                    cond3 = False
-            else:
-                cond3 = True
-
-            return cond1 and cond2 and cond3
-
-
-        def get_reachable_nodes_rec(node, config, rdepth, top_node):
-            s = []
-            # if respect_order:
-            #     s = []
-            # else:
-            #     s = set()
+                    return False
+            return True
 
-            if config == None:
-                config = self.current_conf
-                next_conf = None
+        # The nodes are yielded only once, and the subgraph behind a node is
+        # walked only once when the depth is not limited (a node can be shared
+        # by several non-terminal nodes).
+        yielded = set()
+        walked = set()
+        stack = [iter(((self, relative_depth),))]
+        while stack:
+            for node, rdepth in stack[-1]:
+                break
             else:
-                next_conf = config
+                stack.pop()
+                continue
 
-            if not node.is_conf_existing(config):
-                config = node.current_conf
+            if rdepth <= -1:
+                if node in walked:
+                    continue
+                walked.add(node)
 
-            internal = node.internals[config]
+            config = node.current_conf if conf is None or not node.is_conf_existing(conf) else conf
 
-            if node.is_conf_existing(owned_conf) or (owned_conf == None):
-                if __compliant(node, config, top_node):
-                    s.append(node)
-                    # if respect_order:
-                    #     s.append(node)
-                    # else:
-                    #     s.add(node)
+            if node not in yielded and compliant(node, config):
+                yielded.add(node)
+                yield node
 
             if rdepth <= -1 or rdepth > 0:
-                s2 = internal.get_child_nodes_by_attr(internals_criteria=internals_criteria,
-                                                      semantics_criteria=semantics_criteria,
-                                                      owned_conf=owned_conf, conf=next_conf,
-                                                      path_regexp=path_regexp,
-                                                      exclude_self=False,
-                                                      respect_order=respect_order,
-                                                      relative_depth = rdepth - 1,
-                                                      top_node=top_node, ignore_fstate=ignore_fstate)
-                if s2:
-                    for e in s2:
-                        if e not in s:
-                            s.append(e)
-                    # if respect_order:
-                    #     for e in s2:
-                    #         if e not in s:
-                    #             s.append(e)
-                    # else:
-                    #     s = s.union(s2)
-
-            return s
-
-        if top_node is None:
-            nodes = get_reachable_nodes_rec(node=self, config=conf, rdepth=relative_depth,
-                                            top_node=self)
-        else:
-            nodes = get_reachable_nodes_rec(node=self, config=conf, rdepth=relative_depth,
-                                            top_node=top_node)
-
-        if respect_order:
-            return nodes
-        else:
-            l1 = []
-            l2 = []
-            for e in nodes:
-                if e.get_fuzz_weight() > 1:
-                    l1.append(e)
-                else:
-                    l2.append(e)
-            l1 = sorted(l1, key=lambda x: -x.get_fuzz_weight())
+                children = node.internals[config].get_child_nodes(ignore_fstate=ignore_fstate)
+                if children:
+                    stack.append(iter([(n, rdepth - 1) for n in children]))
 
-            return l1 + sorted(l2, key=lambda x: x.name)
 
+    def _get_lookup_index(self):
+        if self.env is None:
+            return None
+        index = self._lookup_index
+        if index is None or not index.is_valid():
+            index = NodeLookupIndex(self)
+            self._lookup_index = index
+        return index
 
     @staticmethod
     def filter_out_entangled_nodes(node_list):
@@ -5655,7 +6091,22 @@ class Node(object):
         The set of nodes that is used to perform the search include
         the node itself and all the subnodes behind it.
         '''
-        if path is None:
+        index = self._get_lookup_index() if conf is None else None
+        htable = index.get_paths() if index is not None else None
+
+        if htable is not None:
+            if path is None:
+                assert(path_regexp is not None)
+                for n, e in htable.items():
+                    if re.search(path_regexp, n[0] if isinstance(n, tuple) else n):
+                        ret = e
+                        break
+                else:
+                    ret = None
+            else:
+                ret = htable.get(path)
+
+        elif path is None:
             assert(path_regexp is not None)
             # Find *one* Node whose path match the regexp
             for n, e in self.iter_paths(conf=conf):
@@ -5725,6 +6176,11 @@ class Node(object):
                 yield path if only_paths else (path, node)
 
     def get_path_from(self, node, conf=None):
+        index = node._get_lookup_index() if conf is None else None
+        paths = index.get_node_paths(self) if index is not None else None
+        if paths is not None:
+            return paths[0] if paths else None
+
         for n, e in node.iter_paths(conf=conf):
             if e == self:
                 return n
@@ -5733,6 +6189,11 @@ class Node(object):
 
 
     def get_all_paths_from(self, node, conf=None):
+        index = node._get_lookup_index() if conf is None else None
+        paths = index.get_node_paths(self) if index is not None else None
+        if paths is not None:
+            return list(paths)
+
         l = []
         for n, e in node.iter_paths(conf=conf):
             if e == self:
@@ -5740,6 +6201,9 @@ class Node(object):
         return l
 
     def set_env(self, env):
+        # the lookup indexes that reference the previous environment
+        # have to be invalidated
+        self._notify_structure_change()
         self.env = env
         for c in self.internals:
             self.internals[c].set_child_env(env)
@@ -5771,6 +6235,11 @@ class Node(object):
 
     def _get_value(self, conf=None, recursive=True, return_node_internals=False):
 
+        use_cache = conf is None and recursive and self.env is not None \
+                    and self.env.serialization_cache_enabled
+        if use_cache and self._ser_cache is not None:
+            return self._ser_cache[0]
+
         next_conf = conf if recursive else None
         conf2 = conf if self.is_conf_existing(conf) else self.current_conf
 
@@ -5797,8 +6266,128 @@ class Node(object):
             if internal.is_exhausted() and self.env is not None:
                 self.env.notify_exhausted_node(self)
 
+        if use_cache and isinstance(internal, NodeInternals_NonTerm):
+            self._fill_serialization_cache(internal, ret)
+
         return ret
 
+    def _reset_serialization_cache(self):
+        # _ser_cache is either None or a list [value, bytes] where 'value'
+        # is the result of _get_value() and 'bytes' the serialized form of
+        # the node (computed lazily)
+        self._ser_cache = None
+        # Nodes whose cached value depends on this one
+        self._ser_cache_parents = set()
+
+    def _notify_structure_change(self):
+        if self.env is not None:
+            self.env.notify_structure_change()
+
+    def _invalidate_serialization_cache(self):
+        self._ser_cache = None
+        if self._ser_cache_parents:
+            parents = self._ser_cache_parents
+            self._ser_cache_parents = set()
+            for p in parents:
+                p._invalidate_serialization_cache()
+
+    def _is_serialization_stable(self):
+        '''
+        Return True if the current value of the node will not change until
+        one of the invalidating methods is called (unfreeze(), etc.). In
+        such a case, the node will notify its dependents on changes.
+        '''
+        if self._ser_cache is not None:
+            return True
+
+        internal = self.internals[self.current_conf]
+        if isinstance(internal, NodeInternals_Empty):
+            return True
+        if isinstance(internal, NodeInternals_NonTerm) or \
+                internal.is_attr_set(NodeInternals.DISABLED) or \
+                not internal.is_attr_set(NodeInternals.Freezable):
+            return False
+
+        if isinstance(internal, NodeInternals_GenFunc):
+            gen_node = internal._generated_node
+            if gen_node is None or (internal.custo.trigger_last_mode and not internal._trigger_registered) \
+                    or not gen_node._is_serialization_stable():
+                return False
+            gen_node._ser_cache_parents.add(self)
+            return True
+
+        return internal.is_frozen()
+
+    def _fill_serialization_cache(self, internal, value):
+        env = self.env
+        if env.delayed_jobs_pending or env._reentrancy_cpt > 0 or internal.frozen_node_list is None:
+            return
+
+        node_list = internal.frozen_node_list
+        for n in node_list:
+            if n._ser_cache is None and not n._is_serialization_stable():
+                return
+
+        for n in node_list:
+            n._ser_cache_parents.add(self)
+        self._ser_cache = [value, None]
+
+    def _get_cached_bytes(self, env):
+        cache = self._ser_cache
+        if cache is None:
+            # Only reached for stable nodes (refer to _is_serialization_stable())
+            internal = self.internals[self.current_conf]
+            if isinstance(internal, NodeInternals_GenFunc):
+                return internal.generated_node._get_cached_bytes(env)
+            elif isinstance(internal, NodeInternals_NonTerm):
+                return self._tobytes()
+            else:
+                return internal._get_value()[0]
+
+        if cache[1] is None:
+            env.serialization_cache_misses += 1
+            internal = self.internals[self.current_conf]
+            if internal.encoder is None and not internal.custo.collapse_padding_mode:
+                cache[1] = b''.join([n._get_cached_bytes(env) for n in internal.frozen_node_list])
+            else:
+                cache[1] = self._tobytes()
+        else:
+            env.serialization_cache_hits += 1
+
+        return cache[1]
+
+    def enable_serialization_cache(self, enable=True):
+        '''
+        Enable (or disable) the serialization cache of the node graph this
+        node belongs to. When enabled, every frozen non-terminal node keeps
+        its value and its serialized form until one of its subnodes is
+        modified (unfreeze(), set_frozen_value(), reset_state(), ...).
+        Thus, :meth:`to_bytes` only re-renders the path from the modified
+        nodes up to the root.
+
+        Args:
+          enable (bool): If False, disable the cache.
+        '''
+        if self.env is None:
+            raise ValueError('The node graph needs an Env() to use a serialization cache')
+        self.env.serialization_cache_enabled = enable
+
+    def get_serialization_cache_stats(self):
+        '''
+        Returns:
+          tuple: number of subtrees which serialization has been retrieved
+          from the cache, and number of subtrees which have been (re-)serialized
+          while the cache was enabled.
+        '''
+        if self.env is None:
+            return (0, 0)
+        return (self.env.serialization_cache_hits, self.env.serialization_cache_misses)
+
+    def reset_serialization_cache_stats(self):
+        if self.env is not None:
+            self.env.serialization_cache_hits = 0
+            self.env.serialization_cache_misses = 0
+
 
     def _post_freeze(self, node_internals, wrapping_node):
         if self._post_freeze_handler is not None:
@@ -5817,6 +6406,7 @@ class Node(object):
 
     def reset_state(self, recursive=False, exclude_self=False, conf=None, ignore_entanglement=False):
         self._delayed_jobs_called = False
+        self._invalidate_serialization_cache()
         current_conf, next_conf = self._compute_confs(conf=conf, recursive=recursive)
         self.internals[current_conf].reset_state(recursive=recursive, exclude_self=exclude_self, conf=next_conf,
                                                  ignore_entanglement=ignore_entanglement)
@@ -5837,6 +6427,10 @@ class Node(object):
                                                  return_node_internals=False)[0]
 
         node_internals_list = self.freeze(conf=conf, recursive=recursive)
+        if self._ser_cache is not None and conf is None and recursive \
+                and self.env.serialization_cache_enabled:
+            return self._get_cached_bytes(self.env)
+
         if isinstance(node_internals_list, list):
             node_internals_list = list(flatten(node_internals_list))
             if node_internals_list:
@@ -5891,6 +6485,7 @@ class Node(object):
 
     def set_frozen_value(self, value, conf=None):
         conf = self.__check_conf(conf)
+        self._invalidate_serialization_cache()
 
         if self.is_term(conf):
             value = convert_to_internal_repr(value)
@@ -5906,6 +6501,7 @@ class Node(object):
                  ignore_entanglement=False, only_generators=False,
                  reevaluate_constraints=False):
         self._delayed_jobs_called = False
+        self._invalidate_serialization_cache()
 
         next_conf = conf
 
@@ -5926,6 +6522,7 @@ class Node(object):
 
     def unfreeze_all(self, recursive=True, ignore_entanglement=False):
         self._delayed_jobs_called = False
+        self._invalidate_serialization_cache()
 
         for conf in self.internals:
             if self.is_frozen(conf):
@@ -6321,11 +6918,26 @@ class Env(object):
 
     knowledge_source = None
 
+    # Incremented on every structure change of any node graph. It enables to
+    # detect that a graph has been modified while it was being indexed.
+    structure_epoch = 0
+
     def __init__(self):
         self.exhausted_nodes = []
         self.nodes_to_corrupt = {}
         self.env4NT = Env4NT()
         self.delayed_jobs_enabled = True
+        # If enabled, the non-terminal nodes of the graph keep the result
+        # of their last serialization until one of their subnodes changes
+        # (refer to Node.enable_serialization_cache())
+        self.serialization_cache_enabled = False
+        self.serialization_cache_hits = 0
+        self.serialization_cache_misses = 0
+        # Versions of the graph structure and of the node attributes. They
+        # are used to invalidate the lookup indexes of the nodes (refer to
+        # Node.get_reachable_nodes())
+        self.structure_version = 0
+        self.attrs_version = 0
         self._sorted_jobs = None
         self._djob_keys = None
         self._djob_groups = None
@@ -6339,14 +6951,20 @@ class Env(object):
         return bool(self._sorted_jobs)
 
     def __getattr__(self, name):
-        if hasattr(self.env4NT, name):
-            return self.env4NT.__getattribute__(name)
+        # to avoid looping in __getattr__ when env4NT is not set yet (e.g., when unpickled)
+        env4NT = self.__getattribute__('env4NT')
+        if hasattr(env4NT, name):
+            return env4NT.__getattribute__(name)
         else:
             raise AttributeError
 
     def is_empty(self):
         return not self.exhausted_nodes and not self.nodes_to_corrupt and self.env4NT.is_empty()
 
+    def notify_structure_change(self):
+        self.structure_version += 1
+        Env.structure_epoch += 1
+
     def set_data_model(self, dm):
         self._dm = dm
 
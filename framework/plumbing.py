@@ -45,6 +45,7 @@ from framework.evolutionary_helpers import EvolutionaryScenariosFactory
 from framework.logger import *
 from framework.monitor import *
 from framework.operator_helpers import *
+from framework.pregeneration import DataPregenerator, is_pregeneration_supported
 from framework.project import *
 from framework.scenario import *
 from framework.tactics_helpers import *
@@ -291,7 +292,27 @@ class FmkPlumbing(object):
                 self.config.write(cfile)
         atexit.register(save_config)
 
-        self.fmkDB = Database()
+        try:
+            db_config = self.config.db
+            synchronous = str(db_config.synchronous)
+            db_params = {'group_commit': db_config.group_commit,
+                         'max_batch_latency': db_config.max_batch_latency,
+                         'wal': db_config.wal,
+                         'synchronous': None if synchronous.upper() == 'DEFAULT' else synchronous}
+        except AttributeError:
+            # configuration files created by previous fuddly versions lack the 'db' section
+            db_params = {}
+
+        try:
+            db_config = self.config.db
+            compression = str(db_config.payload_compression)
+            db_params['compression'] = None if compression.upper() == 'NONE' else compression
+            db_params['compression_threshold'] = db_config.payload_compression_threshold
+        except AttributeError:
+            # configuration files created by previous fuddly versions lack these keys
+            pass
+
+        self.fmkDB = Database(**db_params)
         ok = self.fmkDB.start()
         if not ok:
             raise InvalidFmkDB("The database {:s} is invalid!".format(self.fmkDB.fmk_db_path))
@@ -1209,6 +1230,8 @@ class FmkPlumbing(object):
             else:
                 fbk_mode = tg.fbk_wait_until_recv_msg
             fbk_timeout = str(tg.feedback_timeout)
+            if tg.adaptive_feedback_timeout:
+                fbk_timeout += ' (adaptive, currently {!s})'.format(tg.get_effective_feedback_timeout())
             tg_name = self.available_targets_desc[tg]
 
             print(colorize('\n  [ Target Specific Information - ({:d}) {!s} ]'.format(tg_id, tg_name), rgb=Color.INFO))
@@ -1636,6 +1659,22 @@ class FmkPlumbing(object):
             self.lg.log_fmk_info('Wrong timeout value!', do_record=False)
             return False
 
+    @EnforceOrder(accepted_states=['S1','S2'])
+    def set_adaptive_feedback_timeout(self, enabled, tg_id=None, percentile=95, margin=2.0,
+                                      min_samples=10, do_record=False, do_show=True):
+        '''
+        Enable or disable the learning of the feedback timeout from the response times
+        of the target(s). Refer to :meth:`Target.set_adaptive_feedback_timeout`.
+        '''
+        targets = self.targets.values() if tg_id is None else [self.targets[tg_id]]
+        for tg in targets:
+            tg.set_adaptive_feedback_timeout(enabled, percentile=percentile, margin=margin,
+                                             min_samples=min_samples)
+            if do_show or do_record:
+                tg_desc = self._get_detailed_target_desc(tg)
+                self.lg.log_fmk_info('Target {!s} adaptive feedback timeout = {!r}'
+                                     .format(tg_desc, enabled), do_record=do_record)
+
     @EnforceOrder(accepted_states=['S1','S2'])
     def set_feedback_mode(self, mode, tg_id=None, do_record=False, do_show=True):
 
@@ -1859,7 +1898,8 @@ class FmkPlumbing(object):
                 return None
             else:
                 seed = data_desc.seed
-                seed.generate_info_from_content(original_data=original_data)
+                if seed is not None:
+                    seed.generate_info_from_content(original_data=original_data)
 
             if resolve_dataprocess or data_desc.outcomes is None:
                 data = self.get_data(data_desc.process, data_orig=seed)
@@ -2451,10 +2491,11 @@ class FmkPlumbing(object):
                 err_detected = True
 
             if tg_fbk.has_fbk_collector():
-                for ref, fbk, status, tstamp in tg_fbk.iter_and_cleanup_collector():
+                fbk_entries = tg_fbk.iter_and_cleanup_collector(with_data_id=True)
+                for ref, fbk, status, tstamp, data_id in fbk_entries:
                     if status < 0:
                         err_detected = True
-                    self.lg.log_target_feedback_from(source=FeedbackSource(tg, subref=ref),
+                    self.lg.log_target_feedback_from(source=FeedbackSource(tg, subref=ref, data_id=data_id),
                                                      content=fbk,
                                                      status_code=status,
                                                      timestamp=tstamp,
@@ -2487,20 +2528,17 @@ class FmkPlumbing(object):
             # Wait until the target is ready or timeout expired
             try:
                 for tg in self.targets.values():
-                    while not tg.is_target_ready_for_new_data():
-                        time.sleep(0.005)
-                        now = datetime.datetime.now()
-                        if (now - t0).total_seconds() > self._hc_timeout_max:
-                            self.lg.log_target_feedback_from(
-                                source=FeedbackSource(self),
-                                content='*** Timeout! The target {!s} does not seem to be ready.'
-                                    .format(self.available_targets_desc[tg]),
-                                status_code=-1,
-                                timestamp=now
-                            )
-                            ret = -1
-                            tg.cleanup()
-                            break
+                    remaining = self._hc_timeout_max - (datetime.datetime.now() - t0).total_seconds()
+                    if not tg.wait_until_ready(max(remaining, 0.005)):
+                        self.lg.log_target_feedback_from(
+                            source=FeedbackSource(self),
+                            content='*** Timeout! The target {!s} does not seem to be ready.'
+                                .format(self.available_targets_desc[tg]),
+                            status_code=-1,
+                            timestamp=datetime.datetime.now()
+                        )
+                        ret = -1
+                        tg.cleanup()
             except KeyboardInterrupt:
                 self.lg.log_comment("*** Waiting for target to become ready has been cancelled by the user!\n")
                 self.set_error("Waiting for target to become ready has been cancelled by the user!",
@@ -3351,6 +3389,137 @@ class FmkPlumbing(object):
         else:
             return data
 
+    def _get_action_dmakers(self, action_list):
+        '''
+        Return the data makers that may perform the actions of @action_list, as a list of
+        4-uplets: (index of the action, data maker type, data maker name, candidate objects).
+        The data maker name is None if the action does not specify it, or if the data maker is
+        cloned by the action (in which case the candidates are the data makers to be cloned).
+        '''
+        action_dmakers = []
+        for idx, full_action in enumerate(action_list):
+            action = full_action[0] if isinstance(full_action, (tuple, list)) else full_action
+            if isinstance(action, (tuple, list)):
+                dmaker_type, dmaker_name = action
+            else:
+                dmaker_type, dmaker_name = action, None
+            parsed = self.check_clone_re.match(dmaker_type)
+            if parsed is not None:
+                dmaker_type = parsed.group(1)
+
+            candidates = []
+            for tactics in (self._tactics, self._generic_tactics):
+                # the first item of the action list is a generator
+                if idx == 0:
+                    dmakers = tactics.get_generators_list(dmaker_type)
+                    get_obj = tactics.get_generator_obj
+                else:
+                    dmakers = tactics.get_disruptors_list(dmaker_type)
+                    get_obj = tactics.get_disruptor_obj
+                if not dmakers:
+                    continue
+                names = dmakers.keys() if dmaker_name is None else [dmaker_name]
+                for name in names:
+                    obj = get_obj(dmaker_type, name)
+                    if obj is not None:
+                        candidates.append(obj)
+
+            action_dmakers.append((idx, dmaker_type, None if parsed is not None else dmaker_name,
+                                   candidates))
+
+        return action_dmakers
+
+    @staticmethod
+    def _is_stateful_dmaker(dmaker_obj):
+        if isinstance(dmaker_obj, StatefulDisruptor):
+            return True
+        return isinstance(dmaker_obj, Generator) and \
+            (isinstance(dmaker_obj, DynGeneratorFromScenario) or
+             getattr(dmaker_obj, '_modelwalker_user', False))
+
+    def _get_partitionable_walk(self, stateful_dmakers):
+        '''
+        Return (index of the action, data maker type, data maker name, data maker object) of
+        the model walker based stateful disruptor whose walk can be split among the pregeneration workers, if
+        it is the only stateful data maker of the action list and its walk has not started.
+        Otherwise return None.
+        '''
+        if len(stateful_dmakers) != 1:
+            return None
+        idx, dmaker_type, dmaker_name, candidates = stateful_dmakers[0]
+        if len(candidates) != 1:
+            return None
+        dmaker_obj = candidates[0]
+        if idx == 0 or not isinstance(dmaker_obj, StatefulDisruptor) \
+                or not dmaker_obj._modelwalker_user \
+                or not dmaker_obj.is_attr_set(DataMakerAttr.NeedSeed):
+            return None
+        if dmaker_name is None:
+            dmaker_name = self._tactics.get_disruptor_name(dmaker_type, dmaker_obj)
+            if dmaker_name is None:
+                dmaker_name = self._generic_tactics.get_disruptor_name(dmaker_type, dmaker_obj)
+            if dmaker_name is None:
+                return None
+        return idx, dmaker_type, dmaker_name, dmaker_obj
+
+    @EnforceOrder(accepted_states=['S2'])
+    def start_data_pregeneration(self, action_list, nb_data=-1, nb_workers=1, seed=None,
+                                 queue_size=16, valid_gen=False, save_seed=False):
+        '''
+        Start a pool of worker processes that generate data from @action_list
+        ahead of time (refer to DataPregenerator). The returned object provides
+        a get_data() method to pop the generated data, which can then be sent
+        through send_data_and_log(). Its stop() method has to be called
+        when it is no longer needed.
+
+        As the workers neither retrieve the feedback nor access the FmkDB, the data
+        pregeneration is refused if @action_list contains data makers relying on them
+        (scenarios and data makers registered with 'feedback_user'), or if the generated data
+        carry callbacks. In such cases, None is returned and the data have to be generated
+        through get_data().
+
+        If @action_list contains a model walker based stateful disruptor (e.g., tTYPE) whose
+        walk has not started, the walk is split among the workers (through the disruptor
+        parameters 'shard' and 'nb_shards'). If it contains other stateful data makers (or
+        several ones), only one worker is used, so that they walk a single sequence. In both
+        cases, the state of the data makers is brought up to date with the consumed data when
+        the pregeneration is stopped.
+
+        Return None if data pregeneration is not supported on this platform.
+        '''
+        if not is_pregeneration_supported():
+            self.set_error("Data pregeneration is not supported on this platform",
+                           code=Error.FmkWarning)
+            return None
+
+        action_dmakers = self._get_action_dmakers(action_list)
+        if any(obj.feedback_user for _, _, _, candidates in action_dmakers for obj in candidates):
+            self.set_error("Data pregeneration is not used as the action list contains data "
+                           "makers relying on the feedback", code=Error.FmkWarning)
+            return None
+
+        stateful_dmakers = [action for action in action_dmakers
+                            if any(self._is_stateful_dmaker(obj) for obj in action[3])]
+        walk = self._get_partitionable_walk(stateful_dmakers)
+        if nb_workers > 1 and stateful_dmakers and walk is None:
+            self.set_error("Data pregeneration uses a single worker because of the "
+                           "stateful data makers of the action list", code=Error.FmkWarning)
+            nb_workers = 1
+
+        pregen = DataPregenerator(self, action_list, nb_data=nb_data, nb_workers=nb_workers,
+                                  seed=seed, queue_size=queue_size, valid_gen=valid_gen,
+                                  save_seed=save_seed, walk=walk,
+                                  stateful=bool(stateful_dmakers))
+        pregen.start()
+        if pregen.first_data_has_callbacks():
+            pregen.stop()
+            self.set_error("Data pregeneration is not used as the generated data carry "
+                           "callbacks", code=Error.FmkWarning)
+            return None
+        self.lg.log_fmk_info('Data pregeneration started ({:d} worker(s), seed: {:d})'
+                             .format(pregen.nb_workers, pregen.seed), do_record=False)
+        return pregen
+
     @EnforceOrder(accepted_states=['S1','S2'])
     def cleanup_all_dmakers(self, reset_existing_seed=True):
         return self._cleanup_all_dmakers(reset_existing_seed=reset_existing_seed)
@@ -3461,6 +3630,9 @@ class FmkPlumbing(object):
             else:
                 msg += "stopped"
             self.lg.print_console(msg, rgb=Color.SUBINFO)
+            stats = self.mon.get_probe_latency_stats(p)
+            if stats.executions:
+                self.lg.print_console('  \_ ' + str(stats), rgb=Color.SUBINFO)
 
         self.lg.print_console('\n', nl_before=False)
 
@@ -3759,6 +3931,9 @@ class FmkShell(cmd.Cmd):
     def postcmd(self, stop, line):
         self.prompt = self.config.prompt + ' '
 
+        if self.fz.lg is not None:
+            self.fz.lg.flush()
+
         if self._quit_shell:
             self._quit_shell = False
             msg = colorize(FontStyle.BOLD + "\nReally Quit? [Y/n]", rgb=Color.WARNING)
@@ -4712,19 +4887,40 @@ class FmkShell(cmd.Cmd):
                     'prompt_height': conf.prompt_height
                     }
 
+        try:
+            pregen_workers = self.config.send_loop.pregen.workers
+            pregen_queue_size = self.config.send_loop.pregen.queue_size
+        except AttributeError:
+            # configuration files created by previous fuddly versions lack these keys
+            pregen_workers = 0
+
+        pregen = None
+        if pregen_workers > 0:
+            pregen = self.fz.start_data_pregeneration(t, nb_data=max_loop, nb_workers=pregen_workers,
+                                                      queue_size=pregen_queue_size,
+                                                      valid_gen=valid_gen,
+                                                      save_seed=use_existing_seed)
+
         with aligned_stdout(**kwargs):
             # for i in range(nb):
             cpt = 0
-            while cpt < max_loop or max_loop == -1:
-                cpt += 1
-                data = self.fz.get_data(t, valid_gen=valid_gen, save_seed=use_existing_seed)
-                if data is None:
-                    return False
-                if tg_ids:
-                    data.tg_ids = tg_ids
-                cont = self.fz.send_data_and_log(data)
-                if not cont:
-                    break
+            try:
+                while cpt < max_loop or max_loop == -1:
+                    cpt += 1
+                    if pregen is None:
+                        data = self.fz.get_data(t, valid_gen=valid_gen, save_seed=use_existing_seed)
+                    else:
+                        data = pregen.get_data()
+                    if data is None:
+                        return False
+                    if tg_ids:
+                        data.tg_ids = tg_ids
+                    cont = self.fz.send_data_and_log(data)
+                    if not cont:
+                        break
+            finally:
+                if pregen is not None:
+                    pregen.stop()
 
         self.__error = False
         return False
@@ -4943,6 +5139,35 @@ class FmkShell(cmd.Cmd):
         self.__error = False
         return False
 
+    def do_set_adaptive_feedback_timeout(self, line):
+        '''
+        Learn the feedback timeout from the response times of the target (the 95th
+        percentile of the last response times, times 2), within the limit of the
+        feedback timeout (if supported by the target)
+        |  syntax: set_adaptive_feedback_timeout <on|off> [targetID]
+        |  |_ if targetID is not provided, the value applies to all enabled targets
+        '''
+        self.__error = True
+
+        args = line.split()
+        args_len = len(args)
+
+        if args_len < 1 or args_len > 2 or args[0] not in ('on', 'off'):
+            return False
+
+        tg_id = None
+        if args_len > 1:
+            try:
+                tg_id = int(args[1])
+            except ValueError:
+                self.__error_msg = "Parameter 2 shall be an integer!"
+                return False
+
+        self.fz.set_adaptive_feedback_timeout(args[0] == 'on', tg_id=tg_id)
+
+        self.__error = False
+        return False
+
     def do_switch_feedback_mode(self, line):
         '''
         Switch target feedback mode between:
@@ -0,0 +1,378 @@
+################################################################################
+#
+#  Copyright 2014-2016 Eric Lacombe <eric.lacombe@security-labs.org>
+#
+################################################################################
+#
+#  This file is part of fuddly.
+#
+#  fuddly is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  fuddly is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with fuddly. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+from __future__ import print_function
+
+import os
+import sys
+import random
+import signal
+import multiprocessing
+
+from framework.data import Data
+from framework.global_resources import Error, HOOK
+from framework.tactics_helpers import UI
+
+if sys.version_info[0] > 2:
+    import queue as Queue
+else:
+    import Queue
+
+try:
+    # Workers have to inherit the loaded data model, the data makers and
+    # their current state. That is why only the 'fork' start method is
+    # supported.
+    _mp_ctx = multiprocessing.get_context('fork')
+except AttributeError:
+    # python 2 always forks on POSIX systems
+    _mp_ctx = multiprocessing if os.name == 'posix' else None
+except ValueError:
+    _mp_ctx = None
+
+
+def is_pregeneration_supported():
+    return _mp_ctx is not None
+
+
+def ignore_sigint():
+    # Ctrl+C is handled by the process which forked the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def create_worker_pool(nb_workers):
+    """
+    Fork a pool of @nb_workers processes, which inherit the current state of the
+    framework (data model, data makers, ...) and ignore Ctrl+C.
+    Only available if :func:`is_pregeneration_supported` returns True.
+    """
+    return _mp_ctx.Pool(processes=nb_workers, initializer=ignore_sigint)
+
+
+class DataPregenerator(object):
+    '''
+    Pool of worker processes that generate data ahead of time from an
+    action list (the same format as the one expected by FmkPlumbing.get_data()).
+
+    Each worker is forked from the framework (and thus inherits the loaded data
+    model and the data makers), is seeded with its own partition of the seed
+    (``seed + worker index``) and only generates its share of the data: the
+    ones whose index in the sequence is equal to its index modulo the number of
+    workers. The generated data are serialized in a bounded queue per worker,
+    so that :meth:`get_data` pops them in a deterministic order for a given
+    seed and number of workers.
+
+    When @walk is provided, it identifies a model walker based stateful disruptor
+    of the action list (refer to FmkPlumbing.start_data_pregeneration()), whose walk
+    is split among the workers through its parameters 'shard' and 'nb_shards'. All the
+    workers are then seeded with the same seed, so that they walk the same seed data,
+    and :meth:`get_data` pops the data by increasing walk step, which provides the
+    steps of a single walk in the same order (the values drawn at random by the
+    data model may however differ, as the workers do not consume the random
+    generator as a single walk would).
+
+    The generated Data() are rebuilt from their raw content, their history and
+    the information provided by the data makers, which is what is needed for
+    them to be logged in the FmkDB. As the callbacks registered on the data could
+    not be run by the framework, a worker stops when it generates data carrying
+    callbacks (other than the ones run once the data is produced), and
+    :meth:`get_data` then reports it. :meth:`first_data_has_callbacks` allows to check
+    it before sending any data.
+
+    Note: the data makers only evolve within the workers. Thus, if the action list
+    contains stateful data makers (@stateful), :meth:`stop` brings their state up to
+    date with the popped data: a split walk is resumed from its last popped step
+    (through the disruptor parameter 'init'), otherwise the popped data are generated
+    again by the framework (as the state of the data makers, e.g., their
+    ongoing walks, cannot be shipped back from the worker), which costs as much as
+    their first generation. The state of the random generator is preserved.
+    '''
+
+    poll_period = 0.5
+
+    def __init__(self, fmk, action_list, nb_data=-1, nb_workers=1, seed=None,
+                 queue_size=16, valid_gen=False, save_seed=False, walk=None, stateful=False):
+        assert nb_workers > 0 and queue_size > 0
+        self._fmk = fmk
+        self._action_list = action_list
+        self._nb_data = nb_data
+        self._nb_workers = nb_workers
+        self._seed = random.randrange(2**32) if seed is None else seed
+        self._queue_size = queue_size
+        self._valid_gen = valid_gen
+        self._save_seed = save_seed
+        self._walk = walk
+        self._stateful = stateful or walk is not None
+
+        self._workers = []
+        self._queues = []
+        self._next_idx = 0
+        self._exhausted = False
+        self._synced = False
+        self._next = None
+        # related to split walks
+        self._heads = {}
+        self._ended = {}
+        self._last_step = None
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def nb_workers(self):
+        return self._nb_workers
+
+    def start(self):
+        if not is_pregeneration_supported():
+            raise NotImplementedError("Data pregeneration needs the 'fork' start method")
+
+        for wkr_idx in range(self._nb_workers):
+            q = _mp_ctx.Queue(maxsize=self._queue_size)
+            p = _mp_ctx.Process(target=self._run_worker, args=(wkr_idx, q),
+                                name='DataPregenerator-{:d}'.format(wkr_idx))
+            p.daemon = True
+            p.start()
+            self._queues.append(q)
+            self._workers.append(p)
+
+    def stop(self):
+        for p in self._workers:
+            if p.is_alive():
+                p.terminate()
+        for p in self._workers:
+            p.join()
+        for q in self._queues:
+            q.close()
+            q.join_thread()
+        self._workers = []
+        self._queues = []
+        self._exhausted = True
+
+        if not self._synced:
+            self._synced = True
+            self._sync_data_makers()
+
+    def _get_walk_user_inputs(self):
+        full_action = self._action_list[self._walk[0]]
+        user_input = full_action[1] if isinstance(full_action, (tuple, list)) else None
+        return {} if user_input is None else dict(user_input.get_inputs())
+
+    def _get_walk_action_list(self, user_inputs):
+        walk_idx = self._walk[0]
+        full_action = self._action_list[walk_idx]
+        action = full_action[0] if isinstance(full_action, (tuple, list)) else full_action
+        action_list = list(self._action_list)
+        action_list[walk_idx] = (action, UI(**user_inputs))
+        return action_list
+
+    def _reset_walk(self):
+        # the disruptor has to be set up again to take into account the new parameters
+        _, dmaker_type, dmaker_name, _ = self._walk
+        self._fmk.cleanup_dmaker(dmaker_type=dmaker_type, name=dmaker_name, error_on_init=False)
+
+    def _sync_data_makers(self):
+        if not self._stateful or self._next_idx == 0:
+            return
+
+        fmk = self._fmk
+        rand_state = random.getstate()
+        # the seed data are generated again from the seed used by the workers
+        random.seed(self._seed)
+        try:
+            if self._walk is None:
+                for _ in range(self._next_idx):
+                    if fmk.get_data(self._action_list, valid_gen=self._valid_gen,
+                                    save_seed=self._save_seed) is None:
+                        break
+            elif self._last_step is not None:
+                user_inputs = self._get_walk_user_inputs()
+                init = user_inputs.get('init', 1)
+                max_steps = user_inputs.get('max_steps', -1)
+                user_inputs['init'] = self._last_step
+                if max_steps != -1:
+                    user_inputs['max_steps'] = init + max_steps - self._last_step
+                self._reset_walk()
+                # the walk is resumed by generating again its last popped step
+                fmk.get_data(self._get_walk_action_list(user_inputs), valid_gen=self._valid_gen,
+                             save_seed=self._save_seed)
+        finally:
+            random.setstate(rand_state)
+
+    def _run_worker(self, wkr_idx, q):
+        # Ctrl+C is handled by the sending loop which stops the workers
+        ignore_sigint()
+
+        fmk = self._fmk
+        action_list = self._action_list
+        walk_dmaker = None
+        if self._walk is None:
+            random.seed(self._seed + wkr_idx)
+            if self._nb_data < 0:
+                share = -1
+            else:
+                share = self._nb_data // self._nb_workers
+                if wkr_idx < self._nb_data % self._nb_workers:
+                    share += 1
+        else:
+            random.seed(self._seed)
+            # the number of data is enforced by get_data(), as the steps are not
+            # evenly spread among the shards
+            share = -1
+            # the shard requested by the user (if any) is split among the workers
+            user_inputs = self._get_walk_user_inputs()
+            shard = user_inputs.get('shard', 0)
+            nb_shards = user_inputs.get('nb_shards', 1)
+            user_inputs['shard'] = shard + wkr_idx * nb_shards
+            user_inputs['nb_shards'] = nb_shards * self._nb_workers
+            action_list = self._get_walk_action_list(user_inputs)
+            walk_dmaker = self._walk[3]
+            self._reset_walk()
+
+        data_idx = 0
+        while share < 0 or data_idx < share:
+            data = fmk.get_data(action_list, valid_gen=self._valid_gen,
+                                save_seed=self._save_seed)
+            if data is None:
+                errors = [(e.msg, e.context, e.code) for e in fmk.get_error()]
+                if walk_dmaker is not None and errors \
+                        and all(code == Error.HandOver for _, _, code in errors):
+                    # the shard has been walked
+                    q.put(('end', errors))
+                else:
+                    q.put(('error', errors))
+                return
+
+            if any(data.has_callbacks(hook) for hook in HOOK
+                   if hook != HOOK.after_dmaker_production):
+                q.put(('callbacks', None))
+                return
+
+            walker = getattr(walk_dmaker, 'modelwalker', None)
+            step = None if walker is None else walker.last_step
+            q.put(('data', (self._serialize(data), step)))
+            data_idx += 1
+
+        q.put(('end', []))
+
+    @staticmethod
+    def _serialize(data):
+        return (data.to_bytes(), data.get_history(), data.get_initial_dmaker(),
+                data.info, data.feedback_timeout, data.feedback_mode)
+
+    def _deserialize(self, serialized):
+        raw, history, initial_dmaker, info, fbk_timeout, fbk_mode = serialized
+        data = Data(raw)
+        data.set_data_model(self._fmk.dm)
+        data.set_history(history)
+        data.set_initial_dmaker(initial_dmaker)
+        data.info = info
+        data.feedback_timeout = fbk_timeout
+        data.feedback_mode = fbk_mode
+        return data
+
+    def _pop(self, wkr_idx):
+        q = self._queues[wkr_idx]
+        p = self._workers[wkr_idx]
+        while True:
+            try:
+                return q.get(timeout=self.poll_period)
+            except Queue.Empty:
+                if not p.is_alive():
+                    # the worker may have put its last item just before exiting
+                    try:
+                        return q.get(timeout=self.poll_period)
+                    except Queue.Empty:
+                        return ('error', [('Data pregeneration worker #{:d} has died '
+                                           '(exit code: {!r})'.format(wkr_idx, p.exitcode),
+                                           None, Error.UnrecoverableError)])
+
+    def _pop_next_step(self):
+        # Each worker walks its shard by increasing step, thus the next step of the
+        # walk is the lowest one among the next data of the workers.
+        for wkr_idx in range(self._nb_workers):
+            if wkr_idx in self._heads or wkr_idx in self._ended:
+                continue
+            kind, content = self._pop(wkr_idx)
+            if kind == 'data':
+                self._heads[wkr_idx] = content
+            elif kind == 'end':
+                self._ended[wkr_idx] = content
+            else:
+                return kind, content
+
+        if not self._heads:
+            # every shard has been walked
+            return 'end', max(self._ended.values(), key=len)
+
+        wkr_idx = min(self._heads, key=lambda idx: (-1 if self._heads[idx][1] is None
+                                                    else self._heads[idx][1], idx))
+        return 'data', self._heads.pop(wkr_idx)
+
+    def _pop_next(self):
+        if self._next is not None:
+            item, self._next = self._next, None
+            return item
+        if self._walk is None:
+            return self._pop(self._next_idx % self._nb_workers)
+        elif 0 <= self._nb_data <= self._next_idx:
+            return 'end', []
+        else:
+            return self._pop_next_step()
+
+    def first_data_has_callbacks(self):
+        '''
+        Wait for the first data and return True if it carries callbacks (and thus
+        cannot be pregenerated). The data remains available through :meth:`get_data`.
+        '''
+        assert self._next_idx == 0
+        if self._next is None:
+            self._next = self._pop_next()
+        return self._next[0] == 'callbacks'
+
+    def get_data(self):
+        '''
+        Return the next pregenerated Data(), or None when all the data have
+        been consumed or when a worker has failed. In the latter case, the errors
+        raised by the worker are set in the framework, like FmkPlumbing.get_data()
+        would do.
+        '''
+        if self._exhausted:
+            return None
+
+        kind, content = self._pop_next()
+
+        if kind == 'data':
+            self._next_idx += 1
+            serialized, step = content
+            if step is not None:
+                self._last_step = step
+            return self._deserialize(serialized)
+
+        self._exhausted = True
+        if kind == 'callbacks':
+            self._fmk.set_error("Data pregeneration stopped as the generated data carry "
+                                "callbacks", code=Error.FmkWarning)
+        elif content:
+            for msg, context, code in content:
+                self._fmk.set_error(msg, context=context, code=code)
+        return None
@@ -696,8 +696,19 @@ viewer_filename = None
 
 class Scenario(object):
 
-    def __init__(self, name, anchor=None, reinit_anchor=None):
+    def __init__(self, name, anchor=None, reinit_anchor=None, do_cleanup=None):
+        '''
+
+        Args:
+            name (str): name of the scenario
+            anchor (Step): first step of the scenario
+            reinit_anchor (Step): first step of the reinitialization sequence of the scenario
+            do_cleanup: function called with the scenario environment when the generator
+              running the scenario is cleaned up, whether the scenario has ended or not
+              (e.g., for releasing the resources used by the step callbacks)
+        '''
         self.name = name
+        self._do_cleanup = do_cleanup
         self._steps = None
         self._reinit_steps = None
         self._transitions = None
@@ -720,6 +731,10 @@ class Scenario(object):
     def reset(self):
         self._current = self._anchor
 
+    def do_cleanup(self):
+        if self._do_cleanup is not None:
+            self._do_cleanup(self._env)
+
     def set_data_model(self, dm):
         self._dm = dm
         self._env.dm = dm
@@ -423,6 +423,9 @@ class UI(object):
         return True, None
 
     def __getattr__(self, name):
+        if name == '_inputs':
+            # not yet set, e.g., when unpickling
+            raise AttributeError(name)
         if name in self._inputs:
             return self._inputs[name]
         else:
@@ -490,6 +493,9 @@ GENERIC_ARGS = {
     'init': ('make the model walker ignore all the steps until the provided one', 1, int),
     'max_steps': ('maximum number of steps (-1 means until the end)', -1, int),
     'runs_per_node': ('maximum number of test cases for a single node (-1 means until the end)', -1, int),
+    'nb_shards': ('split the walk in disjoint shards, one step out of nb_shards belonging '
+                  'to each shard (useful to spread the walk over several fuddly instances)', 1, int),
+    'shard': ('shard of the walk to perform, from 0 to nb_shards-1', 0, int),
     'clone_node': ('if True the dmaker will always return a copy ' \
                    'of the node. (for stateless diruptors dealing with ' \
                    'big data it can be usefull to it to False)', True, bool)
@@ -497,6 +503,7 @@ GENERIC_ARGS = {
 
 def modelwalker_inputs_handling_helper(dmaker):
     assert(dmaker.runs_per_node > 0 or dmaker.runs_per_node == -1)
+    assert(dmaker.nb_shards > 0 and 0 <= dmaker.shard < dmaker.nb_shards)
 
     if dmaker.runs_per_node == -1:
         dmaker.max_runs_per_node = -1
@@ -517,6 +524,7 @@ class DataMakerAttr:
 class DataMaker(object):
     knowledge_source = None
     _modelwalker_user = False
+    _feedback_user = False
     _args_desc = None
 
     def __init__(self):
@@ -530,6 +538,10 @@ class DataMaker(object):
     def modelwalker_user(self):
         return self._modelwalker_user
 
+    @property
+    def feedback_user(self):
+        return self._feedback_user
+
 class Generator(DataMaker):
     produced_seed = None
 
@@ -647,6 +659,8 @@ class dyn_generator_from_scenario(type):
 
 class DynGeneratorFromScenario(Generator):
     scenario = None
+    # the transitions of the scenario may depend on the feedback
+    _feedback_user = True
     _args_desc = collections.OrderedDict([
         ('graph', ('Display the scenario and highlight the current step each time the generator '
                   'is called.', False, bool)),
@@ -691,6 +705,7 @@ class DynGeneratorFromScenario(Generator):
         self._cleanup_walking_attrs()
         for periodic_id in self.scenario.periodic_to_clear:
             fmkops.unregister_task(periodic_id, ign_error=True)
+        self.scenario.do_cleanup()
 
     def _cleanup_walking_attrs(self):
         self.tr_selected = None
@@ -1162,9 +1177,11 @@ class StatefulDisruptor(DataMaker):
             return ret
 
 
-def disruptor(st, dtype, weight=1, valid=False, args=None, modelwalker_user=False):
+def disruptor(st, dtype, weight=1, valid=False, args=None, modelwalker_user=False,
+              feedback_user=False):
     def internal_func(disruptor_cls):
         disruptor_cls._modelwalker_user = modelwalker_user
+        disruptor_cls._feedback_user = feedback_user
         if modelwalker_user:
             if set(GENERIC_ARGS.keys()).intersection(set(args.keys())):
                 raise ValueError('At least one parameter is in conflict with a built-in parameter')
@@ -1184,9 +1201,11 @@ def disruptor(st, dtype, weight=1, valid=False, args=None, modelwalker_user=Fals
     return internal_func
 
 
-def generator(st, gtype, weight=1, valid=False, args=None, modelwalker_user=False):
+def generator(st, gtype, weight=1, valid=False, args=None, modelwalker_user=False,
+              feedback_user=False):
     def internal_func(generator_cls):
         generator_cls._modelwalker_user = modelwalker_user
+        generator_cls._feedback_user = feedback_user
         if modelwalker_user:
             if set(GENERIC_ARGS.keys()).intersection(set(args.keys())):
                 raise ValueError('At least one parameter is in conflict with a built-in parameter')
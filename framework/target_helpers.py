@@ -21,14 +21,64 @@
 #
 ################################################################################
 
+import collections
 import datetime
+import math
 import threading
+import time
 
 from framework.data import Data
 from libs.external_modules import *
 
 class TargetStuck(Exception): pass
 
+
+class ResponseTimeEstimator(object):
+    '''
+    Keep track of the last response times of a target in order to derive a feedback timeout
+    from them (a percentile of the response times multiplied by a safety margin).
+    '''
+
+    def __init__(self, percentile=95, margin=2.0, min_samples=10, window=100, min_timeout=0.05):
+        assert 0 < percentile <= 100
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.min_timeout = min_timeout
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, duration):
+        with self._lock:
+            self._samples.append(duration)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    @property
+    def nb_samples(self):
+        return len(self._samples)
+
+    def get_percentile(self):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        # nearest-rank method
+        rank = int(math.ceil(self.percentile / 100.0 * len(samples)))
+        return samples[max(rank, 1) - 1]
+
+    def get_timeout(self):
+        '''
+        Returns:
+            float: the learned timeout, or None if not enough response times have been recorded
+        '''
+        if len(self._samples) < self.min_samples:
+            return None
+        return max(self.min_timeout, self.get_percentile() * self.margin)
+
+
 class Target(object):
     '''
     Class abstracting the target we interact with.
@@ -54,6 +104,13 @@ class Target(object):
 
     _pending_data = None
 
+    # To be set to True by the targets that call signal_feedback_complete() as soon as the
+    # feedback related to the last sent data has been retrieved. The framework then waits on this
+    # signal instead of polling is_target_ready_for_new_data() at a high rate.
+    feedback_completion_signaled = False
+    _fbk_complete_event = None
+    _response_times = None
+
     def set_logger(self, logger):
         self._logger = logger
 
@@ -64,6 +121,7 @@ class Target(object):
         self._logger.print_console('*** Target initialization: ({:d}) {!s} ***\n'.format(tg_id, target_desc),
                                    nl_before=False, rgb=Color.COMPONENT_START)
         self._pending_data = []
+        self._fbk_complete_event = threading.Event()
         return self.start()
 
     def _stop(self, target_desc, tg_id):
@@ -136,6 +194,102 @@ class Target(object):
         '''
         return True
 
+    def signal_feedback_complete(self):
+        '''
+        To be called by the target when the feedback related to the last sent data has been
+        fully retrieved (e.g., the feedback sockets have been closed, the process under test
+        has exited, or a probe has reported), so that the framework goes on without waiting
+        for the feedback timeout. is_target_ready_for_new_data() shall return True at this point.
+        '''
+        ev = self._fbk_complete_event
+        if ev is not None:
+            ev.set()
+
+    def wait_until_ready(self, timeout):
+        '''
+        Used by the framework to wait until is_target_ready_for_new_data() returns True.
+
+        Note: only the targets that set `feedback_completion_signaled` (e.g., NetworkTarget)
+        are waited for through an event. For the other ones (e.g., EmptyTarget, LocalTarget,
+        or the targets provided by the projects), is_target_ready_for_new_data() is still
+        polled every 5ms, which costs some CPU time and may delay the next data by up to 5ms.
+
+        Args:
+            timeout (float): maximum time to wait (in seconds)
+
+        Returns:
+            bool: False if the timeout has expired, True otherwise
+        '''
+        deadline = time.time() + timeout
+        ev = self._fbk_complete_event
+        if ev is not None and self.feedback_completion_signaled:
+            polling_period = 0.1
+        else:
+            polling_period = 0.005
+            ev = None
+
+        while True:
+            if ev is not None:
+                ev.clear()
+            if self.is_target_ready_for_new_data():
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            if ev is None:
+                time.sleep(min(remaining, polling_period))
+            else:
+                ev.wait(min(remaining, polling_period))
+
+    def set_adaptive_feedback_timeout(self, enabled=True, percentile=95, margin=2.0,
+                                      min_samples=10):
+        '''
+        Enable the learning of the feedback timeout from the response times of the target.
+        Once `min_samples` response times have been recorded (refer to
+        :meth:`Target.record_response_time`), the feedback timeout actually used by the target is
+        the `percentile` of the last response times multiplied by `margin`, bounded by the
+        feedback timeout that has been set.
+
+        Args:
+            enabled (bool): enable or disable the adaptive feedback timeout
+            percentile (int): percentile of the response times to consider
+            margin (float): safety factor applied to the percentile
+            min_samples (int): minimum number of response times to learn from
+        '''
+        if enabled:
+            self._response_times = ResponseTimeEstimator(percentile=percentile, margin=margin,
+                                                         min_samples=min_samples)
+        else:
+            self._response_times = None
+
+    @property
+    def adaptive_feedback_timeout(self):
+        return self._response_times is not None
+
+    def record_response_time(self, duration):
+        '''
+        To be called by the target with the time elapsed between the sending of a data and the
+        reception of the last piece of feedback related to it. If the feedback has not been
+        completely retrieved within the feedback timeout, the timeout has to be recorded, so
+        that the learned timeout grows when the target gets slower (instead of being learned
+        from the fastest responses only).
+        '''
+        if self._response_times is not None:
+            self._response_times.record(duration)
+
+    def get_effective_feedback_timeout(self):
+        '''
+        Returns:
+            float: the feedback timeout to be used by the target for the next data, that is
+            either the learned one (if adaptive feedback timeout is enabled) or `feedback_timeout`
+        '''
+        timeout = self.feedback_timeout
+        if self._response_times is not None and timeout is not None:
+            learned = self._response_times.get_timeout()
+            if learned is not None:
+                timeout = min(timeout, learned)
+        return timeout
+
     def get_last_target_ack_date(self):
         '''
         If different from None the return value is used by the FMK to log the
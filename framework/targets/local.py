@@ -21,13 +21,18 @@
 #
 ################################################################################
 
+import collections
+import errno
 import fcntl
+import multiprocessing
 import os
 import random
 import select
 import signal
 import subprocess
+import time
 
+from framework.data import Data
 from framework.global_resources import workspace_folder
 from framework.target_helpers import Target
 from framework.knowledge.feedback_collector import FeedbackCollector
@@ -38,9 +43,28 @@ class LocalTarget(Target):
     _feedback_mode = Target.FBK_WAIT_UNTIL_RECV
     supported_feedback_mode = [Target.FBK_WAIT_UNTIL_RECV]
 
+    # Maximum time (in seconds) to wait for a pre-spawned process to open its input
+    PRESPAWN_OPEN_TIMEOUT = 5
+
     def __init__(self, target_path=None, pre_args='', post_args='',
-                 tmpfile_ext='.bin', send_via_stdin=False, send_via_cmdline=False):
+                 tmpfile_ext='.bin', send_via_stdin=False, send_via_cmdline=False,
+                 use_memfd=False, prespawn=0):
+        '''
+        Args:
+          use_memfd (bool): If True, the data are provided to the program through an in-memory
+            file (Linux `memfd`) referenced by a `/proc` path, instead of a file written within
+            the workspace. Not compatible with `prespawn`.
+          prespawn (int): Number of processes that are started ahead of time, so that their
+            initialization (process creation, dynamic loading, ...) does not delay the test cases.
+            The pool is refilled after the feedback of each data has been collected (or when
+            data are sent while it is empty, e.g., if the feedback has not been retrieved).
+            The processes wait for their input either on their stdin (if `send_via_stdin` is True)
+            or on a named pipe provided in place of the file (the program should then read
+            its input sequentially). Each process still handles only one data.
+        '''
         Target.__init__(self)
+        assert not (prespawn and send_via_cmdline)
+        assert not (prespawn and use_memfd)
         self._suffix = '{:0>12d}'.format(random.randint(2 ** 16, 2 ** 32))
         self._app = None
         self._pre_args = pre_args
@@ -50,6 +74,11 @@ class LocalTarget(Target):
         self._data_sent = None
         self._feedback_computed = None
         self._feedback = FeedbackCollector()
+        self._use_memfd = use_memfd
+        self._memfd = None
+        self._prespawn = prespawn
+        self._prespawned_apps = collections.deque()
+        self._fifo_cpt = 0
         self.set_target_path(target_path)
         self.set_tmp_file_extension(tmpfile_ext)
 
@@ -64,18 +93,21 @@ class LocalTarget(Target):
 
     def set_target_path(self, target_path):
         self._target_path = target_path
+        self._kill_prespawned_apps()
 
     def get_target_path(self):
         return self._target_path
 
     def set_pre_args(self, pre_args):
         self._pre_args = pre_args
+        self._kill_prespawned_apps()
 
     def get_pre_args(self):
         return self._pre_args
 
     def set_post_args(self, post_args):
         self._post_args = post_args
+        self._kill_prespawned_apps()
 
     def get_post_args(self):
         return self._post_args
@@ -99,27 +131,28 @@ class LocalTarget(Target):
 
         self._data_sent = False
 
-        return self.initialize()
+        if self._use_memfd:
+            if hasattr(os, 'memfd_create'):
+                self._memfd = os.memfd_create('fuzz_test_' + self._suffix)
+            else:
+                print('\n*** WARNING: memfd is not supported, the LocalTarget will use a file')
+
+        ok = self.initialize()
+        if ok:
+            self._spawn_missing_apps()
+        return ok
 
     def stop(self):
+        self._kill_prespawned_apps()
+        if self._memfd is not None:
+            os.close(self._memfd)
+            self._memfd = None
         return self.terminate()
 
     def _before_sending_data(self):
         self._feedback_computed = False
 
-    def send_data(self, data, from_fmk=False):
-        self._before_sending_data()
-        data = data.to_bytes()
-
-        if self._send_via_stdin:
-            name = ''
-        elif self._send_via_cmdline:
-            name = data
-        else:
-            name = os.path.join(workspace_folder, 'fuzz_test_' + self._suffix + self._tmpfile_ext)
-            with open(name, 'wb') as f:
-                 f.write(data)
-
+    def _spawn_app(self, name):
         if self._pre_args is not None and self._post_args is not None:
             cmd = [self._target_path] + self._pre_args.split() + [name] + self._post_args.split()
         elif self._pre_args is not None:
@@ -130,12 +163,99 @@ class LocalTarget(Target):
             cmd = [self._target_path, name]
 
         stdin_arg = subprocess.PIPE if self._send_via_stdin else None
-        self._app = subprocess.Popen(args=cmd, stdin=stdin_arg, stdout=subprocess.PIPE,
-                                     stderr=subprocess.PIPE)
+        return subprocess.Popen(args=cmd, stdin=stdin_arg, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+
+    def _spawn_missing_apps(self):
+        while len(self._prespawned_apps) < self._prespawn:
+            if self._send_via_stdin:
+                fifo = None
+                app = self._spawn_app('')
+            else:
+                self._fifo_cpt += 1
+                fifo = os.path.join(workspace_folder, 'fuzz_test_{:s}_{:d}{:s}'.format(
+                    self._suffix, self._fifo_cpt, self._tmpfile_ext))
+                os.mkfifo(fifo)
+                app = self._spawn_app(fifo)
+            self._prespawned_apps.append((app, fifo))
+
+    def _kill_prespawned_apps(self):
+        while self._prespawned_apps:
+            app, fifo = self._prespawned_apps.popleft()
+            try:
+                app.kill()
+                app.wait()
+            except OSError:
+                pass
+            for f in (app.stdin, app.stdout, app.stderr):
+                if f is not None:
+                    f.close()
+            if fifo is not None:
+                os.remove(fifo)
+
+    def _write_to_fifo(self, app, fifo, data):
+        # opening the write end of a named pipe fails with ENXIO while it is not open for reading
+        deadline = time.time() + self.PRESPAWN_OPEN_TIMEOUT
+        fd = None
+        while fd is None:
+            try:
+                fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO or app.poll() is not None or time.time() > deadline:
+                    print('\n*** WARNING: the program did not open its input')
+                    os.remove(fifo)
+                    return
+                time.sleep(0.001)
+        os.remove(fifo)
+
+        fl = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, fl & ~os.O_NONBLOCK)
+        with os.fdopen(fd, 'wb') as f:
+            try:
+                f.write(data)
+            except (IOError, OSError):
+                # the program has stopped reading its input
+                pass
+
+    def _write_to_memfd(self, data):
+        os.ftruncate(self._memfd, 0)
+        os.lseek(self._memfd, 0, os.SEEK_SET)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._memfd, view):]
+        return '/proc/{:d}/fd/{:d}'.format(os.getpid(), self._memfd)
+
+    def send_data(self, data, from_fmk=False):
+        self._before_sending_data()
+        data = data.to_bytes()
+
+        if self._prespawn:
+            if not self._prespawned_apps:
+                self._spawn_missing_apps()
+            self._app, fifo = self._prespawned_apps.popleft()
+            if fifo is not None:
+                self._write_to_fifo(self._app, fifo, data)
+        else:
+            if self._send_via_stdin:
+                name = ''
+            elif self._send_via_cmdline:
+                name = data
+            elif self._memfd is not None:
+                name = self._write_to_memfd(data)
+            else:
+                name = os.path.join(workspace_folder, 'fuzz_test_' + self._suffix + self._tmpfile_ext)
+                with open(name, 'wb') as f:
+                     f.write(data)
+
+            self._app = self._spawn_app(name)
 
         if self._send_via_stdin:
             with self._app.stdin as f:
-                f.write(data)
+                try:
+                    f.write(data)
+                except (IOError, OSError):
+                    # the program has stopped reading its input
+                    pass
 
         if not self._send_via_stdin and not self._send_via_cmdline:
             fl = fcntl.fcntl(self._app.stderr, fcntl.F_GETFL)
@@ -210,4 +330,233 @@ class LocalTarget(Target):
             self._feedback.set_error_code(-1)
         self._feedback.set_bytes(byte_string)
 
-        return self._feedback
\ No newline at end of file
+        if self._prespawn:
+            # refill the pool once the feedback has been collected, so that it
+            # delays neither the sending of the data nor the feedback
+            self._spawn_missing_apps()
+
+        return self._feedback
+
+
+class _LocalExecution(object):
+
+    def __init__(self, app, data, worker, send_id, deadline):
+        self.app = app
+        self.data = data
+        self.worker = worker
+        self.send_id = send_id
+        self.deadline = deadline
+        self.sent_at = time.time()
+        self.stdout = []
+        self.stderr = []
+        self.open_pipes = [app.stdout, app.stderr]
+        self.timed_out = False
+
+    @property
+    def ref(self):
+        data_id = self.data.get_data_id() if isinstance(self.data, Data) else None
+        if data_id is not None:
+            return 'Worker #{:d} - data #{!s}'.format(self.worker, data_id)
+        else:
+            return 'Worker #{:d} - sending #{:d}'.format(self.worker, self.send_id)
+
+    @property
+    def done(self):
+        return not self.open_pipes and self.app.poll() is not None
+
+
+class ParallelLocalTarget(LocalTarget):
+    '''Local target that runs up to `workers` instances of the program at the same time.
+
+    The data provided through :meth:`send_multiple_data` are dispatched across the workers,
+    each one using its own file within the workspace. When there are more data than workers,
+    the oldest execution is waited for before its worker is reused.
+    The feedback is gathered in the order of the data, once the related program has terminated,
+    or has been killed because it did not terminate within the feedback timeout. Each
+    feedback is referenced by the worker number followed by the FmkDB data ID of the
+    related data, so that it is recorded against this data.
+    '''
+
+    # Maximum execution time (in seconds) of the program if no feedback timeout is set
+    DEFAULT_EXEC_TIMEOUT = 5
+
+    def __init__(self, target_path=None, pre_args='', post_args='',
+                 tmpfile_ext='.bin', send_via_stdin=False, send_via_cmdline=False,
+                 workers=None):
+        '''
+        Args:
+          workers (int): maximum number of programs running concurrently. If None, the number
+            of CPUs is used.
+
+        Refer to :class:`LocalTarget` for the other parameters.
+        '''
+        LocalTarget.__init__(self, target_path=target_path, pre_args=pre_args,
+                             post_args=post_args, tmpfile_ext=tmpfile_ext,
+                             send_via_stdin=send_via_stdin, send_via_cmdline=send_via_cmdline)
+        self.workers = multiprocessing.cpu_count() if workers is None else workers
+        assert self.workers >= 1
+        self._free_workers = collections.deque(range(self.workers))
+        self._executions = collections.deque()
+        # executions completed before the feedback retrieval (refer to get_feedback())
+        self._completed = []
+        self._sending_id = 0
+
+    def get_description(self):
+        return LocalTarget.get_description(self) + ', Workers: {:d}'.format(self.workers)
+
+    def start(self):
+        self._free_workers = collections.deque(range(self.workers))
+        self._executions = collections.deque()
+        self._completed = []
+        return LocalTarget.start(self)
+
+    def stop(self):
+        self._kill_executions()
+        for idx in range(self.workers):
+            name = self._worker_file(idx)
+            if os.path.exists(name):
+                os.remove(name)
+        return LocalTarget.stop(self)
+
+    def _worker_file(self, idx):
+        return os.path.join(workspace_folder, 'fuzz_test_{:s}_w{:d}{:s}'.format(
+            self._suffix, idx, self._tmpfile_ext))
+
+    def send_data(self, data, from_fmk=False):
+        self.send_multiple_data([data], from_fmk=from_fmk)
+
+    def send_multiple_data(self, data_list, from_fmk=False):
+        self._before_sending_data()
+        self._sending_id += 1
+
+        for data in data_list:
+            if not self._free_workers:
+                self._complete_execution(self._executions[0])
+
+            worker = self._free_workers.popleft()
+            raw_data = data.to_bytes()
+            if self._send_via_stdin:
+                name = ''
+            elif self._send_via_cmdline:
+                name = raw_data
+            else:
+                name = self._worker_file(worker)
+                with open(name, 'wb') as f:
+                    f.write(raw_data)
+
+            timeout = self.get_effective_feedback_timeout()
+            if timeout is None:
+                timeout = self.DEFAULT_EXEC_TIMEOUT
+            app = self._spawn_app(name)
+            self._executions.append(_LocalExecution(app, data, worker, self._sending_id,
+                                                    time.time() + timeout))
+
+            if self._send_via_stdin:
+                with app.stdin as f:
+                    try:
+                        f.write(raw_data)
+                    except (IOError, OSError):
+                        pass
+
+        self._data_sent = True
+
+    def _read_outputs(self, timeout):
+        # drain the outputs of all the running programs, so that none of them is blocked
+        pipes = {}
+        for ex in self._executions:
+            for p in ex.open_pipes:
+                pipes[p] = ex
+        if not pipes:
+            time.sleep(min(timeout, 0.01))
+            return
+
+        ready = select.select(list(pipes.keys()), [], [], timeout)[0]
+        for p in ready:
+            ex = pipes[p]
+            chunk = os.read(p.fileno(), 65536)
+            if chunk:
+                (ex.stdout if p is ex.app.stdout else ex.stderr).append(chunk)
+            else:
+                ex.open_pipes.remove(p)
+                p.close()
+
+    def _complete_execution(self, ex):
+        # executions are completed in the order they have been launched
+        assert ex is self._executions[0]
+        while not ex.done:
+            remaining = ex.deadline - time.time()
+            if remaining <= 0:
+                if ex.app.poll() is None:
+                    ex.timed_out = True
+                    ex.app.kill()
+                    ex.app.wait()
+                self._read_outputs(0)
+                for p in ex.open_pipes:
+                    p.close()
+                ex.open_pipes = []
+                break
+            self._read_outputs(min(remaining, 0.05))
+
+        self._executions.popleft()
+        self._free_workers.append(ex.worker)
+        if ex.timed_out:
+            # the response time is censored, thus the timeout is recorded
+            # (refer to Target.record_response_time())
+            self.record_response_time(ex.deadline - ex.sent_at)
+        else:
+            self.record_response_time(time.time() - ex.sent_at)
+        self._completed.append(ex)
+
+    def _feedback_from_execution(self, ex):
+        stdout = b''.join(ex.stdout)
+        stderr = b''.join(ex.stderr)
+        exit_status = ex.app.returncode
+
+        status = 0
+        if not ex.timed_out and exit_status < 0:
+            status = exit_status
+        elif stderr:
+            status = -2
+        elif b'error' in stdout or b'invalid' in stdout:
+            status = -1
+
+        msgs = []
+        if status < 0 and exit_status < 0 and not ex.timed_out:
+            msgs.append('Negative return status ({:d})'.format(exit_status))
+        if ex.timed_out:
+            msgs.append('Killed as it did not terminate within the feedback timeout')
+        fbk = b'\n\n'.join([m.encode() for m in msgs] + [x for x in (stdout, stderr) if x])
+
+        if fbk or status < 0:
+            data_id = ex.data.get_data_id() if isinstance(ex.data, Data) else None
+            self._feedback.add_fbk_from(ex.ref, fbk, status=status, data_id=data_id)
+            if status < 0:
+                self._feedback.set_error_code(-1)
+
+    def _kill_executions(self):
+        while self._executions:
+            ex = self._executions.popleft()
+            if ex.app.poll() is None:
+                ex.app.kill()
+                ex.app.wait()
+            for p in ex.open_pipes:
+                p.close()
+            self._free_workers.append(ex.worker)
+
+    def cleanup(self):
+        self._kill_executions()
+        self._completed = []
+        self._data_sent = False
+
+    def get_feedback(self, timeout=None):
+        if not self._feedback_computed:
+            self._feedback_computed = True
+            while self._executions:
+                self._complete_execution(self._executions[0])
+            # The feedback entries are only built now, as the data get their FmkDB IDs once
+            # they have all been sent, while the oldest executions of a burst bigger than the
+            # number of workers are completed during the sending.
+            for ex in self._completed:
+                self._feedback_from_execution(ex)
+            self._completed = []
+        return self._feedback
@@ -54,6 +54,7 @@ class NetworkTarget(Target):
 
     _feedback_mode = Target.FBK_WAIT_FULL_TIME
     supported_feedback_mode = [Target.FBK_WAIT_FULL_TIME, Target.FBK_WAIT_UNTIL_RECV]
+    feedback_completion_signaled = True
 
     def __init__(self, host='localhost', port=12345, socket_type=(socket.AF_INET, socket.SOCK_STREAM),
                  data_semantics=UNKNOWN_SEMANTIC, server_mode=False, target_address=None, wait_for_client=True,
@@ -920,6 +921,8 @@ class NetworkTarget(Target):
 
         socket_errors = []
         has_read = False
+        last_recv = None
+        timed_out = False
 
         while dont_stop:
             ready_to_read = []
@@ -976,6 +979,7 @@ class NetworkTarget(Target):
                     else:
                         bytes_recd[s] = bytes_recd[s] + len(chunk)
                         chunks[s].append(chunk)
+                        last_recv = duration
 
                 has_read = True
 
@@ -992,7 +996,10 @@ class NetworkTarget(Target):
                 else:
                     dont_stop = False
 
-                if duration > fbk_timeout or (has_read and not self.fbk_wait_full_time_slot_mode):
+                if duration > fbk_timeout:
+                    dont_stop = False
+                    timed_out = True
+                elif has_read and not self.fbk_wait_full_time_slot_mode:
                     dont_stop = False
 
             else:
@@ -1015,6 +1022,12 @@ class NetworkTarget(Target):
                 self._feedback_collect(">>> ERROR[{:d}]: unable to interact with '{:s}' "
                                        "<<<".format(ev,fbkid), fbkid, error=-ev)
             if from_fmk:
+                if timed_out and (last_recv is None or not self.fbk_wait_full_time_slot_mode):
+                    # the feedback is not complete, thus the timeout is recorded
+                    # (refer to Target.record_response_time())
+                    self.record_response_time(fbk_timeout)
+                elif last_recv is not None:
+                    self.record_response_time(last_recv)
                 self._feedback_complete(send_id)
 
         return
@@ -1132,14 +1145,15 @@ class NetworkTarget(Target):
         feedback_thread = threading.Thread(None, self._collect_feedback_from,
                                            name='FBK-' + repr(self._sending_id) + '#' + repr(self._thread_cpt),
                                            args=(fbk_sockets, fbk_ids, fbk_lengths, epobj, fileno2fd,
-                                                 self._sending_id, self._feedback_timeout, from_fmk,
+                                                 self._sending_id,
+                                                 self.get_effective_feedback_timeout(), from_fmk,
                                                  pre_fbk))
         feedback_thread.start()
 
-    def _feedback_collect(self, fbk, ref, error=0):
+    def _feedback_collect(self, fbk, ref, error=0, data_id=None):
         if error < 0:
             self._feedback.set_error_code(error)
-        self._feedback.add_fbk_from(ref, fbk, status=error)
+        self._feedback.add_fbk_from(ref, fbk, status=error, data_id=data_id)
 
     def _feedback_complete(self, sid):
         # print('\n***DBG1:', self.feedback_complete_cpt, self.feedback_thread_qty,
@@ -1148,6 +1162,7 @@ class NetworkTarget(Target):
             self.feedback_complete_cpt += 1
             if self.feedback_complete_cpt == self.feedback_thread_qty:
                 self._feedback_handled = True
+                self.signal_feedback_complete()
         # print('\n***DBG2:', self.feedback_complete_cpt, self.feedback_thread_qty)
 
     def _before_sending_data(self, data_list, from_fmk):
@@ -1236,4 +1251,346 @@ class NetworkTarget(Target):
             desc += '{:s}:{:d}#{!s} (serv:{!r},hold:{!r}), '.format(
                 host, port, socket_type, server_mode, hold_connection)
 
-        return desc[:-2]
\ No newline at end of file
+        return desc[:-2]
+
+class _InFlightCase(object):
+
+    def __init__(self, skt, host, port, data, send_id, fbk_id, fbk_length, deadline):
+        self.socket = skt
+        self.host = host
+        self.port = port
+        self.data = data
+        self.send_id = send_id
+        self.fbk_id = fbk_id
+        self.fbk_length = fbk_length
+        self.deadline = deadline
+        self.chunks = []
+        self.bytes_recd = 0
+        self.sent_at = time.time()
+        self.last_recv = None
+
+    @property
+    def data_id(self):
+        return self.data.get_data_id() if isinstance(self.data, Data) else None
+
+
+class PipelinedNetworkTarget(NetworkTarget):
+    '''Network target that keeps a pool of persistent connections per client
+    interface and lets several test cases be in flight at the same time.
+
+    Each pooled connection carries at most one test case at a time, so that
+    everything received on it until the case completes (feedback timeout,
+    `feedback_length` reached, connection closed by the peer, or first
+    answer in `FBK_WAIT_UNTIL_RECV` mode) is attributed to the data that was
+    sent through it. A single reactor thread polls all the pooled connections,
+    and the target reports itself ready for new data as soon as a connection
+    is free, instead of waiting for the feedback of the previous data.
+
+    The feedback of a case is referenced by the feedback ID of the interface
+    and is provided with the FmkDB ID of the related data, so that it is
+    recorded against this data even if it comes back after newer data have
+    been sent.
+
+    Only client-mode ``SOCK_STREAM`` and ``SOCK_DGRAM`` interfaces are
+    pipelined. Data routed to a server-mode or a raw interface, and additional
+    feedback interfaces, are handled as in :class:`NetworkTarget`.
+    '''
+
+    def __init__(self, host='localhost', port=12345, socket_type=(socket.AF_INET, socket.SOCK_STREAM),
+                 data_semantics=NetworkTarget.UNKNOWN_SEMANTIC, server_mode=False, target_address=None,
+                 wait_for_client=True, hold_connection=True, keep_first_client=True,
+                 mac_src=None, mac_dst=None, pool_size=4):
+        """
+        Args:
+          pool_size (int): maximum number of connections opened per client interface, and thus
+            maximum number of test cases in flight.
+          hold_connection (bool): If `True` (default), pooled connections are reused from one data
+            to another. Otherwise, each connection is closed once its feedback is collected.
+
+        Refer to :class:`NetworkTarget` for the other parameters.
+        """
+        NetworkTarget.__init__(self, host=host, port=port, socket_type=socket_type,
+                               data_semantics=data_semantics, server_mode=server_mode,
+                               target_address=target_address, wait_for_client=wait_for_client,
+                               hold_connection=hold_connection, keep_first_client=keep_first_client,
+                               mac_src=mac_src, mac_dst=mac_dst)
+        assert pool_size >= 1
+        self.pool_size = pool_size
+        self._pool_cond = threading.Condition()
+        self._reactor_thread = None
+
+    def _is_pipelined(self, host, port, socket_type):
+        return not self.server_mode[(host, port)] and socket_type[1] != socket.SOCK_RAW
+
+    def _all_pipelined(self, data_list):
+        for data in data_list:
+            host, port, socket_type, _ = self._get_net_info_from(data)
+            if not self._is_pipelined(host, port, socket_type):
+                return False
+        return True
+
+    def start(self):
+        self._epoll = select.epoll()
+        self._idle_conns = {}
+        self._conn_count = {}
+        self._fd2socket = {}
+        self._sock2hp = {}
+        self._in_flight = {}
+        self._last_case = {}
+        ret = NetworkTarget.start(self)
+        self._reactor_thread = threading.Thread(None, self._reactor_main, name='NET-REACTOR')
+        self._reactor_thread.start()
+        return ret
+
+    def stop(self):
+        # in-flight cases are given a chance to complete before the reactor is stopped
+        with self._pool_cond:
+            while self._in_flight:
+                timeout = max(case.deadline for case in self._in_flight.values()) - time.time()
+                if timeout <= 0:
+                    break
+                self._pool_cond.wait(timeout)
+
+        self.stop_event.set()
+        if self._reactor_thread is not None:
+            self._reactor_thread.join()
+            self._reactor_thread = None
+
+        with self._pool_cond:
+            for case in list(self._in_flight.values()):
+                self._complete_case(case)
+            for skt in list(self._sock2hp.keys()):
+                self._discard_connection(skt)
+        self._epoll.close()
+
+        return NetworkTarget.stop(self)
+
+    def send_data(self, data, from_fmk=False):
+        assert data is not None
+        if self._all_pipelined([data]):
+            self._send_pipelined([data], from_fmk)
+        else:
+            NetworkTarget.send_data(self, data, from_fmk=from_fmk)
+
+    def send_multiple_data(self, data_list, from_fmk=False):
+        if data_list is not None and self._all_pipelined(data_list):
+            self._send_pipelined(data_list, from_fmk)
+        else:
+            NetworkTarget.send_multiple_data(self, data_list, from_fmk=from_fmk)
+
+    def collect_feedback_without_sending(self):
+        # feedback of pipelined interfaces is continuously collected by the reactor
+        for key in self.known_semantics:
+            host, port = self._host[key], self._port[key]
+            if not self._is_pipelined(host, port, self._socket_type[key]):
+                return NetworkTarget.collect_feedback_without_sending(self)
+        return False
+
+    def is_target_ready_for_new_data(self):
+        with self._pool_cond:
+            slot_available = len(self._in_flight) < self.pool_size
+        return self._feedback_handled and slot_available
+
+    def _send_pipelined(self, data_list, from_fmk):
+        self._before_sending_data(data_list, from_fmk)
+
+        for data in data_list:
+            host, port, socket_type, _ = self._get_net_info_from(data)
+            s = self._acquire_connection(host, port, socket_type)
+            if s is None:
+                err_msg = '>>> WARNING: unable to send data to {:s}:{:d} <<<'.format(host, port)
+                self._feedback.add_fbk_from(self._INTERNALS_ID, err_msg, status=-1)
+                continue
+
+            case = _InFlightCase(s, host, port, data, self._sending_id,
+                                 self._default_fbk_id[(host, port)], self.feedback_length,
+                                 time.time() + self.get_effective_feedback_timeout())
+            with self._pool_cond:
+                self._in_flight[s] = case
+                self._last_case[s] = case
+
+            raw_data = data.to_bytes() if isinstance(data, Data) else data
+            try:
+                s.sendall(raw_data)
+            except socket.error as serr:
+                with self._pool_cond:
+                    # the reactor may have already completed the case (e.g., on a reused
+                    # connection closed by the peer), and then discarded the connection
+                    if self._in_flight.pop(s, None) is case:
+                        self._discard_connection(s)
+                    self._pool_cond.notify_all()
+                if serr.errno == socket.errno.EMSGSIZE:
+                    self._feedback.add_fbk_from(self._INTERNALS_ID,
+                                                'Message was not sent because it was too long!',
+                                                status=-1)
+                else:
+                    raise TargetStuck("system not ready for sending data! {!r}".format(serr))
+
+        # additional feedback interfaces cannot be correlated to a specific data, thus they are
+        # still collected per sending
+        if self._first_send_data_call:
+            self._first_send_data_call = False
+            fbk_sockets, fbk_ids, fbk_lengths = self._get_additional_feedback_sockets()
+        else:
+            fbk_sockets = None
+
+        if from_fmk:
+            if fbk_sockets:
+                epobj = select.epoll()
+                fileno2fd = {}
+                for fd in fbk_sockets:
+                    epobj.register(fd, select.EPOLLIN)
+                    fileno2fd[fd.fileno()] = fd
+                self._start_fbk_collector(fbk_sockets, fbk_ids, fbk_lengths, epobj, fileno2fd,
+                                          from_fmk)
+            else:
+                self._feedback_handled = True
+                self.signal_feedback_complete()
+
+    def _acquire_connection(self, host, port, socket_type):
+        hp = (host, port)
+        deadline = time.time() + self.sending_delay
+        with self._pool_cond:
+            while True:
+                idle = self._idle_conns.setdefault(hp, [])
+                if idle:
+                    return idle.pop()
+                if self._conn_count.get(hp, 0) < self.pool_size:
+                    # the slot is reserved while connecting outside of the lock
+                    self._conn_count[hp] = self._conn_count.get(hp, 0) + 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._pool_cond.wait(remaining)
+
+        s = socket.socket(*socket_type)
+        s.settimeout(self.sending_delay)
+        try:
+            s.connect(hp)
+        except socket_error as serr:
+            print('\n*** ERROR(while connecting): ' + str(serr))
+            s.close()
+            with self._pool_cond:
+                self._conn_count[hp] -= 1
+                self._pool_cond.notify_all()
+            return None
+
+        with self._pool_cond:
+            self._fd2socket[s.fileno()] = s
+            self._sock2hp[s] = hp
+            self._epoll.register(s, select.EPOLLIN)
+
+        return s
+
+    def _discard_connection(self, skt):
+        # to be called with self._pool_cond held
+        hp = self._sock2hp.pop(skt, None)
+        if hp is None:
+            return
+        for fd, s in list(self._fd2socket.items()):
+            if s is skt:
+                del self._fd2socket[fd]
+                try:
+                    self._epoll.unregister(fd)
+                except (ValueError, IOError, OSError):
+                    pass
+        idle = self._idle_conns.get(hp)
+        if idle and skt in idle:
+            idle.remove(skt)
+        self._last_case.pop(skt, None)
+        self._conn_count[hp] -= 1
+        skt.close()
+
+    def _release_connection(self, case):
+        # to be called with self._pool_cond held
+        skt = case.socket
+        if self.hold_connection[(case.host, case.port)]:
+            self._idle_conns.setdefault((case.host, case.port), []).append(skt)
+        else:
+            self._discard_connection(skt)
+        self._pool_cond.notify_all()
+
+    def _complete_case(self, case, error=None, timed_out=False):
+        # to be called with self._pool_cond held
+        del self._in_flight[case.socket]
+        if timed_out and (case.last_recv is None or not self.fbk_wait_full_time_slot_mode):
+            # the feedback is not complete, thus the timeout is recorded
+            # (refer to Target.record_response_time())
+            self.record_response_time(case.deadline - case.sent_at)
+        elif case.last_recv is not None:
+            self.record_response_time(case.last_recv - case.sent_at)
+        ref = case.fbk_id
+        with self._fbk_handling_lock:
+            fbk = b'\n'.join(case.chunks)
+            if fbk != b'':
+                fbk, err = self._feedback_handling(fbk, ref)
+                self._feedback_collect(fbk, ref, error=err, data_id=case.data_id)
+            if error is not None:
+                self._feedback_collect(">>> ERROR: unable to interact with '{:s}' "
+                                       "({!s}) <<<".format(ref, error), ref, error=-1,
+                                       data_id=case.data_id)
+        if error is None and case.socket in self._sock2hp:
+            self._release_connection(case)
+        else:
+            self._discard_connection(case.socket)
+            self._pool_cond.notify_all()
+        # a slot is available for a new test case
+        self.signal_feedback_complete()
+
+    def _reactor_main(self):
+        while not self.stop_event.is_set():
+            try:
+                events = self._epoll.poll(0.05)
+            except (IOError, OSError, ValueError):
+                # epoll object closed while stopping
+                break
+
+            now = time.time()
+            with self._pool_cond:
+                for fd, ev in events:
+                    skt = self._fd2socket.get(fd)
+                    if skt is None:
+                        continue
+                    case = self._in_flight.get(skt)
+                    try:
+                        chunk = skt.recv(self.CHUNK_SZ)
+                    except socket.timeout:
+                        continue
+                    except socket.error as serr:
+                        if case is not None:
+                            self._complete_case(case, error=serr)
+                        else:
+                            self._discard_connection(skt)
+                        continue
+
+                    if case is None:
+                        # answer that came after the completion of the case it belongs to
+                        last_case = self._last_case.get(skt)
+                        if chunk != b'' and last_case is not None:
+                            with self._fbk_handling_lock:
+                                fbk, err = self._feedback_handling(chunk, last_case.fbk_id)
+                                self._feedback_collect(fbk, last_case.fbk_id, error=err,
+                                                       data_id=last_case.data_id)
+                        if chunk == b'':
+                            self._discard_connection(skt)
+                            self._pool_cond.notify_all()
+                        continue
+
+                    if chunk == b'':
+                        self._discard_connection(skt)
+                        self._complete_case(case)
+                        continue
+
+                    if not case.chunks and case.send_id == self._sending_id:
+                        self._register_last_ack_date(datetime.datetime.now())
+                    case.chunks.append(chunk)
+                    case.bytes_recd += len(chunk)
+                    case.last_recv = now
+                    if (case.fbk_length is not None and case.bytes_recd >= case.fbk_length) or \
+                            not self.fbk_wait_full_time_slot_mode:
+                        self._complete_case(case)
+
+                for case in list(self._in_flight.values()):
+                    if now >= case.deadline:
+                        self._complete_case(case, timed_out=True)
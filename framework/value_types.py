@@ -108,6 +108,13 @@ class VT(object):
     def set_size_from_constraints(self, size=None, encoded_size=None):
         raise NotImplementedError
 
+    def get_absorb_window(self, constraints):
+        '''
+        Return the maximum number of bytes that absorption can consume from
+        the beginning of a blob, or None if it cannot be known in advance.
+        '''
+        return None
+
     def pretty_print(self, max_size=None):
         return None
 
@@ -282,6 +289,127 @@ class meta_int_str(type):
             meta_int_str.fuzzy_class[name] = cls
 
 
+class RepeatedPattern(object):
+    """
+    Description of the value `prefix + pattern * count`, which is only built when needed.
+    """
+
+    __slots__ = ('prefix', 'pattern', 'count')
+
+    def __init__(self, prefix, pattern, count):
+        self.prefix = prefix
+        self.pattern = pattern
+        self.count = count
+
+    def build(self):
+        return self.prefix + self.pattern * self.count
+
+    def __len__(self):
+        return len(self.prefix) + len(self.pattern) * self.count
+
+    def __eq__(self, other):
+        if isinstance(other, RepeatedPattern):
+            other = other.build()
+        return len(self) == len(other) and self.build() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return (self.prefix, self.pattern, self.count)
+
+    def __setstate__(self, state):
+        self.prefix, self.pattern, self.count = state
+
+
+class LazyValueList(object):
+    """
+    List of values some of which are described by :class:`RepeatedPattern` objects, so that
+    big values are only built when they are retrieved. It provides the part of the `list`
+    interface used by the value types, and is what the String fuzzing lists are made of.
+    """
+
+    __slots__ = ('_items',)
+
+    def __init__(self, items=None):
+        self._items = [] if items is None else list(items)
+
+    @staticmethod
+    def _build(item):
+        return item.build() if isinstance(item, RepeatedPattern) else item
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return LazyValueList(self._items[idx])
+        return self._build(self._items[idx])
+
+    def __iter__(self):
+        for item in self._items:
+            yield self._build(item)
+
+    def __contains__(self, val):
+        return any(item == val for item in self._items)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyValueList):
+            other = other._items
+        return len(self) == len(other) and all(item == v for item, v in zip(self._items, other))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __add__(self, other):
+        other = other._items if isinstance(other, LazyValueList) else other
+        return LazyValueList(self._items + list(other))
+
+    def __radd__(self, other):
+        return LazyValueList(list(other) + self._items)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __copy__(self):
+        return LazyValueList(self._items)
+
+    def __repr__(self):
+        return 'LazyValueList({!r})'.format(
+            [x if not isinstance(x, RepeatedPattern) else '<{:d} bytes>'.format(len(x))
+             for x in self._items])
+
+    def __getstate__(self):
+        return self._items
+
+    def __setstate__(self, state):
+        self._items = state
+
+    def append(self, val):
+        self._items.append(val)
+
+    def extend(self, vals):
+        self._items.extend(vals._items if isinstance(vals, LazyValueList) else vals)
+
+    def insert(self, idx, val):
+        self._items.insert(idx, val)
+
+    def pop(self, idx=-1):
+        return self._build(self._items.pop(idx))
+
+    def remove(self, val):
+        for idx, item in enumerate(self._items):
+            if item == val:
+                del self._items[idx]
+                return
+        raise ValueError('value not in list')
+
+
 class String(VT_Alt):
     """
     Value type that represents a character string.
@@ -296,6 +424,15 @@ class String(VT_Alt):
     DEFAULT_MAX_SZ = 10000
     encoded_string = False
 
+    # Maximum number of fuzzing lists kept by _enable_fuzz_mode() for being reused by the
+    # String objects that share the same value and parameters, e.g. clones of a node
+    # (0 disables the cache)
+    fuzz_cache_size = 256
+    _fuzz_cache = collections.OrderedDict()
+
+    # Fuzzing values at least this long (in bytes) are only built when they are drawn
+    LAZY_FUZZ_VALUE_MIN_SZ = 1024
+
     def encode(self, val):
         """
         To be overloaded by a subclass that deals with encoding.
@@ -535,6 +672,13 @@ class String(VT_Alt):
             return AbsorbStatus.Accept, off, size
 
 
+    def get_absorb_window(self, constraints):
+        if constraints[AbsCsts.Size] and not self.encoded_string and \
+                not (constraints[AbsCsts.Regexp] and self.regexp is not None):
+            return self.max_encoded_sz
+        else:
+            return None
+
     def do_absorb(self, blob, constraints, off=0, size=None):
         """
         Core function for absorption.
@@ -907,13 +1051,6 @@ class String(VT_Alt):
         self.drawn_val = None
 
     def _enable_fuzz_mode(self, fuzz_magnitude=1.0):
-        self.values_fuzzy = []
-
-        def add_to_fuzz_list(flist):
-            for v in flist:
-                if v not in self.values_fuzzy:
-                    self.values_fuzzy.append(v)
-
         if self.knowledge_source is None \
                 or not self.knowledge_source.is_info_class_represented(Language) \
                 or self.knowledge_source.is_assumption_valid(Language.C):
@@ -929,52 +1066,101 @@ class String(VT_Alt):
             else:
                 orig_val = random.choice(self.values_copy)
 
+        encoded_empty = len(self.encode(orig_val)) == 0
+        specific_list = getattr(self, 'specific_fuzzing_list', None)
+        cache_key = None
+        if self.fuzz_cache_size > 0:
+            cache_key = (self.__class__, orig_val, self.min_sz, self.max_sz,
+                         self.min_encoded_sz, self.max_encoded_sz, self.codec, fuzz_magnitude,
+                         C_strings_enabled, encoded_empty,
+                         tuple(self.extra_fuzzy_list) if self.extra_fuzzy_list else None,
+                         tuple(specific_list) if specific_list else None)
+            if self.__class__.encoding_test_cases != String.encoding_test_cases:
+                # the test cases may depend on the encoding scheme configuration
+                cache_key += (getattr(self, 'encoding_arg', None),)
+            try:
+                hash(cache_key)
+            except TypeError:
+                cache_key = None
+
+        if cache_key is not None and cache_key in String._fuzz_cache:
+            fuzz_list = String._fuzz_cache.pop(cache_key)
+            String._fuzz_cache[cache_key] = fuzz_list
+        else:
+            fuzz_list = tuple(self._build_fuzz_list(orig_val, fuzz_magnitude, C_strings_enabled,
+                                                    encoded_empty, specific_list))
+            if cache_key is not None:
+                String._fuzz_cache[cache_key] = fuzz_list
+        while len(String._fuzz_cache) > self.fuzz_cache_size:
+            String._fuzz_cache.popitem(last=False)
+
+        self.values_fuzzy = LazyValueList(fuzz_list)
+        if len(orig_val) > 0:
+            # randomized test case, thus never cached
+            self.values_fuzzy.insert(0, bp.corrupt_bits(orig_val, n=1))
+
+        self.values_save = self.values
+        self.values = self.values_fuzzy
+        self.values_copy = copy.copy(self.values)
+
+        self.drawn_val = None
+
+    def _build_fuzz_list(self, orig_val, fuzz_magnitude, C_strings_enabled, encoded_empty,
+                         specific_list):
+        values_fuzzy = []
+        known_values = set()
+
+        def add_to_fuzz_list(flist):
+            for v in flist:
+                if v not in known_values:
+                    known_values.add(v)
+                    values_fuzzy.append(v)
+
+        def repeat(prefix, pattern, count):
+            if len(prefix) + len(pattern) * count < self.LAZY_FUZZ_VALUE_MIN_SZ:
+                return prefix + pattern * count
+            else:
+                return RepeatedPattern(prefix, pattern, count)
+
         sz = len(orig_val)
         sz_delta_with_max = self.max_encoded_sz - sz
 
-        if sz > 0:
-            val = bp.corrupt_bits(orig_val, n=1)
-            self.values_fuzzy.append(val)
-
-        val = orig_val + b"A"*(sz_delta_with_max + 1)
-        self.values_fuzzy.append(val)
+        values_fuzzy.append(repeat(orig_val, b"A", sz_delta_with_max + 1))
 
-        if len(self.encode(orig_val)) > 0:
-            self.values_fuzzy.append(b'')
+        if not encoded_empty:
+            values_fuzzy.append(b'')
 
         if sz > 0:
             sz_delta_with_min = sz - self.min_sz
             val = orig_val[:-sz_delta_with_min-1]
             if val != b'':
-                self.values_fuzzy.append(val)
+                values_fuzzy.append(val)
 
         if self.max_sz > 0:
-            val = orig_val + b"X"*(self.max_sz*int(100*fuzz_magnitude))
-            self.values_fuzzy.append(val)
+            values_fuzzy.append(repeat(orig_val, b"X", self.max_sz*int(100*fuzz_magnitude)))
 
-        self.values_fuzzy.append(b'\x00' * sz if sz > 0 else b'\x00')
+        values_fuzzy.append(repeat(b'', b'\x00', sz) if sz > 0 else b'\x00')
 
         if C_strings_enabled and sz > 1:
             is_even = sz % 2 == 0
             cpt = sz // 2
-            if is_even:
-                self.values_fuzzy.append(b'%n' * cpt)
-                self.values_fuzzy.append(b'%s' * cpt)
-            else:
-                self.values_fuzzy.append(orig_val[:1] + b'%n' * cpt)
-                self.values_fuzzy.append(orig_val[:1] + b'%s' * cpt)
+            prefix = b'' if is_even else orig_val[:1]
+            values_fuzzy.append(repeat(prefix, b'%n', cpt))
+            values_fuzzy.append(repeat(prefix, b'%s', cpt))
 
         if C_strings_enabled:
-            self.values_fuzzy.append(orig_val + b'%n' * int(400*fuzz_magnitude))
-            self.values_fuzzy.append(orig_val + b'%s' * int(400*fuzz_magnitude))
-            self.values_fuzzy.append(orig_val + b'\"%n\"' * int(400*fuzz_magnitude))
-            self.values_fuzzy.append(orig_val + b'\"%s\"' * int(400*fuzz_magnitude))
-        self.values_fuzzy.append(orig_val + b'\r\n' * int(100*fuzz_magnitude))
-
+            values_fuzzy.append(repeat(orig_val, b'%n', int(400*fuzz_magnitude)))
+            values_fuzzy.append(repeat(orig_val, b'%s', int(400*fuzz_magnitude)))
+            values_fuzzy.append(repeat(orig_val, b'\"%n\"', int(400*fuzz_magnitude)))
+            values_fuzzy.append(repeat(orig_val, b'\"%s\"', int(400*fuzz_magnitude)))
+        values_fuzzy.append(repeat(orig_val, b'\r\n', int(100*fuzz_magnitude)))
+
+        # big values are not considered when removing duplicates, as it would require to build them
+        known_values.update(v for v in values_fuzzy if not isinstance(v, RepeatedPattern))
         if self.extra_fuzzy_list:
             add_to_fuzz_list(self.extra_fuzzy_list)
-        if hasattr(self, 'specific_fuzzing_list'):
-            add_to_fuzz_list(self.specific_fuzzing_list)
+        if specific_list:
+            add_to_fuzz_list(specific_list)
 
         if self.codec == self.ASCII:
             val = bytearray(orig_val)
@@ -983,27 +1169,21 @@ class String(VT_Alt):
                 val = bytes(val)
             else:
                 val = b'\xe9'
-            if val not in self.values_fuzzy:
-                self.values_fuzzy.append(val)
+            add_to_fuzz_list([val])
         elif self.codec == self.UTF16BE or self.codec == self.UTF16LE:
             if self.max_sz > 0:
                 if self.max_encoded_sz % 2 == 1:
                     nb = self.max_sz // 2
                     # euro character at the end that 'fully' use the 2 bytes of utf-16
                     val = ('A' * nb).encode(self.codec) + b'\xac\x20'
-                    if val not in self.values_fuzzy:
-                        self.values_fuzzy.append(val)
+                    add_to_fuzz_list([val])
 
         enc_cases = self.encoding_test_cases(orig_val, self.max_sz, self.min_sz,
                                              self.min_encoded_sz, self.max_encoded_sz)
         if enc_cases:
-            self.values_fuzzy += enc_cases
-
-        self.values_save = self.values
-        self.values = self.values_fuzzy
-        self.values_copy = copy.copy(self.values)
+            values_fuzzy += enc_cases
 
-        self.drawn_val = None
+        return values_fuzzy
 
     def get_value(self):
         if not self.values:
@@ -1015,8 +1195,7 @@ class String(VT_Alt):
         if self.determinist:
             ret = self.values_copy.pop(0)
         else:
-            ret = random.choice(self.values_copy)
-            self.values_copy.remove(ret)
+            ret = self.values_copy.pop(random.randrange(len(self.values_copy)))
 
         self.drawn_val = ret
         if self.encoded_string:
@@ -1194,6 +1373,9 @@ class INT(VT):
             return AbsorbStatus.Accept, off, None
 
 
+    def get_absorb_window(self, constraints):
+        return None if self.cformat is None else struct.calcsize(self.cformat)
+
     def do_absorb(self, blob, constraints, off=0, size=None):
 
         self.orig_values = copy.copy(self.values)
@@ -1292,7 +1474,7 @@ class INT(VT):
         if self.values is not None:
             l = list(filter(self.is_compatible, new_list))
             if l:
-                values_enc = list(map(self._convert_value, self.values))
+                values_enc = set(map(self._convert_value, self.values))
 
                 # We copy the list as it is a class attribute in
                 # Fuzzy_* classes, and we don't want to change the classes
@@ -1515,8 +1697,12 @@ class Fuzzy_INT(INT):
     values = None
     short_cformat = None
 
+    _fuzz_tables = {}
+
     def __init__(self, endian=VT.BigEndian, supp_list=None):
         self.endian = endian
+        if self.short_cformat is not None:
+            self._get_fuzz_table(endian)
         if supp_list:
             self.extend_value_list(supp_list)
 
@@ -1534,11 +1720,47 @@ class Fuzzy_INT(INT):
         else:
             return False
 
+    @classmethod
+    def _get_fuzz_table(cls, endian):
+        """
+        The encoded form of the class fuzzing values, as well as the compiled
+        structs, are computed once per (class, endianness) and shared by every
+        instance. They are not referenced by the instances, which remain picklable.
+        """
+        key = (cls, endian)
+        table = Fuzzy_INT._fuzz_tables.get(key)
+        if table is None:
+            enc = VT.enc2struct[endian]
+            st = struct.Struct(enc + cls.short_cformat)
+            alt_st = struct.Struct(enc + cls.alt_short_cformat)
+            values = list(cls.values)
+            try:
+                packed = struct.pack(enc + '{:d}{:s}'.format(len(values), cls.short_cformat), *values)
+            except struct.error:
+                encoded_values = {}
+                for v in values:
+                    try:
+                        encoded_values[v] = st.pack(v)
+                    except struct.error:
+                        encoded_values[v] = alt_st.pack(v)
+            else:
+                sz = st.size
+                encoded_values = {v: packed[i*sz:(i+1)*sz] for i, v in enumerate(values)}
+            table = (encoded_values, st, alt_st)
+            Fuzzy_INT._fuzz_tables[key] = table
+
+        return table
+
     def _convert_value(self, val):
+        encoded_values, st, alt_st = self._get_fuzz_table(self.endian)
+        try:
+            return encoded_values[val]
+        except KeyError:
+            pass
         try:
-            string = struct.pack(VT.enc2struct[self.endian] + self.short_cformat, val)
-        except:
-            string = struct.pack(VT.enc2struct[self.endian] + self.alt_short_cformat, val)
+            string = st.pack(val)
+        except struct.error:
+            string = alt_st.pack(val)
 
         return string
 
@@ -2077,10 +2299,9 @@ class BitField(VT_Alt):
                 max_oset = builtins.max(orig_set)
                 min_oset = builtins.min(orig_set)
                 if min_oset != max_oset:
-                    diff_sorted = sorted(set(range(min_oset, max_oset+1)) - orig_set)
-                    if diff_sorted:
-                        item1 = diff_sorted[0]
-                        item2 = diff_sorted[-1]
+                    holes = bp.missing_values_extrems(orig_set)
+                    if holes is not None:
+                        item1, item2 = holes
                         if item1 not in l and self.is_compatible(item1, sz):
                             l.append(item1)
                         if item2 not in l and self.is_compatible(item2, sz):
@@ -2234,6 +2455,9 @@ class BitField(VT_Alt):
         return decoded_val, result
 
 
+    def get_absorb_window(self, constraints):
+        return self.nb_bytes
+
     def absorb_auto_helper(self, blob, constraints):
         if len(blob) < self.nb_bytes:
             return AbsorbStatus.Reject, 0, None
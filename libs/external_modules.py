@@ -137,3 +137,19 @@ except ImportError:
     serial_module = False
     print('WARNING [FMK]: python(3)-serial module is not installed! '
           'Should be installed for serial-based Target.')
+
+zstd_module = True
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd_module = False
+    print('WARNING [FMK]: python(3)-zstandard module is not installed! '
+          'The zstd compression of FmkDB payloads will not be available.')
+
+numpy_module = True
+try:
+    import numpy
+except ImportError:
+    numpy_module = False
+    print('WARNING [FMK]: python(3)-numpy module is not installed! '
+          'The corruption of large payloads will be slower.')
@@ -25,6 +25,10 @@
 from __future__ import print_function
 
 import sys
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
 
 import ddt
@@ -39,6 +43,9 @@ from framework.fuzzing_primitives import *
 from framework.plumbing import *
 from framework.data_model import *
 from framework.encoders import *
+from framework.database import Database
+from framework.evolutionary_helpers import DefaultPopulation
+from framework.knowledge.feedback_collector import FeedbackCollector
 
 from test import ignore_data_model_specifics, run_long_tests, exit_on_import_error
 
@@ -820,6 +827,75 @@ class TestMisc(unittest.TestCase):
 
         return i
 
+    def test_corrupt_primitives(self):
+        import framework.basic_primitives as bp
+
+        payload = bytes(bytearray(range(256))) * 64
+        engines = [False, True] if numpy_module else [False]
+
+        for bulk in engines:
+            for n in [1, 1000, len(payload)*8 - 10]:
+                val = bp.corrupt_bits(payload, n=n, bulk=bulk)
+                self.assertEqual(sum(bin(a ^ b).count('1')
+                                     for a, b in zip(bytearray(payload), bytearray(val))), n)
+            val = bp.corrupt_bits(payload, p=0.2, ascii=True, bulk=bulk)
+            self.assertTrue(all(b < 0x80 for a, b in zip(bytearray(payload), bytearray(val))
+                                if a != b))
+
+            for n in [1, 1000, len(payload) - 10]:
+                val = bp.corrupt_bytes(payload, n=n, bulk=bulk)
+                self.assertEqual(sum(a != b for a, b in zip(bytearray(payload), bytearray(val))), n)
+            val = bp.corrupt_bytes(payload, p=0.2, ctrl_char=True, bulk=bulk)
+            self.assertTrue(all(b in bp.CTRL_CHARS for a, b in zip(bytearray(payload), bytearray(val))
+                                if a != b))
+
+            # seeded mode
+            self.assertEqual(bp.corrupt_bits(payload, seed=1, bulk=bulk),
+                             bp.corrupt_bits(payload, seed=1, bulk=bulk))
+            self.assertNotEqual(bp.corrupt_bytes(payload, seed=1, bulk=bulk),
+                                bp.corrupt_bytes(payload, seed=2, bulk=bulk))
+            random.seed(7)
+            val = bp.corrupt_bytes(payload, p=0.1, bulk=bulk)
+            random.seed(7)
+            self.assertEqual(bp.corrupt_bytes(payload, p=0.1, bulk=bulk), val)
+
+    def test_crossover_operand(self):
+        from framework.generic_data_makers import sd_crossover
+
+        leaves = [Node('l{:d}'.format(i), values=['v{:d}'.format(i)]) for i in range(9)]
+        dup = Node('dup', values=['d'])
+        top = Node('top', subnodes=[Node('a', subnodes=leaves[:3]),
+                                    Node('b', subnodes=[Node('c', subnodes=leaves[3:5]),
+                                                        leaves[5]]),
+                                    Node('e', subnodes=leaves[6:] + [dup, dup])])
+        top.set_env(Env())
+        top.freeze()
+
+        op = sd_crossover.Operand(top)
+        self.assertEqual(sorted(op.leafs), sorted(['top/a/l0', 'top/a/l1', 'top/a/l2',
+                                                   'top/b/c/l3', 'top/b/c/l4', 'top/b/l5',
+                                                   'top/e/l6', 'top/e/l7', 'top/e/l8',
+                                                   'top/e/dup']))
+        self.assertIs(op.get_node_by_path('top/b/c'), top['top/b/c$'])
+
+        op.compute_sub_graphs(1.0)
+        self.assertEqual(op.shared, ['top'])
+
+        for i in range(20):
+            op.compute_sub_graphs(0.5)
+            self.assertEqual(op.shared, sorted(op.shared))
+            covered = set()
+            for path in op.shared:
+                covered.update(l for l in op.leafs if l == path or l.startswith(path + '/'))
+                # a node is shared only if it is not a part of another shared subgraph
+                self.assertFalse([p for p in op.shared if p.startswith(path + '/')])
+            self.assertEqual(len(covered), 5)
+            for parent in ['top/a', 'top/b/c', 'top/e']:
+                children = [l for l in op.leafs if l.startswith(parent + '/')]
+                if all(c in covered for c in children):
+                    self.assertTrue(parent in op.shared or
+                                    any(parent.startswith(p + '/') for p in op.shared))
+
     # @unittest.skip("demonstrating skipping")
     def test_Node_unfreeze_dont_change_state(self):
         '''
@@ -1456,6 +1532,131 @@ class TestMisc(unittest.TestCase):
         e.make_determinist(all_conf=True, recursive=True)
         self._loop_nodes(e, loop_count, criteria_func=lambda x: x.name == 'Middle_NT')
 
+    def test_fmkdb_group_commit(self):
+        tmp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(tmp_dir, 'fmkDB.db')
+        try:
+            fmkdb = Database(fmkdb_path=db_path, group_commit=True, max_batch_latency=10,
+                             wal=True, synchronous='normal')
+            self.assertTrue(fmkdb.start())
+            fmkdb.insert_data_model('dm_test')
+            fmkdb.insert_project('prj_test')
+            fmkdb.insert_dmaker('dm_test', 'GTEST', 'gen_test', True, False)
+
+            now = datetime.datetime.now()
+            for i in range(50):
+                data_id = fmkdb.insert_data('GTEST', 'dm_test', b'data', 4, now, now,
+                                            'target', 'prj_test')
+                fmkdb.insert_steps(data_id, 1, 'GTEST', 'gen_test', None, None, None)
+                fmkdb.insert_feedback(data_id, 'src', now, b'feedback', status_code=0)
+            # a failing statement does not abort the other ones of its batch
+            fmkdb.insert_steps(data_id, 1, 'GTEST', 'gen_test', None, None, None)
+            fmkdb.insert_comment(data_id, 'comment', now)
+
+            self.assertEqual(fmkdb.execute_sql_statement('SELECT COUNT(*) FROM DATA'), [(50,)])
+            self.assertEqual(fmkdb.execute_sql_statement('PRAGMA journal_mode'), [('wal',)])
+
+            # the batch latency is not reached, nothing is committed yet
+            con = sqlite3.connect(db_path)
+            self.assertEqual(con.execute('SELECT COUNT(*) FROM DATA').fetchall(), [(0,)])
+            con.close()
+
+            fmkdb.stop()
+
+            con = sqlite3.connect(db_path)
+            self.assertEqual(con.execute('SELECT COUNT(*) FROM DATA').fetchall(), [(50,)])
+            self.assertEqual(con.execute('SELECT COUNT(*) FROM STEPS').fetchall(), [(50,)])
+            self.assertEqual(con.execute('SELECT COUNT(*) FROM FEEDBACK').fetchall(), [(50,)])
+            self.assertEqual(con.execute('SELECT COUNT(*) FROM COMMENTS').fetchall(), [(1,)])
+            con.close()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_fmkdb_payloads(self):
+        tmp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(tmp_dir, 'fmkDB.db')
+        try:
+            # database created by a previous fuddly version, with inline data contents
+            con = sqlite3.connect(db_path)
+            with open(gr.fmk_folder + Database.DDL_fname) as fd:
+                ddl = fd.read()
+            ddl = ddl.replace(',\n    PAYLOAD   TEXT REFERENCES PAYLOADS (HASH)', '')
+            ddl = ddl.replace('CREATE INDEX DATA_PAYLOAD ON DATA (PAYLOAD);', '')
+            ddl = re.sub(r'CREATE TABLE PAYLOADS \(.*?\);', '', ddl, flags=re.S)
+            con.executescript(ddl)
+            con.execute("INSERT INTO DATAMODEL(NAME) VALUES('dm_test')")
+            con.execute("INSERT INTO DMAKERS(DM_NAME,TYPE,NAME,GENERATOR,STATEFUL)"
+                        " VALUES('dm_test','GTEST','gen_test',1,0)")
+            for i in range(2):
+                con.execute("INSERT INTO DATA(TYPE,DM_NAME,CONTENT,SIZE) VALUES(?,?,?,?)",
+                            ('GTEST', 'dm_test', sqlite3.Binary(b'legacy'), 6))
+            con.commit()
+            con.close()
+
+            fmkdb = Database(fmkdb_path=db_path, compression='zlib', compression_threshold=100)
+            self.assertTrue(fmkdb.start())
+
+            now = datetime.datetime.now()
+            big = b'A' * 1000
+            for content in [b'data', b'data', big, big, b'data']:
+                data_id = fmkdb.insert_data('GTEST', 'dm_test', content, len(content), now,
+                                            now, 'target', 'prj_test')
+
+            self.assertEqual(fmkdb.execute_sql_statement('SELECT COUNT(*) FROM PAYLOADS'), [(2,)])
+            self.assertEqual(
+                fmkdb.execute_sql_statement(
+                    'SELECT COMPRESSION FROM PAYLOADS ORDER BY SIZE DESC'),
+                [('zlib',), (None,)])
+            records = fmkdb.fetch_data()
+            self.assertEqual([bytes(r[1]) for r in records],
+                             [b'legacy']*2 + [b'data']*2 + [big]*2 + [b'data'])
+
+            fmkdb.remove_data(data_id)
+            self.assertEqual(fmkdb.execute_sql_statement('SELECT COUNT(*) FROM PAYLOADS'), [(2,)])
+            fmkdb.remove_data(data_id - 1)
+            fmkdb.remove_data(data_id - 2)
+            self.assertEqual(fmkdb.execute_sql_statement('SELECT COUNT(*) FROM PAYLOADS'), [(1,)])
+
+            fmkdb.move_inline_contents()
+            self.assertEqual(
+                fmkdb.execute_sql_statement('SELECT COUNT(*) FROM DATA WHERE CONTENT IS NULL'),
+                [(4,)])
+            self.assertEqual(fmkdb.execute_sql_statement('SELECT COUNT(*) FROM PAYLOADS'), [(2,)])
+            records = fmkdb.fetch_data()
+            self.assertEqual([bytes(r[1]) for r in records], [b'legacy']*2 + [b'data']*2)
+            fmkdb.stop()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_logger_async_output(self):
+        lg = Logger('async_test', enable_file_logging=True, async_output=True)
+        lg.start()
+        log_file = lg._fd.name
+        try:
+            for i in range(200):
+                lg.log_fn('message {:d}'.format(i))
+            lg.log_fn(Data(b'\x00data'))
+            lg.flush()
+            with open(log_file) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(lines[:200], ['message {:d}'.format(i) for i in range(200)])
+            self.assertEqual(lines[200], lg._handle_binary_content(b'\x00data', raw=True))
+        finally:
+            lg.stop()
+            os.remove(log_file)
+
+        lg = Logger('async_test', async_output=True, output_queue_size=2)
+        lg.start()
+        writer_blocked = threading.Event()
+        lg._submit_output(writer_blocked.wait, (), {})
+        while lg._output_queue.qsize() > 0:
+            time.sleep(0.01)
+        for i in range(5):
+            lg.log_fn('message {:d}'.format(i))
+        self.assertEqual(lg.dropped_outputs, 3)
+        writer_blocked.set()
+        lg.stop()
+
 
 class TestModelWalker(unittest.TestCase):
     @classmethod
@@ -1746,6 +1947,68 @@ class TestModelWalker(unittest.TestCase):
             print(colorize('[%d] ' % idx + repr(rnode.to_bytes()), rgb=Color.INFO))
         self.assertEqual(idx, 27)
 
+    def test_TypedNodeDisruption_wide_value_range(self):
+        nt = Node('int', value_type=UINT32_be(values=[7, 0, 0x40000000]))
+        tn_consumer = TypedNodeDisruption()
+        fuzzed_vals = []
+        for rnode, consumed_node, orig_node_val, idx in ModelWalker(nt, tn_consumer, make_determinist=True,
+                                                                    max_steps=100):
+            fuzzed_vals.append(rnode.to_bytes())
+        for val in [1, 0x3FFFFFFF, 0x40000001, 0xFFFFFFFF]:
+            self.assertIn(struct.pack('>L', val), fuzzed_vals)
+
+    def test_fuzzy_int_pickling(self):
+        vt = TEST_Fuzzy_INT16(endian=VT.LittleEndian, supp_list=[0x10000])
+        for vt_copy in (pickle.loads(pickle.dumps(vt)), copy.deepcopy(vt)):
+            self.assertEqual(vt_copy.values, vt.values)
+            for _ in vt.values:
+                self.assertEqual(vt_copy.get_value(), vt.get_value())
+
+        nt = Node('int', value_type=UINT16_be(values=[7, 0x100]))
+        for rnode, consumed_node, orig_node_val, idx in ModelWalker(nt, TypedNodeDisruption(),
+                                                                    make_determinist=True):
+            self.assertEqual(pickle.loads(pickle.dumps(rnode)).to_bytes(), rnode.to_bytes())
+
+    def test_TypedNodeDisruption_shards_and_checkpoint(self):
+
+        def walk(**kwargs):
+            nt = self.dm.get_atom('Simple')
+            tn_consumer = TypedNodeDisruption()
+            ic = NodeInternalsCriteria(negative_node_subkinds=[String])
+            tn_consumer.set_node_interest(internals_criteria=ic)
+            walker = ModelWalker(nt, tn_consumer, make_determinist=True, **kwargs)
+            return walker, [(idx, rnode.to_bytes()) for rnode, _, _, idx in walker]
+
+        _, full_walk = walk(max_steps=300)
+        self.assertEqual(len(full_walk), 27)
+
+        shards = []
+        for shard_id in range(3):
+            _, shard = walk(max_steps=300, shard_id=shard_id, nb_shards=3)
+            self.assertTrue(shard)
+            for idx, _ in shard:
+                self.assertEqual((idx-1) % 3, shard_id)
+            shards += shard
+        self.assertEqual(sorted(shards), sorted(full_walk))
+
+        nt = self.dm.get_atom('Simple')
+        tn_consumer = TypedNodeDisruption()
+        tn_consumer.set_node_interest(internals_criteria=NodeInternalsCriteria(negative_node_subkinds=[String]))
+        walker = ModelWalker(nt, tn_consumer, make_determinist=True, max_steps=300,
+                             shard_id=1, nb_shards=2)
+        first_part = []
+        for rnode, consumed_node, orig_node_val, idx in walker:
+            first_part.append((idx, rnode.to_bytes()))
+            if len(first_part) == 5:
+                break
+        checkpoint = walker.get_checkpoint()
+        self.assertEqual(checkpoint, {'initial_step': 11, 'max_steps': 290,
+                                      'shard_id': 1, 'nb_shards': 2})
+
+        walker, second_part = walk(checkpoint=checkpoint)
+        self.assertEqual(first_part + second_part, [x for x in full_walk if x[0] % 2 == 0])
+        self.assertIsNone(walker.get_checkpoint())
+
     def test_TypedNodeDisruption_2(self):
         nt = self.dm.get_atom('Simple')
         tn_consumer = TypedNodeDisruption(max_runs_per_node=3, min_runs_per_node=3)
@@ -1959,6 +2222,215 @@ class TestNodeFeatures(unittest.TestCase):
         self.assertEqual(d_raw, d2_raw)
         self.assertEqual(d_raw, d3_raw)
 
+    def test_cow_clone(self):
+        desc = \
+        {'name': 'top',
+         'contents': [
+             {'name': 'id',
+              'contents': UINT16_be(values=[1, 2, 3])},
+             {'name': 'body',
+              'contents': [
+                  {'name': 'str1',
+                   'contents': String(values=['foo', 'bar'])},
+                  {'name': 'str2',
+                   'contents': String(values=['alpha', 'beta'])},
+              ]}
+        ]}
+
+        mb = NodeBuilder()
+        proto = mb.create_graph_from_desc(desc)
+        proto.make_determinist(recursive=True)
+        proto.freeze()
+        proto_raw = proto.to_bytes()
+
+        clone = Node('top', base_node=proto, new_env=True, cow=True)
+        self.assertEqual(clone.to_bytes(), proto_raw)
+        for path in ['top/id$', 'top/body/str1$', 'top/body/str2$']:
+            self.assertTrue(clone[path].cc.is_value_type_shared())
+            self.assertIs(clone[path].cc._value_type, proto[path].cc._value_type)
+
+        clone['top/body/str1$'].unfreeze()
+        self.assertEqual(clone.to_bytes(), b'\x00\x01baralpha')
+        self.assertFalse(clone['top/body/str1$'].cc.is_value_type_shared())
+        self.assertTrue(clone['top/body/str2$'].cc.is_value_type_shared())
+
+        # the prototype shall not be impacted
+        self.assertFalse(proto['top/body/str1$'].cc.is_value_type_shared())
+        self.assertEqual(proto.to_bytes(), proto_raw)
+        proto.unfreeze()
+        self.assertEqual(proto.to_bytes(), b'\x00\x02barbeta')
+        self.assertFalse(proto['top/body/str2$'].cc.is_value_type_shared())
+        self.assertEqual(clone.to_bytes(), b'\x00\x01baralpha')
+
+    def test_serialization_cache(self):
+        desc = \
+        {'name': 'top',
+         'contents': [
+             {'name': 'id',
+              'contents': UINT16_be(values=[1, 2, 3])},
+             {'name': 'body',
+              'contents': [
+                  {'name': 'str1',
+                   'contents': String(values=['foo', 'bar'])},
+                  {'name': 'str2',
+                   'contents': String(values=['alpha', 'beta'])},
+              ]},
+             {'name': 'tail',
+              'contents': [
+                  {'name': 'str3',
+                   'contents': String(values=['end'])},
+              ]}
+        ]}
+
+        mb = NodeBuilder()
+        top = mb.create_graph_from_desc(desc)
+        top.make_determinist(recursive=True)
+        top.enable_serialization_cache()
+
+        self.assertEqual(top.to_bytes(), b'\x00\x01fooalphaend')
+        self.assertEqual(top.get_serialization_cache_stats(), (0, 3))
+        self.assertEqual(top.to_bytes(), b'\x00\x01fooalphaend')
+        self.assertEqual(top.get_serialization_cache_stats(), (1, 3))
+
+        # only the path from the modified node to the root is serialized again
+        top['top/body/str1$'].set_frozen_value('FOO')
+        self.assertEqual(top.to_bytes(), b'\x00\x01FOOalphaend')
+        self.assertEqual(top.get_serialization_cache_stats(), (2, 5))
+
+        top['top/body/str2$'].unfreeze()
+        self.assertEqual(top.to_bytes(), b'\x00\x01FOObetaend')
+        top['top/id$'].unfreeze()
+        self.assertEqual(top.to_bytes(), b'\x00\x02FOObetaend')
+        self.assertEqual(top.get_serialization_cache_stats(), (5, 8))
+
+        top.reset_state(recursive=True)
+        self.assertEqual(top.to_bytes(), b'\x00\x01fooalphaend')
+
+        top.reset_serialization_cache_stats()
+        top.enable_serialization_cache(False)
+        top['top/body/str1$'].unfreeze()
+        self.assertEqual(top.to_bytes(), b'\x00\x01baralphaend')
+        self.assertEqual(top.get_serialization_cache_stats(), (0, 0))
+
+    def test_lookup_index(self):
+        desc = \
+        {'name': 'top',
+         'contents': [
+             {'name': 'id',
+              'semantics': ['ident'],
+              'contents': UINT16_be(values=[1, 2, 3])},
+             {'name': 'body',
+              'contents': [
+                  {'name': 'str1',
+                   'contents': String(values=['foo', 'bar'])},
+                  {'name': 'str2',
+                   'contents': String(values=['alpha', 'beta'])},
+              ]}
+        ]}
+
+        mb = NodeBuilder()
+        top = mb.create_graph_from_desc(desc)
+        top.freeze()
+
+        ic = NodeInternalsCriteria(mandatory_attrs=[NodeInternals.Mutable],
+                                   node_kinds=[NodeInternals_TypedValue])
+        sc = NodeSemanticsCriteria(mandatory_criteria=['ident'])
+
+        l = top.get_reachable_nodes(internals_criteria=ic, respect_order=True)
+        self.assertEqual([n.name for n in l], ['id', 'str1', 'str2'])
+        index = top._lookup_index
+        self.assertIsNotNone(index)
+        self.assertEqual([n.name for n in top.get_reachable_nodes(semantics_criteria=sc)], ['id'])
+        self.assertEqual([n.name for n in top.get_reachable_nodes(path_regexp='body/')], ['str1', 'str2'])
+        self.assertIs(top.get_node_by_path(path='top/body/str2'), l[2])
+        self.assertIs(top._lookup_index, index)
+
+        # attribute changes do not invalidate the index
+        l[1].clear_attr(NodeInternals.Mutable)
+        l = top.get_reachable_nodes(internals_criteria=ic, respect_order=True)
+        self.assertEqual([n.name for n in l], ['id', 'str2'])
+        self.assertIs(top._lookup_index, index)
+
+        # whereas structure changes do
+        top['top/body$'].set_subnodes_basic([Node('str3', values=['end'])])
+        top.unfreeze(recursive=False)
+        l = top.get_reachable_nodes(internals_criteria=ic, respect_order=True)
+        self.assertEqual([n.name for n in l], ['id', 'str3'])
+        self.assertIsNot(top._lookup_index, index)
+        self.assertIsNone(top.get_node_by_path(path='top/body/str2'))
+        self.assertEqual(top.get_node_by_path(path='top/body/str3').to_bytes(), b'end')
+
+    def test_iter_reachable_nodes(self):
+        shared = Node('str', values=['foo'])
+        desc = \
+        {'name': 'top',
+         'contents': [
+             {'name': 'body1',
+              'contents': [{'name': 'int', 'contents': UINT8(values=[1])},
+                           {'name': 'str', 'contents': shared}]},
+             {'name': 'body2',
+              'contents': [{'name': 'str', 'contents': shared},
+                           {'name': 'int2', 'contents': UINT8(values=[2])}]},
+        ]}
+
+        mb = NodeBuilder()
+        top = mb.create_graph_from_desc(desc)
+        top.freeze()
+
+        ic = NodeInternalsCriteria(node_kinds=[NodeInternals_TypedValue])
+        expected = ['int', 'str', 'int2']
+        for kwargs in [{}, {'ignore_fstate': True}, {'conf': 'MAIN'}]:
+            self.assertEqual([n.name for n in top.iter_reachable_nodes(internals_criteria=ic,
+                                                                       **kwargs)], expected)
+            self.assertEqual([n.name for n in top.get_reachable_nodes(internals_criteria=ic,
+                                                                      respect_order=True,
+                                                                      **kwargs)], expected)
+            self.assertEqual([n.name for n in top.iter_reachable_nodes(internals_criteria=ic, limit=2,
+                                                                       **kwargs)], expected[:2])
+
+        self.assertEqual([n.name for n in top.iter_reachable_nodes(relative_depth=1, exclude_self=True)],
+                         ['body1', 'body2'])
+        self.assertEqual([n.name for n in top.iter_reachable_nodes(relative_depth=2, exclude_self=True,
+                                                                   conf='MAIN')],
+                         ['body1', 'int', 'str', 'body2', 'int2'])
+        self.assertEqual(list(top.iter_reachable_nodes(limit=0)), [])
+
+    def test_path_reverse_map(self):
+        shared = Node('str', values=['foo'])
+        desc = \
+        {'name': 'top',
+         'contents': [
+             {'name': 'body1',
+              'contents': [{'name': 'int', 'contents': UINT8(values=[1])},
+                           {'name': 'str', 'contents': shared}]},
+             {'name': 'body2',
+              'contents': [{'name': 'str', 'contents': shared}]},
+        ]}
+
+        mb = NodeBuilder()
+        top = mb.create_graph_from_desc(desc)
+        top.freeze()
+
+        str_node = top['top/body1/str$']
+        body1 = top['top/body1$']
+        self.assertEqual(str_node.get_path_from(top), 'top/body1/str')
+        self.assertEqual(str_node.get_all_paths_from(top), ['top/body1/str', 'top/body2/str'])
+        self.assertEqual(str_node.get_path_from(body1), 'body1/str')
+        index = top._lookup_index
+        self.assertIsNotNone(index)
+        self.assertEqual(top['top/body1/int$'].get_path_from(top), 'top/body1/int')
+        self.assertIs(top._lookup_index, index)
+        self.assertIsNone(Node('other', values=['bar']).get_path_from(top))
+        self.assertEqual(Node('other', values=['bar']).get_all_paths_from(top), [])
+
+        # the paths are recomputed once the structure has changed
+        top['top/body2$'].set_subnodes_basic([Node('str2', values=['bar'])])
+        top.unfreeze(recursive=False)
+        top.freeze()
+        self.assertEqual(str_node.get_all_paths_from(top), ['top/body1/str'])
+        self.assertEqual(top['top/body2/str2$'].get_path_from(top), 'top/body2/str2')
+        self.assertIsNot(top._lookup_index, index)
+
     def test_absorb_nonterm_1(self):
         nint_1 = Node('nint1', value_type=UINT16_le(values=[0xabcd]))
         nint_2 = Node('nint2', value_type=UINT8(values=[0xf]))
@@ -2093,6 +2565,45 @@ class TestNodeFeatures(unittest.TestCase):
 
             self.assertEqual(status, AbsorbStatus.FullyAbsorbed)
 
+    def test_absorb_from_buffer(self):
+        import mmap
+
+        test_desc = \
+            {'name': 'test',
+             'contents': [
+                 {'name': 'rec',
+                  'qty': (1, -1),
+                  'contents': [
+                      {'name': 'len', 'contents': UINT16_be(min=0, max=0xFFFF)},
+                      {'name': 'tag', 'contents': String(values=['ABCD', 'EFGH'])},
+                      {'name': 'bf', 'contents': BitField(subfield_sizes=[4, 4],
+                                                          subfield_values=[None, [1, 2]],
+                                                          subfield_val_extremums=[[0, 15], None])}
+                  ]}
+             ]}
+
+        data = b''.join(struct.pack('>H', i) + (b'ABCD' if i % 2 else b'EFGH') + b'\x21'
+                        for i in range(300))
+
+        tmp = tempfile.TemporaryFile()
+        tmp.write(data)
+        tmp.flush()
+        mapped_data = mmap.mmap(tmp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        for blob in (data, bytearray(data), memoryview(data), mapped_data):
+            node = NodeBuilder().create_graph_from_desc(test_desc)
+            node.set_env(Env())
+            status, off, size, name = node.absorb(blob, constraints=AbsFullCsts())
+            self.assertEqual(status, AbsorbStatus.FullyAbsorbed)
+            self.assertEqual(size, len(data))
+            self.assertEqual(node.to_bytes(), data)
+            self.assertEqual(len(node.get_reachable_nodes(path_regexp=r'test/rec(:\d+)?$')), 300)
+            self.assertIsInstance(node['test/rec/tag'].to_bytes(), bytes)
+
+        node = None
+        mapped_data.close()
+        tmp.close()
+
     def test_intg_absorb_1(self):
 
         self.helper1_called = False
@@ -3092,6 +3603,80 @@ class TestNode_TypedValue(unittest.TestCase):
         self.assertEqual(status, AbsorbStatus.FullyAbsorbed)
 
 
+    def test_str_fuzz_cache(self):
+        String._fuzz_cache.clear()
+
+        def fuzz_values(vt):
+            vt.enable_fuzz_mode()
+            vals = list(vt.values)
+            vt.enable_normal_mode()
+            return vals
+
+        s1 = String(values=['TEST', 'OTHER'], extra_fuzzy_list=['SPE'])
+        s1.make_determinist()
+        v1 = fuzz_values(s1)
+        self.assertEqual(len(String._fuzz_cache), 1)
+        self.assertIn(b'SPE', v1)
+        self.assertEqual(len(v1), len(set(v1)))
+
+        s2 = copy.copy(s1)
+        v2 = fuzz_values(s2)
+        self.assertEqual(len(String._fuzz_cache), 1)
+        # only the bit-corrupted value is generated each time
+        self.assertEqual(v1[1:], v2[1:])
+        self.assertIs(v1[-1], v2[-1])
+        self.assertNotEqual(v1[0], b'TEST')
+
+        fuzz_values(String(values=['TEST', 'OTHER'], extra_fuzzy_list=['SPE2']))
+        fuzz_values(String(values=['TEST', 'OTHER'], max_sz=20, extra_fuzzy_list=['SPE']))
+        fuzz_values(Filename(values=['TEST', 'OTHER'], extra_fuzzy_list=['SPE']))
+        self.assertEqual(len(String._fuzz_cache), 4)
+
+        String.fuzz_cache_size = 2
+        try:
+            fuzz_values(s1)
+            self.assertEqual(len(String._fuzz_cache), 2)
+            String.fuzz_cache_size = 0
+            String._fuzz_cache.clear()
+            self.assertEqual(fuzz_values(s1)[1:], v1[1:])
+            self.assertEqual(len(String._fuzz_cache), 0)
+        finally:
+            String.fuzz_cache_size = 256
+
+
+    def test_str_lazy_fuzz_values(self):
+        vt = String(values=['TEST'], max_sz=1000)
+        vt.make_determinist()
+        vt.enable_fuzz_mode(fuzz_magnitude=2.0)
+
+        self.assertIsInstance(vt.values, LazyValueList)
+        lazy = [x for x in vt.values._items if isinstance(x, RepeatedPattern)]
+        self.assertTrue(lazy)
+        self.assertIn(b'TEST' + b'X' * 200000, vt.values)
+        self.assertEqual(len(vt.values), len(list(vt.values)))
+
+        nb = len(vt.values)
+        vals = []
+        while not vt.is_exhausted():
+            vals.append(vt.get_value())
+            if len(vals) == 3:
+                vt.rewind()
+                self.assertEqual(vt.get_value(), vals[-1])
+        self.assertEqual(len(vals), nb)
+        self.assertEqual(vals, list(vt.values))
+        self.assertIn(b'TEST' + b'%n' * 800, vals)
+
+        vt.reset_state()
+        self.assertEqual(vt.get_value(), vals[0])
+        vt2 = copy.copy(vt)
+        vt2.make_private(forget_current_state=False)
+        self.assertEqual(vt2.get_value(), vals[1])
+        self.assertEqual(vt.get_value(), vals[1])
+
+        vt.enable_normal_mode()
+        self.assertEqual(vt.get_value(), b'TEST')
+
+
 class TestHLAPI(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -3200,6 +3785,79 @@ class TestDataModel(unittest.TestCase):
         data = copy.copy(Data(node))
         data = copy.copy(Data('TEST'))
 
+    def test_import_file_contents(self):
+
+        class TLV_DataModel(DataModel):
+            file_extension = 'tlv'
+            name = 'tlv_test'
+
+            def create_node_from_raw_data(self, data, idx, filename):
+                self.nb_absorptions += 1
+                atom = self.tlv.get_clone('TLV_{:0>2d}'.format(idx), new_env=True)
+                status, off, size, name = atom.absorb(data, constraints=AbsNoCsts(size=True))
+                return atom if status == AbsorbStatus.FullyAbsorbed else None
+
+            def build_data_model(self):
+                tlv_desc = \
+                {'name': 'tlv',
+                 'contents': [
+                     {'name': 'rec',
+                      'qty': (1, -1),
+                      'contents': [
+                          {'name': 'len',
+                           'contents': UINT8()},
+                          {'name': 'val',
+                           'contents': lambda x: Node('cts', value_type=String(size=x.get_raw_value())),
+                           'node_args': 'len'}
+                      ]}
+                 ]}
+                self.tlv = NodeBuilder().create_graph_from_desc(tlv_desc)
+                self.nb_absorptions = 0
+
+        tmp_dir = tempfile.mkdtemp()
+        import_cache_folder = gr.import_cache_folder
+        gr.import_cache_folder = os.path.join(tmp_dir, 'cache') + os.sep
+        try:
+            samples = {}
+            for i in range(4):
+                recs = [os.urandom(random.randint(0, 30)) for _ in range(10 + i)]
+                samples['s{:d}.tlv'.format(i)] = b''.join(struct.pack('B', len(r)) + r for r in recs)
+            samples['bad.tlv'] = b'\x20TOO SHORT'
+            for fname, contents in samples.items():
+                with open(os.path.join(tmp_dir, fname), 'wb') as f:
+                    f.write(contents)
+
+            dm = TLV_DataModel()
+            dm.build_data_model()
+            ref_atoms = dm.import_file_contents(path=tmp_dir)
+            self.assertEqual(dm.nb_absorptions, 5)
+            self.assertEqual(len(ref_atoms), 4)
+            self.assertEqual(sorted(dm.import_throughput.keys()), sorted(samples.keys()))
+
+            atoms = dm.import_file_contents(path=tmp_dir, workers=2)
+            self.assertEqual(dm.nb_absorptions, 5 if is_parallel_import_supported() else 10)
+            self.assertEqual(sorted(dm.import_throughput.keys()), sorted(samples.keys()))
+            cached_atoms = dm.import_file_contents(path=tmp_dir, use_cache=True)
+            cached_atoms2 = dm.import_file_contents(path=tmp_dir, use_cache=True)
+            self.assertEqual(list(dm.import_throughput.keys()), ['bad.tlv'])
+
+            for atom_dict in (atoms, cached_atoms, cached_atoms2):
+                self.assertEqual(list(atom_dict.keys()), list(ref_atoms.keys()))
+                for fname, atom in atom_dict.items():
+                    self.assertEqual(atom.name, ref_atoms[fname].name)
+                    self.assertEqual(atom.to_bytes(), samples[fname])
+                    # the generator of the unpacked atom has to be functional
+                    atom['.*/rec/len'].set_values(value_type=UINT8(values=[3]))
+                    atom.unfreeze(recursive=True)
+                    self.assertEqual(len(atom['.*/rec/val/cts'].to_bytes()), 3)
+
+            # 'bad.tlv' is absorbed each time as the absorber rejects it
+            nb_absorptions = 5 if is_parallel_import_supported() else 10
+            self.assertEqual(dm.nb_absorptions, nb_absorptions + 5 + 1)
+        finally:
+            gr.import_cache_folder = import_cache_folder
+            shutil.rmtree(tmp_dir)
+
     @unittest.skipIf(not run_long_tests, "Long test case")
     def test_data_makers(self):
 
@@ -3503,6 +4161,276 @@ class TestDataModelHelpers(unittest.TestCase):
         self.assertEqual(len(shapes), 0)
 
 
+class TestTargets(unittest.TestCase):
+
+    def test_adaptive_feedback_timeout(self):
+        import socket
+        import threading
+        from framework.target_helpers import ResponseTimeEstimator
+        from framework.targets.network import NetworkTarget
+
+        est = ResponseTimeEstimator(percentile=90, margin=2.0, min_samples=5, min_timeout=0.01)
+        for d in [0.1, 0.2, 0.3, 0.4]:
+            est.record(d)
+        self.assertIsNone(est.get_timeout())
+        for d in [0.5, 0.6, 0.7, 0.8, 0.9, 10.0]:
+            est.record(d)
+        self.assertAlmostEqual(est.get_percentile(), 0.9)
+        self.assertAlmostEqual(est.get_timeout(), 1.8)
+
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(('localhost', 0))
+        server.listen(5)
+        port = server.getsockname()[1]
+
+        def handle_client(clientsocket):
+            # answer at once but never close the connection
+            while True:
+                msg = clientsocket.recv(100)
+                if not msg:
+                    break
+                if not msg.startswith(b'silent'):
+                    clientsocket.sendall(b'ECHO:' + msg)
+            clientsocket.close()
+
+        def serve():
+            while True:
+                try:
+                    clientsocket, _ = server.accept()
+                except socket.error:
+                    break
+                t = threading.Thread(target=handle_client, args=(clientsocket,))
+                t.daemon = True
+                t.start()
+
+        server_thread = threading.Thread(target=serve)
+        server_thread.daemon = True
+        server_thread.start()
+
+        tg = NetworkTarget(host='localhost', port=port)
+        tg.set_logger(Logger())
+        tg.set_timeout(fbk_timeout=0.5, sending_delay=1)
+        tg.set_feedback_mode(Target.FBK_WAIT_FULL_TIME)
+        tg.set_adaptive_feedback_timeout(min_samples=3)
+        tg._start('network target', 0)
+
+        durations = []
+        for i in range(8):
+            t0 = time.time()
+            tg.send_data(Data(b'msg' + str(i).encode()), from_fmk=True)
+            self.assertTrue(tg.wait_until_ready(5))
+            durations.append(time.time() - t0)
+        tg._stop('network target', 0)
+
+        # the executions which time out are recorded at the timeout value
+        tg_silent = NetworkTarget(host='localhost', port=port)
+        tg_silent.set_logger(Logger())
+        tg_silent.set_timeout(fbk_timeout=0.2, sending_delay=1)
+        tg_silent.set_feedback_mode(Target.FBK_WAIT_UNTIL_RECV)
+        tg_silent.set_adaptive_feedback_timeout(min_samples=3)
+        tg_silent._start('network target', 0)
+        for i in range(3):
+            tg_silent.send_data(Data(b'silent' + str(i).encode()), from_fmk=True)
+            self.assertTrue(tg_silent.wait_until_ready(5))
+        tg_silent._stop('network target', 0)
+        server.close()
+        self.assertEqual(tg_silent._response_times.nb_samples, 3)
+        self.assertAlmostEqual(tg_silent.get_effective_feedback_timeout(), 0.2)
+
+        # the full time slot is waited for until enough response times have been learned
+        for d in durations[:3]:
+            self.assertGreaterEqual(d, 0.5)
+        for d in durations[3:]:
+            self.assertLess(d, 0.3)
+        self.assertLess(tg.get_effective_feedback_timeout(), 0.3)
+
+        fbk = [c for _, c, _, _ in tg.get_feedback().iter_and_cleanup_collector()]
+        self.assertEqual(fbk, [[b'ECHO:msg' + str(i).encode() for i in range(8)]])
+
+    def test_pipelined_network_target(self):
+        import socket
+        import threading
+        from framework.targets.network import PipelinedNetworkTarget
+
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(('localhost', 0))
+        server.listen(5)
+        port = server.getsockname()[1]
+
+        def handle_client(clientsocket):
+            while True:
+                msg = clientsocket.recv(100)
+                if not msg:
+                    break
+                if msg.startswith(b'silent'):
+                    continue
+                time.sleep(0.3)
+                clientsocket.sendall(b'ECHO:' + msg)
+            clientsocket.close()
+
+        def serve():
+            while True:
+                try:
+                    clientsocket, _ = server.accept()
+                except socket.error:
+                    break
+                t = threading.Thread(target=handle_client, args=(clientsocket,))
+                t.daemon = True
+                t.start()
+
+        server_thread = threading.Thread(target=serve)
+        server_thread.daemon = True
+        server_thread.start()
+
+        tg = PipelinedNetworkTarget(host='localhost', port=port, pool_size=3)
+        tg.set_timeout(fbk_timeout=2, sending_delay=2)
+        tg.set_feedback_mode(Target.FBK_WAIT_UNTIL_RECV)
+        tg.start()
+
+        t0 = datetime.datetime.now()
+        for i in range(6):
+            while not tg.is_target_ready_for_new_data():
+                time.sleep(0.005)
+            data = Data(b'msg' + str(i).encode())
+            data.set_data_id(100 + i)
+            tg.send_data(data, from_fmk=True)
+        tg.stop()
+        duration = (datetime.datetime.now() - t0).total_seconds()
+
+        # the test cases which expire without answer are recorded at the timeout value
+        tg_silent = PipelinedNetworkTarget(host='localhost', port=port, pool_size=2)
+        tg_silent.set_timeout(fbk_timeout=0.2, sending_delay=2)
+        tg_silent.set_feedback_mode(Target.FBK_WAIT_UNTIL_RECV)
+        tg_silent.set_adaptive_feedback_timeout(min_samples=2)
+        tg_silent.start()
+        for i in range(2):
+            tg_silent.send_data(Data(b'silent' + str(i).encode()), from_fmk=True)
+        deadline = time.time() + 5
+        while tg_silent._response_times.nb_samples < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        tg_silent.stop()
+        server.close()
+        self.assertEqual(tg_silent._response_times.nb_samples, 2)
+        self.assertAlmostEqual(tg_silent.get_effective_feedback_timeout(), 0.2, places=2)
+
+        fbk = {}
+        ref = 'Default Feedback Socket - localhost:{:d}'.format(port)
+        for fbk_ref, content, status, _, data_id in \
+                tg.get_feedback().iter_and_cleanup_collector(with_data_id=True):
+            self.assertEqual(status, 0)
+            # the source is the interface, whatever the test case
+            self.assertEqual(fbk_ref, ref)
+            fbk[data_id] = content
+
+        self.assertEqual(len(fbk), 6)
+        for i in range(6):
+            self.assertEqual(fbk[100 + i], [b'ECHO:msg' + str(i).encode()])
+        # 6 test cases answered in 0.3s each through 3 connections
+        self.assertLess(duration, 1.6)
+
+
+    def test_local_target_prespawn(self):
+        import stat
+        from framework.targets.local import LocalTarget
+
+        tmpdir = tempfile.mkdtemp()
+        script = os.path.join(tmpdir, 'prog.sh')
+        with open(script, 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'if [ -z "$1" ]; then c=$(cat); else c=$(cat "$1"); fi\n'
+                    'case "$c" in *crash*) kill -SEGV $$;; esac\n'
+                    'echo "out:$c"\n')
+        os.chmod(script, 0o755)
+
+        def run(tg, contents):
+            results = []
+            tg.start()
+            try:
+                for c in contents:
+                    tg.send_data(Data(c))
+                    pool_sizes.append(len(tg._prespawned_apps))
+                    tg._app.wait()
+                    fbk = tg.get_feedback()
+                    # the pool is refilled after the feedback retrieval
+                    pool_sizes.append(len(tg._prespawned_apps))
+                    results.append((fbk.get_bytes().strip(), fbk.get_error_code()))
+                    fbk.cleanup()
+            finally:
+                tg.stop()
+            return results
+
+        expected = [(b'out:abc', 0), (b'', -1), (b'out:def', 0)]
+        configs = [dict(prespawn=2, send_via_stdin=True), dict(prespawn=2),
+                   dict(use_memfd=True), dict()]
+        for params in configs:
+            pool_sizes = []
+            tg = LocalTarget(target_path=script, **params)
+            self.assertEqual(run(tg, [b'abc', b'crash', b'def']), expected, params)
+            if params.get('prespawn'):
+                self.assertEqual(pool_sizes, [1, 2] * 3)
+                self.assertEqual(len(tg._prespawned_apps), 0)
+
+        shutil.rmtree(tmpdir)
+        fifos = [f for f in os.listdir(gr.workspace_folder)
+                 if stat.S_ISFIFO(os.stat(os.path.join(gr.workspace_folder, f)).st_mode)]
+        self.assertEqual(fifos, [])
+
+
+    def test_parallel_local_target(self):
+        from framework.targets.local import ParallelLocalTarget
+
+        tmpdir = tempfile.mkdtemp()
+        script = os.path.join(tmpdir, 'prog.sh')
+        with open(script, 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'c=$(cat "$1")\n'
+                    'case "$c" in *crash*) kill -SEGV $$;; *hang*) sleep 10;; esac\n'
+                    'sleep 0.3\n'
+                    'echo "out:$c"\n')
+        os.chmod(script, 0o755)
+
+        tg = ParallelLocalTarget(target_path=script, workers=4)
+        tg.set_feedback_timeout(2)
+        tg.start()
+        data_list = [Data(b'crash' if i == 1 else b'msg' + str(i).encode()) for i in range(8)]
+
+        t0 = time.time()
+        tg.send_multiple_data(data_list)
+        # as the framework does, the data are logged (and get their IDs) once they are sent,
+        # thus after the completion of the first executions (more data than workers)
+        for i, d in enumerate(data_list):
+            d.set_data_id(100 + i)
+        fbk = tg.get_feedback()
+        duration = time.time() - t0
+        self.assertEqual(fbk.get_error_code(), -1)
+        results = list(fbk.iter_and_cleanup_collector(with_data_id=True))
+        self.assertEqual(len(results), 8)
+        for i, (ref, content, status, _, data_id) in enumerate(results):
+            self.assertTrue(ref.endswith(' - data #{:d}'.format(100 + i)))
+            self.assertEqual(data_id, 100 + i)
+            if i == 1:
+                self.assertEqual(status, -11)
+            else:
+                self.assertEqual(status, 0)
+                self.assertEqual(content, [b'out:msg' + str(i).encode() + b'\n'])
+        # 8 executions of 0.3s dispatched across 4 workers
+        self.assertLess(duration, 1.5)
+
+        tg.set_feedback_timeout(0.5)
+        fbk.cleanup()
+        tg.send_data(Data(b'hang'))
+        ref, content, status, _ = list(tg.get_feedback().iter_and_cleanup_collector())[0]
+        self.assertEqual(status, 0)
+        self.assertIn(b'Killed', content[0])
+        tg.stop()
+
+        self.assertFalse([f for f in os.listdir(gr.workspace_folder)
+                          if f.startswith('fuzz_test_' + tg._suffix)])
+        shutil.rmtree(tmpdir)
+
+
 class TestFMK(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -3522,9 +4450,6 @@ class TestFMK(unittest.TestCase):
         print(gen_disruptors)
 
         for dis in gen_disruptors:
-            if dis in ['tCROSS']:
-                continue
-
             print("\n\n---[ Tested Disruptor %r ]---" % dis)
             if dis == 'EXT':
                 act = [dmaker_type, (dis, UI(cmd='/bin/cat', file_mode=True))]
@@ -3621,6 +4546,232 @@ class TestFMK(unittest.TestCase):
 
         self.assertEqual(idx, expected_idx)
 
+    @unittest.skipIf(not is_pregeneration_supported(), "Data pregeneration is not supported")
+    def test_data_pregeneration(self):
+
+        act = ['TESTNODE', ('tTYPE', UI(determinism=True))]
+
+        def walking_index(d):
+            for info in d.read_info('tTYPE', 'sd_fuzz_typed_nodes'):
+                for i in info:
+                    if i.startswith('model walking index:'):
+                        return int(i.split(':')[1])
+
+        random.seed(7)
+        expected_outcomes = []
+        for i in range(5):
+            d = fmk.get_data(act)
+            self.assertIsNotNone(d)
+            expected_outcomes.append(d.to_bytes())
+        fmk.cleanup_all_dmakers(reset_existing_seed=True)
+
+        outcomes = []
+        pregen = fmk.start_data_pregeneration(act, nb_data=5, seed=7)
+        try:
+            while True:
+                d = pregen.get_data()
+                if d is None:
+                    break
+                self.assertEqual(d.get_history()[-1][:2], ('tTYPE', 'sd_fuzz_typed_nodes'))
+                self.assertTrue(fmk.send_data_and_log(d))
+                outcomes.append(d.to_bytes())
+        finally:
+            pregen.stop()
+
+        self.assertTrue(fmk.is_ok())
+        self.assertEqual(outcomes, expected_outcomes)
+
+        last_data_id = max(fmk.lg._last_data_IDs.values())
+        content = fmk.fmkDB.fetch_data(start_id=last_data_id, end_id=last_data_id)
+        self.assertEqual(bytes(content[0][1]), expected_outcomes[-1])
+        steps = fmk.fmkDB.execute_sql_statement(
+            "SELECT DMAKER_TYPE, DMAKER_NAME FROM STEPS "
+            "WHERE DATA_ID == {data_id:d};".format(data_id=last_data_id))
+        self.assertEqual(steps, [('tTYPE', 'sd_fuzz_typed_nodes')])
+
+        # the framework resumes the walk after the last popped data
+        self.assertEqual(walking_index(fmk.get_data(act)), 6)
+        fmk.cleanup_all_dmakers(reset_existing_seed=True)
+
+        # seed partitions are deterministic whatever the number of workers
+        runs = []
+        for i in range(2):
+            pregen = fmk.start_data_pregeneration(['TESTNODE'], nb_data=9, nb_workers=3, seed=7)
+            try:
+                run = []
+                d = pregen.get_data()
+                while d is not None:
+                    run.append(d.to_bytes())
+                    d = pregen.get_data()
+                runs.append(run)
+            finally:
+                pregen.stop()
+
+        self.assertEqual(len(runs[0]), 9)
+        self.assertEqual(runs[0], runs[1])
+
+        # each worker only generates its share of the data
+        pregen = fmk.start_data_pregeneration(['TESTNODE'], nb_data=10, nb_workers=3, seed=7)
+        try:
+            nb = 0
+            while pregen.get_data() is not None:
+                nb += 1
+        finally:
+            pregen.stop()
+        self.assertEqual(nb, 10)
+
+        # the walk of a stateful disruptor is split among the workers
+        fmk.cleanup_all_dmakers(reset_existing_seed=True)
+        pregen = fmk.start_data_pregeneration(act, nb_data=9, nb_workers=3, seed=7)
+        try:
+            self.assertEqual(pregen.nb_workers, 3)
+            indexes = []
+            d = pregen.get_data()
+            while d is not None:
+                indexes.append(walking_index(d))
+                d = pregen.get_data()
+        finally:
+            pregen.stop()
+        self.assertEqual(indexes, list(range(1, 10)))
+
+        self.assertEqual(walking_index(fmk.get_data(act)), 10)
+
+        # a walk already started is continued by a single worker
+        pregen = fmk.start_data_pregeneration(act, nb_data=2, nb_workers=2, seed=7)
+        try:
+            self.assertEqual(pregen.nb_workers, 1)
+            indexes = [walking_index(pregen.get_data()), walking_index(pregen.get_data())]
+        finally:
+            rand_state = random.getstate()
+            pregen.stop()
+        self.assertEqual(indexes, [11, 12])
+        # bringing the data makers up to date does not alter the random generator
+        self.assertEqual(random.getstate(), rand_state)
+        self.assertEqual(walking_index(fmk.get_data(act)), 13)
+        fmk.get_error()
+        fmk.cleanup_all_dmakers(reset_existing_seed=True)
+
+        # scenarios rely on the feedback, and the callbacks of the data would not be run
+        for action_list in (['SC_BASIC'], ['CBK']):
+            self.assertIsNone(fmk.start_data_pregeneration(action_list, nb_data=1, nb_workers=3))
+            self.assertEqual([e.code for e in fmk.get_error()], [Error.FmkWarning])
+            self.assertIsNotNone(fmk.get_data(action_list))
+        fmk.cleanup_all_dmakers(reset_existing_seed=True)
+
+    def test_evolutionary_scenario(self):
+        go_on = True
+        for i in range(50):
+            data = fmk.get_data(['SC_EVOL'])
+            go_on = data is not None and fmk.send_data_and_log(data)
+            if not go_on:
+                break
+        self.assertFalse(go_on)
+        # the 10 individuals of the first generation have been played
+        self.assertGreater(i, 10)
+
+    @unittest.skipIf(not is_pregeneration_supported(), "Worker processes are not supported")
+    def test_population_workers(self):
+        runs = []
+        for workers in (None, 2, 3):
+            random.seed(7)
+            population = DefaultPopulation(fmk._exportable_fmk_ops, model='SEPARATOR',
+                                           size=8, workers=workers)
+            population.reset()
+            self.assertEqual(len(population), 8)
+            nodes = [ind.node for ind in population]
+            if workers is not None:
+                self.assertTrue(all(n.env.get_data_model() is nodes[0].env.get_data_model()
+                                    for n in nodes))
+            runs.append([n.to_bytes() for n in nodes])
+            pool = population._pool
+
+            population.evolve()
+            self.assertEqual(population.generation, 2)
+            self.assertEqual([s['generation'] for s in population.generation_stats], [1, 2])
+            self.assertIn('evaluation', population.generation_stats[0])
+            self.assertIn('mutation', population.generation_stats[1])
+            self.assertEqual(population.generation_stats[1]['size'], len(population))
+
+            # the workers live as long as the evolutionary process
+            if workers is not None:
+                self.assertIsNotNone(pool)
+                self.assertIs(population._pool, pool)
+            population.teardown()
+            self.assertIsNone(population._pool)
+
+        # each individual is built with its own seed whatever the number of workers
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(runs[0], runs[2])
+
+    def test_evolutionary_scenario_burst(self):
+        tg = fmk.targets[0]
+        batches = []
+        pending = []
+        scores = []
+        populations = []
+        send_multiple_data = tg.send_multiple_data
+        compute_scores = DefaultPopulation._compute_scores
+        reset = DefaultPopulation.reset
+        fbk = FeedbackCollector()
+
+        def record_batch(data_list, from_fmk=False):
+            batches.append(len(data_list))
+            pending[:] = data_list
+            send_multiple_data(data_list, from_fmk=from_fmk)
+
+        def get_feedback():
+            # each data of the batch is answered with its own content
+            for idx, data in enumerate(pending):
+                fbk.add_fbk_from('batch[{:d}]'.format(idx), data.to_bytes(),
+                                 data_id=data.get_data_id())
+            pending[:] = []
+            return fbk
+
+        def record_scores(population):
+            for ind in population[:]:
+                scores.append((ind.node.to_bytes(),
+                               [content for _, _, _, content in ind.feedback.iter_entries()]))
+            compute_scores(population)
+
+        def record_population(population):
+            populations.append(population)
+            reset(population)
+
+        tg.send_multiple_data = record_batch
+        tg.get_feedback = get_feedback
+        DefaultPopulation._compute_scores = record_scores
+        DefaultPopulation.reset = record_population
+        try:
+            go_on = True
+            for i in range(50):
+                data = fmk.get_data(['SC_EVOL_BURST'])
+                go_on = data is not None and fmk.send_data_and_log(data)
+                if not go_on:
+                    break
+
+            self.assertFalse(go_on)
+            # a batch does not span two generations
+            self.assertEqual(batches[:3], [4, 4, 2])
+            self.assertTrue(all(1 < b <= 4 for b in batches))
+
+            # each individual is scored from the feedback of its own data
+            self.assertEqual(len(scores), 10)
+            for content, entries in scores:
+                self.assertEqual(entries, [content])
+
+            # the workers are released when the scenario is interrupted
+            data = fmk.get_data(['SC_EVOL_BURST'])
+            self.assertTrue(fmk.send_data_and_log(data))
+            population = populations[-1]
+            self.assertIsNotNone(population._pool)
+            fmk.cleanup_all_dmakers()
+            self.assertIsNone(population._pool)
+        finally:
+            del tg.send_multiple_data
+            del tg.get_feedback
+            DefaultPopulation._compute_scores = compute_scores
+            DefaultPopulation.reset = reset
+
     def test_operator_1(self):
 
         fmk.reload_all(tg_ids=[7,8])
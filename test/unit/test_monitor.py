@@ -21,7 +21,13 @@
 #
 ################################################################################
 
+import os
+import sys
+import time
+import select
+import tempfile
 import unittest
+import subprocess
 from test import mock
 from framework.monitor import *
 
@@ -116,3 +122,338 @@ class ProbeUserTest(unittest.TestCase):
             if i+1 < len(execution_times):
                 self.assertTrue(0 <= (execution_times[i+1] - execution_times[i]).total_seconds()
                                 - self.probe_user.get_probe_delay() <= delta)
+
+
+class BlockingProbeUserTest(unittest.TestCase):
+    """Test case used to test the 'BlockingProbeUser' class."""
+
+    def setUp(self):
+        self.timeout = 5
+
+        self.probe = Probe()
+        self.probe.main = mock.Mock(return_value=ProbeStatus(0))
+        self.probe.arm = mock.Mock()
+        self.probe.start = mock.Mock()
+        self.probe.stop = mock.Mock()
+
+        self.dm = mock.Mock()
+        self.target = mock.Mock()
+        self.logger = mock.Mock()
+
+        self.probe_user = BlockingProbeUser(self.probe, after_target_feedback_retrieval=False,
+                                            scheduler=ProbeScheduler(max_workers=2))
+        self.probe_user.start(self.dm, self.target, self.logger)
+        self.probe_user.wait_for_probe_init(self.timeout)
+
+    def tearDown(self):
+        self.probe_user.stop()
+        self.probe_user.join(self.timeout)
+        self.assertFalse(self.probe_user.is_alive())
+        self.probe.stop.assert_called_once_with(self.dm, self.target, self.logger)
+
+    def _sync(self, error=False):
+        self.probe_user.notify_data_ready()
+        self.probe_user.wait_until_armed(self.timeout)
+        if error:
+            self.probe_user.notify_error()
+        else:
+            self.probe_user.notify_blocking()
+        self.probe_user.wait_until_ready(self.timeout)
+
+    def test_sync_points(self):
+        t0 = time.time()
+        for i in range(20):
+            self._sync()
+        self.assertLess(time.time() - t0, 1)
+        self.assertEqual(self.probe.arm.call_count, 20)
+        self.assertEqual(self.probe.main.call_count, 20)
+        self.assertEqual(self.probe_user.latency_stats.executions, 20)
+        self.assertLess(self.probe_user.latency_stats.max_lag, 1)
+
+    def test_error_skips_main(self):
+        self._sync(error=True)
+        self.assertEqual(self.probe.arm.call_count, 1)
+        self.assertEqual(self.probe.main.call_count, 0)
+        self._sync()
+        self.assertEqual(self.probe.main.call_count, 1)
+
+
+class ProbeSchedulerTest(unittest.TestCase):
+    """Test case used to test the 'ProbeScheduler' class."""
+
+    def test_shared_workers(self):
+        scheduler = ProbeScheduler(max_workers=3)
+        users = []
+        for i in range(12):
+            probe = Probe(delay=0.02)
+            probe.main = mock.Mock(return_value=ProbeStatus(0))
+            users.append(ProbeUser(probe, scheduler=scheduler))
+
+        for pu in users:
+            pu.start(mock.Mock(), mock.Mock(), mock.Mock())
+        time.sleep(0.3)
+        for pu in users:
+            pu.stop()
+        for pu in users:
+            pu.join(5)
+            self.assertFalse(pu.is_alive())
+            self.assertGreater(pu.probe.main.call_count, 3)
+            self.assertEqual(pu.latency_stats.executions, pu.probe.main.call_count)
+
+        self.assertLessEqual(scheduler.nb_workers, 3)
+
+    def test_blocked_probe_does_not_delay_the_others(self):
+        scheduler = ProbeScheduler()
+        release = threading.Event()
+        users = []
+        for i in range(10):
+            blocked = Probe(delay=0.01)
+            blocked.main = mock.Mock(side_effect=lambda *args: release.wait(5) and ProbeStatus(0))
+            users.append(ProbeUser(blocked, scheduler=scheduler))
+        for i in range(3):
+            probe = Probe(delay=0.02)
+            probe.main = mock.Mock(return_value=ProbeStatus(0))
+            users.append(ProbeUser(probe, scheduler=scheduler))
+
+        try:
+            for pu in users:
+                pu.start(mock.Mock(), mock.Mock(), mock.Mock())
+            time.sleep(0.3)
+            for pu in users[10:]:
+                self.assertGreater(pu.probe.main.call_count, 3)
+        finally:
+            release.set()
+            for pu in users:
+                pu.stop()
+            for pu in users:
+                pu.join(5)
+
+        self.assertLessEqual(scheduler.nb_workers, len(users) + 1)
+
+
+class PersistentShellBackendTest(unittest.TestCase):
+    """Test case used to test the persistent mode of 'Shell_Backend'."""
+
+    def setUp(self):
+        self.backend = Shell_Backend(timeout=5, persistent=True)
+        self.backend.start()
+
+    def tearDown(self):
+        self.backend.stop()
+
+    def test_results(self):
+        self.assertEqual(self.backend.exec_command('echo hello; printf foo'), b'hello\nfoo')
+        self.assertEqual(self.backend.exec_command('cat; echo done'), b'done\n')
+        self.assertEqual(self.backend.exec_command('true'), b'')
+        self.assertRaises(BackendError, self.backend.exec_command, 'fuddly_unknown_command')
+        self.assertEqual(self.backend.exec_command('echo still alive'), b'still alive\n')
+        self.assertEqual(self.backend.round_trips, 5)
+
+    def test_errors(self):
+        backend = Shell_Backend(timeout=5, persistent=True, cmd_notfound=b'not found')
+        backend.start()
+        try:
+            with self.assertRaises(BackendError) as cm:
+                backend.exec_command('fuddly_unknown_command')
+            self.assertIn('does not exist', str(cm.exception))
+            # other errors are reported with the error stream of the command
+            with self.assertRaises(BackendError) as cm:
+                backend.exec_command('echo disk full >&2')
+            self.assertIn('disk full', str(cm.exception))
+        finally:
+            backend.stop()
+
+    def test_concurrent_commands_are_batched(self):
+        results = {}
+
+        def run(i):
+            results[i] = self.backend.exec_command('sleep 0.05; echo {:d}'.format(i))
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+        self.assertEqual(results, dict((i, '{:d}\n'.format(i).encode()) for i in range(8)))
+        self.assertLess(self.backend.round_trips, 8)
+
+    def test_shell_restart(self):
+        self.assertEqual(self.backend.exec_command('echo 1'), b'1\n')
+        # commands are run in a subshell
+        self.assertEqual(self.backend.exec_command('exit 0'), b'')
+        self.backend._shell.kill()
+        self.backend._shell.wait()
+        self.assertRaises(BackendError, self.backend.exec_command, 'echo lost')
+        self.assertEqual(self.backend.exec_command('echo 2'), b'2\n')
+
+
+class PTY_Backend(Console_Backend):
+    """
+    Backend to execute commands through a shell running on a local pseudo-terminal.
+    It behaves like a :class:`Serial_Backend` used with a prompt, and thus stands in for a
+    serial console in the tests.
+    """
+    def __init__(self, command=None, prompt=b'fuddly\\$ ', username=None, password=None,
+                 slowness_factor=5, cmd_notfound=b'not found', codec='latin_1'):
+        """
+        Args:
+            command (list): program to run on the pseudo-terminal. By default, an interactive
+              shell whose prompt is set to `fuddly$ `.
+            prompt (bytes): regular expression matching the prompt of the program.
+
+        Refer to :class:`Console_Backend` for the other parameters.
+        """
+        Console_Backend.__init__(self, username=username, password=password,
+                                 slowness_factor=slowness_factor, cmd_notfound=cmd_notfound,
+                                 codec=codec, prompt=prompt, eol=b'\n')
+        self.command = ['/bin/sh', '-i'] if command is None else command
+        self._app = None
+        self._fd = None
+
+    def _start(self):
+        master, slave = os.openpty()
+        env = dict(os.environ, PS1='fuddly$ ')
+        self._app = subprocess.Popen(self.command, stdin=slave, stdout=slave, stderr=slave,
+                                     env=env, preexec_fn=os.setsid, close_fds=True)
+        os.close(slave)
+        self._fd = master
+        try:
+            if self.username is not None:
+                self._login_with_prompt()
+            else:
+                _, match = self._reader.read_until(self.prompt,
+                                                   timeout=self.slowness_factor*1.5)
+                if match is None:
+                    raise BackendError('The program on the pseudo-terminal does not show '
+                                       'its prompt')
+        except BackendError:
+            self._stop()
+            raise
+
+    def _stop(self):
+        if self._app is not None:
+            try:
+                self._app.kill()
+                self._app.wait()
+            except OSError:
+                pass
+            self._app = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _write(self, data):
+        while data:
+            data = data[os.write(self._fd, data):]
+
+    def _read_available(self):
+        if not select.select([self._fd], [], [], 0.05)[0]:
+            return b''
+        try:
+            return os.read(self._fd, 65536)
+        except OSError:
+            # the program has terminated
+            time.sleep(0.05)
+            return b''
+
+    def _flush_input(self):
+        while select.select([self._fd], [], [], 0)[0]:
+            try:
+                if not os.read(self._fd, 65536):
+                    break
+            except OSError:
+                break
+
+    def _exec_command(self, cmd):
+        if self._fd is None:
+            raise BackendError('The pseudo-terminal is not open')
+        return self._exec_command_with_prompt(cmd)
+
+
+class PTYBackendTest(unittest.TestCase):
+    """Test case used to test the prompt-aware console reading with 'PTY_Backend'."""
+
+    fake_console = '''
+import subprocess, sys
+sys.stdout.write('login: ')
+sys.stdout.flush()
+user = sys.stdin.readline().strip()
+sys.stdout.write('Password: ')
+sys.stdout.flush()
+password = sys.stdin.readline().strip()
+if (user, password) != ('user', 'pass'):
+    sys.exit(1)
+while True:
+    sys.stdout.write('console> ')
+    sys.stdout.flush()
+    cmd = sys.stdin.readline()
+    if not cmd:
+        break
+    sys.stdout.write(subprocess.check_output(cmd, shell=True).decode())
+'''
+
+    def test_commands(self):
+        backend = PTY_Backend(slowness_factor=2)
+        backend.start()
+        try:
+            t0 = time.time()
+            self.assertEqual(backend.exec_command('echo hello'), b'hello\r\n')
+            self.assertEqual(backend.exec_command('sleep 0.2; printf "a\\nb\\n"'), b'a\r\nb\r\n')
+            self.assertEqual(backend.exec_command('true'), b'')
+            self.assertRaises(BackendError, backend.exec_command, 'fuddly_unknown_command')
+            # answers are returned as soon as the prompt shows up
+            self.assertLess(time.time() - t0, 1.5)
+        finally:
+            backend.stop()
+
+    rewrapping_console = '''
+import subprocess, sys, termios
+attrs = termios.tcgetattr(0)
+attrs[3] &= ~termios.ECHO
+termios.tcsetattr(0, termios.TCSANOW, attrs)
+while True:
+    sys.stdout.write('console> ')
+    sys.stdout.flush()
+    cmd = sys.stdin.readline()
+    if not cmd:
+        break
+    cmd = cmd.rstrip('\\n')
+    # echo the command as a terminal that wraps it every 20 columns
+    sys.stdout.write(' \\r'.join(cmd[i:i+20] for i in range(0, len(cmd), 20)) + '\\n')
+    sys.stdout.write(subprocess.check_output(cmd, shell=True).decode())
+'''
+
+    def test_rewrapped_echo(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(self.rewrapping_console)
+        try:
+            backend = PTY_Backend(command=[sys.executable, f.name], prompt=b'console> ',
+                                  slowness_factor=2)
+            backend.start()
+            try:
+                cmd = 'echo ' + 'x' * 100
+                self.assertEqual(backend.exec_command(cmd), b'x' * 100 + b'\r\n')
+            finally:
+                backend.stop()
+        finally:
+            os.remove(f.name)
+
+    def test_login(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(self.fake_console)
+        try:
+            backend = PTY_Backend(command=[sys.executable, f.name], prompt=b'console> ',
+                                  username='user', password='pass', slowness_factor=2)
+            backend.start()
+            try:
+                self.assertEqual(backend.exec_command('echo logged'), b'logged\r\n')
+            finally:
+                backend.stop()
+
+            backend = PTY_Backend(command=[sys.executable, f.name], prompt=b'console> ',
+                                  username='user', password='wrong', slowness_factor=1)
+            self.assertRaises(BackendError, backend.start)
+            self.assertIsNone(backend._app)
+        finally:
+            os.remove(f.name)
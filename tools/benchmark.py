@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+
+################################################################################
+#
+#  Copyright 2014-2016 Eric Lacombe <eric.lacombe@security-labs.org>
+#
+################################################################################
+#
+#  This file is part of fuddly.
+#
+#  fuddly is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  fuddly is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with fuddly. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+from __future__ import print_function
+
+import os
+import sys
+import gc
+import time
+import random
+import inspect
+import importlib
+
+currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0,parentdir)
+
+from framework.node import NodeInternalsCriteria, NodeInternals_TypedValue
+from framework.basic_primitives import corrupt_bits, corrupt_bytes
+from libs.external_modules import *
+
+import argparse
+
+parser = argparse.ArgumentParser(description='Micro-benchmarks of some fuddly internals')
+subparsers = parser.add_subparsers(dest='bench')
+
+p_clone = subparsers.add_parser('clone', help='Compare the deep-copy and the copy-on-write '
+                                              'cloning of the atoms of a data model')
+p_clone.add_argument('--dm', metavar='DATA_MODEL', default='protocols.usb',
+                     help="Data model module to use, relative to 'data_models/' "
+                          "(default: 'protocols.usb')")
+p_clone.add_argument('--atom', metavar='ATOM_ID', action='append',
+                     help='Restrict the benchmark to the specified atoms (can be repeated)')
+p_clone.add_argument('-n', '--nb', type=int, default=200,
+                     help='Number of clones per atom (default: 200)')
+p_clone.add_argument('--freeze', action='store_true',
+                     help='Freeze the registered atoms before cloning them, as it is the case '
+                          'for atoms created from absorbed samples')
+p_clone.add_argument('--to-bytes', action='store_true',
+                     help='Serialize each clone after its creation')
+
+p_ser = subparsers.add_parser('serialize', help='Compare the serialization of the atoms of a data '
+                                                'model with and without the serialization cache, '
+                                                'while one leaf node is modified at a time')
+p_ser.add_argument('--dm', metavar='DATA_MODEL', default='protocols.usb',
+                   help="Data model module to use, relative to 'data_models/' "
+                        "(default: 'protocols.usb')")
+p_ser.add_argument('--atom', metavar='ATOM_ID', action='append',
+                   help='Restrict the benchmark to the specified atoms (can be repeated)')
+p_ser.add_argument('-n', '--nb', type=int, default=2000,
+                   help='Number of modifications/serializations per atom (default: 2000)')
+
+p_cor = subparsers.add_parser('corrupt', help='Compare the pure-Python and the NumPy engines '
+                                              'of the bit/byte corruption primitives')
+p_cor.add_argument('-s', '--size', type=int, default=4*1024*1024,
+                   help='Size of the corrupted payload in bytes (default: 4 MB)')
+p_cor.add_argument('-p', '--percentage', type=float, default=0.01,
+                   help='Ratio of corrupted bits/bytes (default: 0.01)')
+p_cor.add_argument('-n', '--nb', type=int, default=5,
+                   help='Number of corruptions per primitive and engine (default: 5)')
+
+p_xo = subparsers.add_parser('crossover', help='Measure the tCROSS disruptor (sd_crossover) on '
+                                               'graphs of increasing sizes')
+p_xo.add_argument('-l', '--leaves', type=int, nargs='+', default=[100, 1000, 10000],
+                  help='Number of leaf nodes of the graphs (default: 100 1000 10000)')
+p_xo.add_argument('-n', '--nb', type=int, default=5,
+                  help='Number of crossovers per graph size (default: 5)')
+
+
+def get_rss():
+    '''Return the current resident set size of the process in bytes'''
+    try:
+        with open('/proc/self/statm') as f:
+            rss_pages = int(f.read().split()[1])
+        return rss_pages * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        import resource
+        # On Linux ru_maxrss is in KB, and on MacOS it is in bytes. In any
+        # case, this is only the peak value.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def print_result(title, duration, nb, mem=None):
+    msg = '  {:<22s} {:8.3f} s  ({:8.1f} us/op)'.format(title, duration, duration*1e6/nb)
+    if mem is not None:
+        msg += '  RSS: {:+.2f} MB'.format(mem/(1024.*1024))
+    print(msg)
+
+def load_data_model(dm_path):
+    module = importlib.import_module('data_models.' + dm_path)
+    dm = module.data_model
+    if dm.name is None:
+        dm.name = dm_path.split('.')[-1]
+    dm.load_data_model({})
+    return dm
+
+def bench_clone(args):
+    dm = load_data_model(args.dm)
+    atoms = args.atom if args.atom else list(dm.atom_identifiers())
+
+    if args.freeze:
+        for a_id in atoms:
+            dm._dm_hashtable[a_id].freeze()
+
+    print(colorize("\n*** Data Model '{!s}' / {:d} clones per atom ***\n".format(dm, args.nb),
+                   rgb=Color.INFO))
+
+    for a_id in atoms:
+        print(colorize("[ {:s} ]".format(a_id), rgb=Color.SUBINFO))
+        for title, cow in [('deep copy', False), ('copy-on-write', True)]:
+            dm.cow_clone = cow
+            gc.collect()
+            rss_before = get_rss()
+            clones = []
+            start = time.time()
+            for i in range(args.nb):
+                a = dm.get_atom(a_id)
+                if args.to_bytes:
+                    a.to_bytes()
+                clones.append(a)
+            duration = time.time() - start
+            rss_after = get_rss()
+            print_result(title, duration, args.nb, mem=rss_after-rss_before)
+            del clones
+
+    dm.cow_clone = False
+
+def bench_serialize(args):
+    dm = load_data_model(args.dm)
+    atoms = args.atom if args.atom else list(dm.atom_identifiers())
+
+    print(colorize("\n*** Data Model '{!s}' / {:d} serializations per atom ***\n".format(dm, args.nb),
+                   rgb=Color.INFO))
+
+    for a_id in atoms:
+        print(colorize("[ {:s} ]".format(a_id), rgb=Color.SUBINFO))
+        for title, cache in [('full serialization', False), ('serialization cache', True)]:
+            dm.serialization_cache = cache
+            atom = dm.get_atom(a_id)
+            atom.freeze()
+            leaves = atom.get_reachable_nodes(internals_criteria=NodeInternalsCriteria(
+                node_kinds=[NodeInternals_TypedValue]))
+            leaves = sorted(leaves, key=lambda x: x.name)
+            if not leaves:
+                break
+            # every leaf is unfrozen the same way, whatever the
+            # serialization mode
+            random.seed(0)
+            start = time.time()
+            for i in range(args.nb):
+                leaves[i % len(leaves)].unfreeze()
+                atom.to_bytes()
+            duration = time.time() - start
+            print_result(title, duration, args.nb)
+            if cache:
+                hits, misses = atom.get_serialization_cache_stats()
+                print('  cached subtrees: {:d} hits / {:d} misses'.format(hits, misses))
+
+    dm.serialization_cache = False
+
+def bench_corrupt(args):
+    payload = bytes(bytearray(random.getrandbits(8) for i in range(args.size)))
+
+    print(colorize("\n*** {:d}-byte payload / {:.2%} corrupted / {:d} runs ***\n"
+                   .format(args.size, args.percentage, args.nb), rgb=Color.INFO))
+
+    engines = [('pure Python', False)]
+    if numpy_module:
+        engines.append(('NumPy', True))
+    else:
+        print('NumPy is not available, only the pure-Python engine is benchmarked\n')
+
+    for func, kwargs in [(corrupt_bits, {}), (corrupt_bits, {'ascii': True}),
+                         (corrupt_bytes, {}), (corrupt_bytes, {'ctrl_char': True})]:
+        title = func.__name__ + ''.join(' ({:s})'.format(k) for k in kwargs)
+        print(colorize("[ {:s} ]".format(title), rgb=Color.SUBINFO))
+        for engine, bulk in engines:
+            start = time.time()
+            for i in range(args.nb):
+                func(payload, p=args.percentage, seed=i, bulk=bulk, **kwargs)
+            duration = time.time() - start
+            print_result(engine, duration, args.nb)
+            print('  {:<22s} {:8.1f} MB/s'.format('', args.size*args.nb/(1024.*1024*duration)))
+
+def bench_crossover(args):
+    # imported here as it requires the whole framework
+    from framework.data import Data
+    from framework.generic_data_makers import sd_crossover
+
+    print(colorize("\n*** {:d} crossovers per graph size ***\n".format(args.nb), rgb=Color.INFO))
+
+    for nb_leaves in args.leaves:
+        print(colorize("[ {:d} leaves ]".format(nb_leaves), rgb=Color.SUBINFO))
+        width = max(2, int(round(nb_leaves ** (1/3.))))
+        duration = 0
+        random.seed(0)
+        for i in range(args.nb):
+            graphs = [build_graph(nb_leaves, width) for j in range(2)]
+            xo = sd_crossover()
+            xo.node = graphs[1]
+            xo.percentage_to_share = 0.5
+            start = time.time()
+            xo.set_seed(Data(graphs[0]))
+            duration += time.time() - start
+        print_result('crossover', duration, args.nb)
+        print('  {:<22s} {:8.2f} us/leaf'.format('', duration*1e6/(args.nb*nb_leaves)))
+
+def build_graph(nb_leaves, width):
+    '''Build a graph of non-terminal nodes having `width` children, with `nb_leaves` leaves'''
+    from framework.node import Node, Env
+    from framework.value_types import String
+
+    nodes = [Node('leaf{:d}'.format(i), values=['v{:d}'.format(i)]) for i in range(nb_leaves)]
+    depth = 0
+    while len(nodes) > 1:
+        depth += 1
+        nodes = [Node('nt{:d}_{:d}'.format(depth, i), subnodes=nodes[i:i+width])
+                 for i in range(0, len(nodes), width)]
+    nodes[0].set_env(Env())
+    nodes[0].freeze()
+    return nodes[0]
+
+
+if __name__ == "__main__":
+
+    args = parser.parse_args()
+
+    if args.bench == 'clone':
+        bench_clone(args)
+    elif args.bench == 'serialize':
+        bench_serialize(args)
+    elif args.bench == 'corrupt':
+        bench_corrupt(args)
+    elif args.bench == 'crossover':
+        bench_crossover(args)
+    else:
+        parser.print_help()
@@ -92,6 +92,9 @@ group.add_argument('--remove-data', nargs=2, metavar=('FIRST_DATA_ID','LAST_DATA
                    help='Remove data from provided data ID range and all related information from fmkDB')
 group.add_argument('-r', '--remove-one-data', type=int, metavar='DATA_ID',
                    help='Remove data ID and all related information from fmkDB')
+group.add_argument('--move-inline-contents', action='store_true',
+                   help='Move the data contents recorded inline by previous fuddly versions '
+                        'to the deduplicated payload table, and shrink fmkDB')
 
 group = parser.add_argument_group('Fuddly Database Analysis')
 group.add_argument('--data-with-impact', action='store_true',
@@ -178,6 +181,7 @@ if __name__ == "__main__":
     export_one_data = args.export_one_data
     remove_data = args.remove_data
     remove_one_data = args.remove_one_data
+    move_inline_contents = args.move_inline_contents
 
     impact_analysis = args.data_with_impact
     raw_impact_analysis = args.data_with_impact_raw
@@ -276,6 +280,9 @@ if __name__ == "__main__":
         else:
             fmkdb.remove_data(remove_one_data, colorized=colorized)
 
+    elif move_inline_contents:
+        fmkdb.move_inline_contents()
+
     elif impact_analysis or raw_impact_analysis:
         fmkdb.get_data_with_impact(prj_name=prj_name, fbk_src=fbk_src, verbose=verbose,
                                    raw_analysis=raw_impact_analysis,